@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Convert ITF JSON traces to a compact CBOR encoding for MBT replay
+Usage: python3 itf_cbor.py <trace.itf.json | traces_dir> [-o OUTPUT] [--check]
+Example: python3 itf_cbor.py traces/ --check
+
+Each `<name>.itf.json` is written as `<name>.itf.cbor` (or to -o for a single
+trace). The encoding maps ITF to CBOR as follows:
+
+  {"#bigint": "n"}       native CBOR integer (tag 2/3 bignum beyond 64 bits)
+  {"#set": [...]}        tag 258 (finite set) over an array
+  {"#map": [[k, v]...]}  tag 259 (map with arbitrary keys) over a CBOR map
+  {"#tup": [...]}        tag 65000 (application specific) over an array
+  JSON number            tag 65001 over an integer (plain numbers such as
+                         #meta.index, kept apart from #bigint)
+  record / object        CBOR map with text keys
+  strings                interned with the stringref extension: the whole
+                         trace is a tag 256 namespace and repeated strings
+                         (field names, variant tags, process ids, bignum
+                         bytes) are emitted as tag 25 references into it
+
+The input is parsed incrementally: the top-level object is read key by key
+and `states` one state at a time, so only the state being converted is held
+in memory. The trace map and the states array are therefore written with
+indefinite length. `load` decodes a CBOR trace back into ITF JSON; --check
+verifies that every converted trace round-trips.
+The Rust loader emitted by `project_scaffold.py --cbor-loader` decodes the
+same format.
+"""
+
+import argparse
+import io
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, TextIO, Tuple, Union
+
+TAG_POS_BIGNUM = 2
+TAG_NEG_BIGNUM = 3
+TAG_STRINGREF = 25
+TAG_STRINGREF_NAMESPACE = 256
+TAG_SET = 258
+TAG_MAP = 259
+TAG_TUPLE = 65000
+TAG_NUMBER = 65001
+
+MAJOR_UINT, MAJOR_NINT, MAJOR_BYTES, MAJOR_TEXT, MAJOR_ARRAY, MAJOR_MAP, MAJOR_TAG, MAJOR_SIMPLE = range(8)
+FALSE, TRUE, NULL, FLOAT64, BREAK = 0xf4, 0xf5, 0xf6, 0xfb, 0xff
+INDEFINITE = 31
+
+
+def should_intern(table_size: int, length: int) -> bool:
+    """The stringref rule: a string enters the table only if a reference to it is shorter."""
+    if table_size < 24:
+        return length >= 3
+    if table_size < 256:
+        return length >= 4
+    if table_size < 65536:
+        return length >= 5
+    if table_size < 1 << 32:
+        return length >= 7
+    return length >= 11
+
+
+class JsonStream:
+    """Reads a JSON document piecewise, keeping only the unparsed rest of the input in memory."""
+
+    def __init__(self, f: TextIO, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        # Read at least as much as is pending, so a large value is re-scanned O(log n) times
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or '' at the end of the input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r}, found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Parse one complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self) -> Iterator[Any]:
+        """Yield the elements of an array one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self.pos += 1
+
+    def members(self, streamed: Tuple[str, ...] = ()) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield the (key, value) pairs of an object. Arrays under a key in
+        `streamed` are yielded as iterators, which must be consumed before
+        the next pair is requested.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f"expected an object key, found {key!r}")
+            self.expect(':')
+            yield key, self.array() if key in streamed else self.value()
+            if self.peek() != ',':
+                self.expect('}')
+                return
+            self.pos += 1
+
+
+class Encoder:
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.strings: Dict[Union[str, bytes], int] = {}
+
+    def head(self, major: int, value: int):
+        if value < 24:
+            self.out.write(bytes([major << 5 | value]))
+        elif value < 1 << 8:
+            self.out.write(bytes([major << 5 | 24, value]))
+        elif value < 1 << 16:
+            self.out.write(bytes([major << 5 | 25]) + struct.pack('>H', value))
+        elif value < 1 << 32:
+            self.out.write(bytes([major << 5 | 26]) + struct.pack('>I', value))
+        else:
+            self.out.write(bytes([major << 5 | 27]) + struct.pack('>Q', value))
+
+    def integer(self, n: int):
+        if 0 <= n < 1 << 64:
+            self.head(MAJOR_UINT, n)
+        elif -(1 << 64) <= n < 0:
+            self.head(MAJOR_NINT, -1 - n)
+        else:
+            magnitude = n if n >= 0 else -1 - n
+            self.head(MAJOR_TAG, TAG_POS_BIGNUM if n >= 0 else TAG_NEG_BIGNUM)
+            self.string(magnitude.to_bytes((magnitude.bit_length() + 7) // 8, 'big'))
+
+    def string(self, s: Union[str, bytes]):
+        """Emit a text or byte string, as a reference if it is already in the table."""
+        index = self.strings.get(s)
+        if index is not None:
+            self.head(MAJOR_TAG, TAG_STRINGREF)
+            self.head(MAJOR_UINT, index)
+            return
+        data = s.encode() if isinstance(s, str) else s
+        if should_intern(len(self.strings), len(data)):
+            self.strings[s] = len(self.strings)
+        self.head(MAJOR_TEXT if isinstance(s, str) else MAJOR_BYTES, len(data))
+        self.out.write(data)
+
+    def value(self, v: Any):
+        if isinstance(v, bool):
+            self.out.write(bytes([TRUE if v else FALSE]))
+        elif v is None:
+            self.out.write(bytes([NULL]))
+        elif isinstance(v, str):
+            self.string(v)
+        elif isinstance(v, int):
+            self.head(MAJOR_TAG, TAG_NUMBER)
+            self.integer(v)
+        elif isinstance(v, float):
+            self.out.write(bytes([FLOAT64]) + struct.pack('>d', v))
+        elif isinstance(v, list):
+            self.head(MAJOR_ARRAY, len(v))
+            for item in v:
+                self.value(item)
+        elif isinstance(v, dict):
+            self.object(v)
+        else:
+            raise TypeError(f"cannot encode {type(v).__name__}")
+
+    def object(self, v: Dict):
+        if len(v) == 1:
+            (key, inner), = v.items()
+            if key == '#bigint':
+                self.integer(int(inner))
+                return
+            if key in ('#set', '#tup'):
+                self.head(MAJOR_TAG, TAG_SET if key == '#set' else TAG_TUPLE)
+                self.value(inner)
+                return
+            if key == '#map':
+                self.head(MAJOR_TAG, TAG_MAP)
+                self.head(MAJOR_MAP, len(inner))
+                for k, item in inner:
+                    self.value(k)
+                    self.value(item)
+                return
+        self.head(MAJOR_MAP, len(v))
+        for key, item in v.items():
+            self.string(key)
+            self.value(item)
+
+    def trace(self, members: Iterator[Tuple[str, Any]]):
+        """Encode the members of an ITF trace as one stringref namespace; `states` may be an iterator."""
+        self.head(MAJOR_TAG, TAG_STRINGREF_NAMESPACE)
+        self.out.write(bytes([MAJOR_MAP << 5 | INDEFINITE]))
+        for key, item in members:
+            self.string(key)
+            if key == 'states':
+                self.out.write(bytes([MAJOR_ARRAY << 5 | INDEFINITE]))
+                for state in item:
+                    self.value(state)
+                self.out.write(bytes([BREAK]))
+            else:
+                self.value(item)
+        self.out.write(bytes([BREAK]))
+
+
+class Decoder:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+        self.tables: List[List[Union[str, bytes]]] = []
+
+    def byte(self) -> int:
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def argument(self, info: int) -> int:
+        if info < 24:
+            return info
+        size = 1 << (info - 24)
+        value = int.from_bytes(self.data[self.pos:self.pos + size], 'big')
+        self.pos += size
+        return value
+
+    def raw(self):
+        """Decode one item; integers are returned as ints, tags as (tag, value)."""
+        initial = self.byte()
+        major, info = initial >> 5, initial & 0x1f
+        if major == MAJOR_SIMPLE:
+            if initial == FALSE:
+                return False
+            if initial == TRUE:
+                return True
+            if initial == NULL:
+                return None
+            if initial == FLOAT64:
+                value = struct.unpack('>d', self.data[self.pos:self.pos + 8])[0]
+                self.pos += 8
+                return value
+            raise ValueError(f"unsupported simple value 0x{initial:02x}")
+
+        if info == INDEFINITE and major in (MAJOR_ARRAY, MAJOR_MAP):
+            items = []
+            while self.data[self.pos] != BREAK:
+                items.append(self.itf() if major == MAJOR_ARRAY else (self.itf(), self.itf()))
+            self.pos += 1
+            return items
+
+        arg = self.argument(info)
+        if major == MAJOR_UINT:
+            return arg
+        if major == MAJOR_NINT:
+            return -1 - arg
+        if major in (MAJOR_BYTES, MAJOR_TEXT):
+            data = bytes(self.data[self.pos:self.pos + arg])
+            self.pos += arg
+            s = str(data, 'utf-8') if major == MAJOR_TEXT else data
+            if self.tables and should_intern(len(self.tables[-1]), arg):
+                self.tables[-1].append(s)
+            return s
+        if major == MAJOR_ARRAY:
+            return [self.itf() for _ in range(arg)]
+        if major == MAJOR_MAP:
+            return [(self.itf(), self.itf()) for _ in range(arg)]
+        return self.tagged(arg)
+
+    def tagged(self, tag: int):
+        if tag == TAG_STRINGREF_NAMESPACE:
+            self.tables.append([])
+            try:
+                return self.itf()
+            finally:
+                self.tables.pop()
+        if tag == TAG_STRINGREF:
+            return self.tables[-1][self.raw()]
+        if tag in (TAG_POS_BIGNUM, TAG_NEG_BIGNUM):
+            magnitude = int.from_bytes(self.raw(), 'big')
+            return {'#bigint': str(magnitude if tag == TAG_POS_BIGNUM else -1 - magnitude)}
+        if tag == TAG_NUMBER:
+            return self.raw()
+        if tag == TAG_SET:
+            return {'#set': self.itf()}
+        if tag == TAG_TUPLE:
+            return {'#tup': self.itf()}
+        if tag == TAG_MAP:
+            return {'#map': [[k, v] for k, v in self.raw()]}
+        raise ValueError(f"unsupported tag {tag}")
+
+    def itf(self):
+        """Decode one item into its ITF JSON form."""
+        initial = self.data[self.pos]
+        value = self.raw()
+        major = initial >> 5
+        if major in (MAJOR_UINT, MAJOR_NINT):
+            return {'#bigint': str(value)}
+        if major == MAJOR_MAP:
+            return dict(value)
+        return value
+
+
+def convert(src: Path, dest: Path):
+    with src.open() as f, dest.open('wb') as raw:
+        out = io.BufferedWriter(raw, buffer_size=1 << 20)
+        Encoder(out).trace(JsonStream(f).members(streamed=('states',)))
+        out.flush()
+        out.detach()
+
+
+def load(path: Path) -> Dict:
+    return Decoder(Path(path).read_bytes()).itf()
+
+
+def cbor_path(src: Path) -> Path:
+    name = src.name[:-len('.json')] if src.name.endswith('.json') else src.name
+    return src.with_name(name + '.cbor')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ITF JSON traces to CBOR")
+    parser.add_argument('source', type=Path, help='an ITF trace or a directory of *.itf.json traces')
+    parser.add_argument('-o', '--output', type=Path, help='output file (single trace only)')
+    parser.add_argument('--check', action='store_true', help='verify that each converted trace round-trips')
+    args = parser.parse_args()
+
+    if args.source.is_dir():
+        sources = sorted(args.source.glob('*.itf.json'))
+    elif args.source.exists():
+        sources = [args.source]
+    else:
+        print(f"Error: Not found: {args.source}")
+        sys.exit(1)
+    if args.output and len(sources) != 1:
+        print("Error: -o needs a single trace")
+        sys.exit(1)
+
+    json_bytes = cbor_bytes = 0
+    started = time.monotonic()
+    failed = []
+    for src in sources:
+        dest = args.output or cbor_path(src)
+        convert(src, dest)
+        json_bytes += src.stat().st_size
+        cbor_bytes += dest.stat().st_size
+        if args.check and load(dest) != json.loads(src.read_text()):
+            failed.append(src)
+            print(f"  ✗ {src.name}: round trip differs")
+
+    print(f"Converted {len(sources)} trace(s) in {time.monotonic() - started:.2f}s")
+    if json_bytes:
+        print(f"Size: {json_bytes} → {cbor_bytes} bytes ({100 * cbor_bytes / json_bytes:.1f}%)")
+    if args.check:
+        print("✓ All traces round-trip" if not failed else f"✗ {len(failed)} trace(s) do not round-trip")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
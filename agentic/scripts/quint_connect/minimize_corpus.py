@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Reduce a corpus of ITF traces for MBT replay, keeping transition coverage
+Usage: python3 minimize_corpus.py <traces_dir> <output_dir> [--no-pairs] [--report FILE]
+Example: python3 minimize_corpus.py traces/ traces-min/ --report coverage.json
+
+Every step of a trace is labelled with the transition it took: the tag of
+the `transition.label` nondet pick (the `TransitionLabel` variant that
+project_scaffold.py turns into a Rust enum), or `mbt::actionTaken` for steps
+without one (e.g. `init`). A trace covers its labels and the pairs of
+labels taken in consecutive steps.
+
+The minimizer greedily picks the trace covering the most not-yet-covered
+labels and pairs, preferring shorter traces on ties, until the selection
+covers everything the whole corpus covers. The selected traces are copied to
+the output directory together with `coverage.json`, which records for each
+label and pair how many traces of the corpus and of the selection cover it.
+
+Both `*.itf.json` traces and `*.itf.cbor` traces (see itf_cbor.py) are read.
+A trace present in both formats counts once, read from its most recently
+written copy (the CBOR one when neither is newer), and every copy of a
+selected trace is written to the output directory.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from itf_cbor import load as load_cbor
+
+REPORT_NAME = 'coverage.json'
+PAIR_SEPARATOR = ' -> '
+
+
+def unwrap_option(value):
+    """Nondet picks are recorded as Option variants: Some(x) / None."""
+    if isinstance(value, dict) and value.get('tag') in ('Some', 'None'):
+        return value['value'] if value['tag'] == 'Some' else None
+    return value
+
+
+def step_label(state: Dict) -> Optional[str]:
+    picks = state.get('mbt::nondetPicks') or {}
+    transition = unwrap_option(picks.get('transition'))
+    if isinstance(transition, dict):
+        label = transition.get('label')
+        if isinstance(label, dict) and 'tag' in label:
+            return label['tag']
+    return state.get('mbt::actionTaken') or None
+
+
+def load_trace(path: Path) -> Dict:
+    if path.name.endswith('.cbor'):
+        return load_cbor(path)
+    with path.open() as f:
+        return json.load(f)
+
+
+def trace_features(path: Path, pairs: bool = True) -> Tuple[Set[str], int]:
+    """The labels (and label pairs) a trace covers, and its number of states."""
+    states = load_trace(path).get('states', [])
+    labels = [label for label in map(step_label, states) if label is not None]
+    features = set(labels)
+    if pairs:
+        features.update(f'{a}{PAIR_SEPARATOR}{b}' for a, b in zip(labels, labels[1:]))
+    return features, len(states)
+
+
+TRACE_SUFFIXES = ('.itf.cbor', '.itf.json')
+
+
+def find_traces(directory: Path) -> Dict[str, List[Path]]:
+    """Every copy of each trace, keyed by trace name (the file name without `.itf.*`)."""
+    traces = {}
+    for suffix in TRACE_SUFFIXES:
+        for path in sorted(directory.glob(f'*{suffix}')):
+            traces.setdefault(path.name[:-len(suffix)], []).append(path)
+    return dict(sorted(traces.items()))
+
+
+def newest_copy(copies: List[Path]) -> Path:
+    """The most recently written copy; on a tie the first, i.e. the CBOR one."""
+    return max(copies, key=lambda path: (path.stat().st_mtime_ns, -copies.index(path)))
+
+
+def greedy_cover(features: Dict[str, Set[str]], sizes: Dict[str, int]) -> List[str]:
+    """Names of a small subset of traces covering the union of all features, in pick order."""
+    uncovered = set().union(*features.values()) if features else set()
+    remaining = dict(features)
+    selected = []
+    while uncovered:
+        best = max(remaining, key=lambda name: (len(remaining[name] & uncovered), -sizes[name], name))
+        gain = remaining.pop(best) & uncovered
+        if not gain:
+            break
+        selected.append(best)
+        uncovered -= gain
+    return selected
+
+
+def coverage_report(features: Dict[str, Set[str]], sizes: Dict[str, int], selected: List[str]) -> Dict:
+    corpus = Counter(feature for names in features.values() for feature in names)
+    chosen = Counter(feature for name in selected for feature in features[name])
+
+    def table(pairs: bool):
+        return {
+            feature: {'corpus': count, 'selected': chosen[feature]}
+            for feature, count in sorted(corpus.items())
+            if (PAIR_SEPARATOR in feature) == pairs
+        }
+
+    return {
+        'traces': {'corpus': len(features), 'selected': len(selected)},
+        'states': {'corpus': sum(sizes.values()), 'selected': sum(sizes[name] for name in selected)},
+        'labels': table(pairs=False),
+        'pairs': table(pairs=True),
+        'selected': selected,
+    }
+
+
+def print_report(report: Dict):
+    traces, states = report['traces'], report['states']
+    print(f"Traces: {traces['selected']}/{traces['corpus']} kept")
+    print(f"States: {states['selected']}/{states['corpus']} kept", end='')
+    print(f" ({100 * states['selected'] / states['corpus']:.1f}%)" if states['corpus'] else '')
+    print()
+    print(f"  {'label':<40} {'corpus':>7} {'kept':>6}")
+    for label, counts in report['labels'].items():
+        print(f"  {label:<40} {counts['corpus']:>7} {counts['selected']:>6}")
+    if report['pairs']:
+        print()
+        print(f"Label pairs covered: {len(report['pairs'])}")
+        rare = [pair for pair, counts in report['pairs'].items() if counts['corpus'] == 1]
+        if rare:
+            print(f"Pairs covered by a single trace ({len(rare)}):")
+            for pair in rare:
+                print(f"  {pair}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduce an ITF trace corpus, keeping label and label-pair coverage")
+    parser.add_argument('traces_dir', type=Path)
+    parser.add_argument('output_dir', type=Path)
+    parser.add_argument('--no-pairs', action='store_true', help='only preserve coverage of single labels')
+    parser.add_argument('--report', type=Path, help=f'where to write the coverage report '
+                                                    f'(default: <output_dir>/{REPORT_NAME})')
+    args = parser.parse_args()
+
+    traces = find_traces(args.traces_dir)
+    if not traces:
+        print(f"Error: No *.itf.json or *.itf.cbor traces in {args.traces_dir}")
+        sys.exit(1)
+    if args.output_dir.resolve() == args.traces_dir.resolve():
+        print("Error: The output directory must differ from the corpus directory")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Trace Corpus Reduction")
+    print("=" * 60)
+    print(f"Corpus: {args.traces_dir} ({len(traces)} traces)")
+    print(f"Coverage: labels{'' if args.no_pairs else ' and label pairs'}")
+    print()
+
+    features, sizes = {}, {}
+    for name, copies in traces.items():
+        features[name], sizes[name] = trace_features(newest_copy(copies), pairs=not args.no_pairs)
+    if not any(features.values()):
+        print("Error: No step carries a transition label or mbt::actionTaken; "
+              "generate the traces with `quint run --mbt`")
+        sys.exit(1)
+
+    selected = greedy_cover(features, sizes)
+    report = coverage_report(features, sizes, selected)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    for name in selected:
+        for path in traces[name]:
+            shutil.copy2(path, args.output_dir / path.name)
+    report_path = args.report or args.output_dir / REPORT_NAME
+    report_path.write_text(json.dumps(report, indent=2) + '\n')
+
+    print_report(report)
+    print()
+    print(f"✓ Wrote {len(selected)} traces to {args.output_dir}")
+    print(f"✓ Coverage report: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,9 @@ crate_dir = None
 crate_name = None
 driver_name = None
 impl_type = None
+cbor_loader = False
+diff_check = False
+FLAGS = ('--cbor-loader', '--diff-check')
 
 # Derived types
 SCALARS = {'str': 'String', 'int': 'i64'}
@@ -100,21 +103,30 @@ class Struct:
         repr += '}'
         return repr
 
+    def field_comparisons(self, left, right):
+        repr = ''
+        for field in self.fields:
+            repr += f'    if {left}.{field.name} != {right}.{field.name} {{\n'
+            repr += f'        diffs.push(format!("{field.name}: spec {{:?}}, impl {{:?}}", {left}.{field.name}, {right}.{field.name}));\n'
+            repr += '    }\n'
+        return repr.rstrip('\n')
+
 def main():
-    global spec_path, main_module, test_name, crate_dir, crate_name, driver_name, impl_type
+    global spec_path, main_module, test_name, crate_dir, crate_name, driver_name, impl_type, cbor_loader, diff_check
+
+    argv = [arg for arg in sys.argv[1:] if arg not in FLAGS]
+    cbor_loader = '--cbor-loader' in sys.argv[1:]
+    diff_check = '--diff-check' in sys.argv[1:]
 
-    if len(sys.argv) < 8:
-        print('Usage: python3 project_scaffold.py <spec_path> <main_module> <test_name> <crate_dir> <crate_name> <driver_name> <impl_type>')
+    if len(argv) < 7:
+        print('Usage: python3 project_scaffold.py <spec_path> <main_module> <test_name> <crate_dir> <crate_name> <driver_name> <impl_type> [--cbor-loader] [--diff-check]')
         print('Example: python3 project_scaffold.py spec/tendermint5f/tendermint5f.qnt valid basicTest code/crates/test/mbt informalsystems-malachitebft-test-mbt Tendermint5fDriver "Driver<TestContext>"')
+        print()
+        print('--cbor-loader: also emit src/tests/cbor.rs, a loader for traces converted with itf_cbor.py')
+        print('--diff-check: after the first step only check the acting process, reporting the diverging fields (src/tests/diff.rs)')
         sys.exit(1)
 
-    spec_path = sys.argv[1]
-    main_module = sys.argv[2]
-    test_name = sys.argv[3]
-    crate_dir = sys.argv[4]
-    crate_name = sys.argv[5]
-    driver_name = sys.argv[6]
-    impl_type = sys.argv[7]
+    spec_path, main_module, test_name, crate_dir, crate_name, driver_name, impl_type = argv[:7]
 
     print('=' * 60)
     print('Creating MBT crate scaffold')
@@ -126,6 +138,8 @@ def main():
     print(f'Crate name: {crate_name}')
     print(f'Driver name: {driver_name}')
     print(f'Impl. type: {impl_type}')
+    print(f'CBOR loader: {"yes" if cbor_loader else "no"}')
+    print(f'Diff check: {"yes" if diff_check else "no"}')
     print()
 
     extract_common_types()
@@ -143,12 +157,17 @@ def create_crate():
     create_state_file()
     create_transition_file()
     create_types_file()
+    if cbor_loader:
+        create_cbor_file()
+    if diff_check:
+        create_diff_file()
     create_specs_dir()
 
 def create_cargo_file():
     write_template(
         'Cargo.toml',
-        spec_name=os.path.basename(spec_path)
+        spec_name=os.path.basename(spec_path),
+        extra_dependencies='ciborium = "0.2"\nserde_json = "1"\n' if cbor_loader else ''
     )
 
 def create_lib_file():
@@ -158,11 +177,18 @@ def create_tests_file():
     write_template(
         'src/tests.rs',
         spec_path=f'specs/{os.path.basename(spec_path)}',
+        extra_modules=('mod cbor;\n' if cbor_loader else '') + ('mod diff;\n' if diff_check else ''),
         rust_test_name=re.sub(r'([a-z])([A-Z])', r'\1_\2', test_name).lower()
     )
 
 def create_driver_file():
-    write_template('src/tests/driver.rs')
+    write_template(
+        'src/tests/driver.rs',
+        extra_imports='diff::*, ' if diff_check else '',
+        driver_fields='\n    spec_states: AssertUnwindSafe<SpecStates>,' if diff_check else '',
+        driver_field_defaults=',\n            spec_states: AssertUnwindSafe::default()' if diff_check else '',
+        check_body=read_template('src/tests/check_diff.rs' if diff_check else 'src/tests/check_full.rs').rstrip('\n')
+    )
 
 def create_state_file():
     write_template('src/tests/state.rs')
@@ -177,6 +203,15 @@ def create_types_file():
         rust_types='\n\n'.join([tpe.to_rust() for tpe in types.values()]),
     )
 
+def create_cbor_file():
+    write_template('src/tests/cbor.rs')
+
+def create_diff_file():
+    write_template(
+        'src/tests/diff.rs',
+        field_comparisons=types['StateFields'].field_comparisons('spec', 'actual')
+    )
+
 def create_specs_dir():
     src = os.path.dirname(spec_path)
     src = os.path.relpath(src, crate_dir)
@@ -184,6 +219,10 @@ def create_specs_dir():
     print(f'Creating symbolic link from {src} to {dst} ...')
     os.symlink(src, dst, target_is_directory=True)
 
+def read_template(path):
+    with open(f'{TEMPLATES_DIR}/{path}', 'r') as f:
+        return f.read()
+
 def write_template(path, **kwargs):
     src_path = f'{TEMPLATES_DIR}/{path}'
     dest_path = f'{crate_dir}/{path}'
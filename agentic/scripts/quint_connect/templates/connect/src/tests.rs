@@ -1,4 +1,4 @@
-mod driver;
+${extra_modules}mod driver;
 mod state;
 mod transition;
 mod types;
@@ -0,0 +1,235 @@
+//! Loader for ITF traces converted to CBOR by `itf_cbor.py`.
+//!
+//! The decoded CBOR value is deserialized directly into the requested state
+//! types, without going through JSON. Integers are handed to serde as native
+//! numbers (only values beyond `i64` become `{"#bigint": "..."}`), while sets,
+//! maps and tuples are presented in their ITF JSON form (`#set`, `#map`,
+//! `#tup`), so `load_trace` accepts the same state types as the JSON traces.
+//!
+//! Compare load times with:
+//! `ITF_TRACE=path/to/trace.itf.json cargo test --release bench_trace_load -- --ignored --nocapture`
+
+use std::{fs::File, io::BufReader, path::Path};
+
+use ciborium::value::Value as Cbor;
+use serde::de::{
+    self,
+    value::{Error, MapDeserializer, SeqDeserializer},
+    DeserializeOwned, Deserializer, Error as _, IntoDeserializer, Visitor,
+};
+
+const TAG_POS_BIGNUM: u64 = 2;
+const TAG_NEG_BIGNUM: u64 = 3;
+const TAG_STRINGREF: u64 = 25;
+const TAG_STRINGREF_NAMESPACE: u64 = 256;
+const TAG_SET: u64 = 258;
+const TAG_MAP: u64 = 259;
+const TAG_TUPLE: u64 = 65000;
+const TAG_NUMBER: u64 = 65001;
+
+pub fn load_trace<S: DeserializeOwned>(path: impl AsRef<Path>) -> itf::Trace<S> {
+    let path = path.as_ref();
+    let file = File::open(path).unwrap_or_else(|e| panic!("cannot open {}: {}", path.display(), e));
+    let mut value: Cbor = ciborium::de::from_reader(BufReader::new(file)).expect("invalid CBOR trace");
+    resolve_strings(&mut value, &mut Vec::new());
+    de::Deserialize::deserialize(Item(value)).expect("invalid ITF trace")
+}
+
+/// Strings enter the stringref table only if a reference to them is shorter.
+fn should_intern(table_size: usize, len: usize) -> bool {
+    let min = match table_size {
+        n if n < 24 => 3,
+        n if n < 256 => 4,
+        n if n < 65536 => 5,
+        n if (n as u64) < 1 << 32 => 7,
+        _ => 11,
+    };
+    len >= min
+}
+
+/// Replaces stringrefs by the strings they point to and drops the namespace
+/// tags. Items must be visited in document order to rebuild the string table.
+fn resolve_strings(value: &mut Cbor, strings: &mut Vec<Cbor>) {
+    match value {
+        Cbor::Text(s) if should_intern(strings.len(), s.len()) => strings.push(Cbor::Text(s.clone())),
+        Cbor::Bytes(b) if should_intern(strings.len(), b.len()) => strings.push(Cbor::Bytes(b.clone())),
+        Cbor::Array(items) => items.iter_mut().for_each(|item| resolve_strings(item, strings)),
+        Cbor::Map(entries) => entries.iter_mut().for_each(|(k, v)| {
+            resolve_strings(k, strings);
+            resolve_strings(v, strings);
+        }),
+        Cbor::Tag(TAG_STRINGREF_NAMESPACE, inner) => {
+            let mut inner = std::mem::replace(&mut **inner, Cbor::Null);
+            resolve_strings(&mut inner, &mut Vec::new());
+            *value = inner;
+        }
+        Cbor::Tag(TAG_STRINGREF, index) => match **index {
+            Cbor::Integer(i) => *value = strings[i128::from(i) as usize].clone(),
+            ref other => panic!("invalid stringref {:?}", other),
+        },
+        Cbor::Tag(_, inner) => resolve_strings(inner, strings),
+        _ => {}
+    }
+}
+
+/// A CBOR item, deserialized as the ITF JSON value it encodes.
+struct Item(Cbor);
+
+impl<'de> IntoDeserializer<'de, Error> for Item {
+    type Deserializer = Self;
+
+    fn into_deserializer(self) -> Self {
+        self
+    }
+}
+
+/// Presents `{key: value}`, the JSON wrapper of an ITF set, map, tuple or bigint.
+fn wrapped<'de, V, T>(key: &'static str, value: T, visitor: V) -> Result<V::Value, Error>
+where
+    V: Visitor<'de>,
+    T: IntoDeserializer<'de, Error>,
+{
+    visitor.visit_map(MapDeserializer::new(std::iter::once((key, value))))
+}
+
+fn integer<'de, V: Visitor<'de>>(n: i128, visitor: V) -> Result<V::Value, Error> {
+    match (u64::try_from(n), i64::try_from(n)) {
+        (Ok(n), _) => visitor.visit_u64(n),
+        (_, Ok(n)) => visitor.visit_i64(n),
+        _ => wrapped("#bigint", n.to_string(), visitor),
+    }
+}
+
+impl<'de> Deserializer<'de> for Item {
+    type Error = Error;
+
+    fn deserialize_any<V: Visitor<'de>>(self, visitor: V) -> Result<V::Value, Error> {
+        match self.0 {
+            Cbor::Integer(n) => integer(i128::from(n), visitor),
+            Cbor::Text(s) => visitor.visit_string(s),
+            Cbor::Bool(b) => visitor.visit_bool(b),
+            Cbor::Null => visitor.visit_unit(),
+            Cbor::Float(f) => visitor.visit_f64(f),
+            Cbor::Array(items) => visitor.visit_seq(SeqDeserializer::new(items.into_iter().map(Item))),
+            Cbor::Map(entries) => {
+                visitor.visit_map(MapDeserializer::new(entries.into_iter().map(|(k, v)| (Item(k), Item(v)))))
+            }
+            Cbor::Tag(TAG_SET, inner) => wrapped("#set", Item(*inner), visitor),
+            Cbor::Tag(TAG_TUPLE, inner) => wrapped("#tup", Item(*inner), visitor),
+            Cbor::Tag(TAG_MAP, inner) => match *inner {
+                Cbor::Map(entries) => {
+                    let pairs = entries.into_iter().map(|(k, v)| Cbor::Array(vec![k, v])).collect();
+                    wrapped("#map", Item(Cbor::Array(pairs)), visitor)
+                }
+                other => Err(Error::custom(format!("invalid map {:?}", other))),
+            },
+            Cbor::Tag(TAG_NUMBER, inner) => Item(*inner).deserialize_any(visitor),
+            Cbor::Tag(tag @ (TAG_POS_BIGNUM | TAG_NEG_BIGNUM), inner) => match *inner {
+                Cbor::Bytes(bytes) => wrapped("#bigint", bignum(&bytes, tag == TAG_NEG_BIGNUM), visitor),
+                other => Err(Error::custom(format!("invalid bignum {:?}", other))),
+            },
+            other => Err(Error::custom(format!("unsupported CBOR item {:?}", other))),
+        }
+    }
+
+    fn deserialize_option<V: Visitor<'de>>(self, visitor: V) -> Result<V::Value, Error> {
+        match self.0 {
+            Cbor::Null => visitor.visit_none(),
+            _ => visitor.visit_some(self),
+        }
+    }
+
+    /// Variant names, e.g. the `tag` of an ITF variant read by an adjacently tagged enum.
+    fn deserialize_enum<V: Visitor<'de>>(
+        self,
+        _name: &'static str,
+        _variants: &'static [&'static str],
+        visitor: V,
+    ) -> Result<V::Value, Error> {
+        match self.0 {
+            Cbor::Text(s) => visitor.visit_enum(s.into_deserializer()),
+            _ => self.deserialize_any(visitor),
+        }
+    }
+
+    serde::forward_to_deserialize_any! {
+        bool i8 i16 i32 i64 i128 u8 u16 u32 u64 u128 f32 f64 char str string
+        bytes byte_buf unit unit_struct newtype_struct seq tuple
+        tuple_struct map struct identifier ignored_any
+    }
+}
+
+/// Decimal form of a CBOR bignum; a negative bignum encodes -1 - n.
+fn bignum(bytes: &[u8], negative: bool) -> String {
+    let mut digits: Vec<u8> = bytes.to_vec();
+    if negative {
+        // -1 - n = -(n + 1)
+        for byte in digits.iter_mut().rev() {
+            let (sum, carry) = byte.overflowing_add(1);
+            *byte = sum;
+            if !carry {
+                break;
+            }
+        }
+        if digits.iter().all(|b| *b == 0) {
+            digits.insert(0, 1);
+        }
+    }
+
+    let mut decimal = Vec::new();
+    while digits.iter().any(|b| *b != 0) {
+        let mut remainder = 0u32;
+        for byte in digits.iter_mut() {
+            let value = (remainder << 8) | *byte as u32;
+            *byte = (value / 10) as u8;
+            remainder = value % 10;
+        }
+        decimal.push(b'0' + remainder as u8);
+    }
+    if decimal.is_empty() {
+        decimal.push(b'0');
+    }
+    if negative {
+        decimal.push(b'-');
+    }
+    decimal.reverse();
+    String::from_utf8(decimal).unwrap()
+}
+
+#[test]
+#[ignore = "benchmark, needs ITF_TRACE"]
+fn bench_trace_load() {
+    use std::time::Instant;
+
+    const ROUNDS: u32 = 10;
+
+    let json_path = std::env::var("ITF_TRACE").expect("set ITF_TRACE to an .itf.json trace");
+    let cbor_path = std::env::var("CBOR_TRACE")
+        .unwrap_or_else(|_| format!("{}.cbor", json_path.trim_end_matches(".json")));
+
+    let start = Instant::now();
+    let mut json_states = 0;
+    for _ in 0..ROUNDS {
+        let content = std::fs::read_to_string(&json_path).expect("cannot read JSON trace");
+        let trace: itf::Trace<itf::Value> = serde_json::from_str(&content).expect("invalid ITF trace");
+        json_states = trace.states.len();
+    }
+    let json_time = start.elapsed() / ROUNDS;
+
+    let start = Instant::now();
+    let mut cbor_states = 0;
+    for _ in 0..ROUNDS {
+        let trace: itf::Trace<itf::Value> = load_trace(&cbor_path);
+        cbor_states = trace.states.len();
+    }
+    let cbor_time = start.elapsed() / ROUNDS;
+
+    assert_eq!(json_states, cbor_states, "traces differ");
+    let json_size = std::fs::metadata(&json_path).unwrap().len();
+    let cbor_size = std::fs::metadata(&cbor_path).unwrap().len();
+    println!("{} states", json_states);
+    println!("JSON: {:>10?} per load, {:>10} bytes", json_time, json_size);
+    println!("CBOR: {:>10?} per load, {:>10} bytes", cbor_time, cbor_size);
+    println!("Speedup: {:.2}x", json_time.as_secs_f64() / cbor_time.as_secs_f64());
+    assert!(cbor_time < json_time, "CBOR load is not faster than JSON");
+}
@@ -0,0 +1,18 @@
+        let raw_states: BTreeMap<String, itf::Value> = step
+            .get_in(&["tendermint5f::choreo::s", "system"])
+            .expect("missing spec state");
+        // Without a "process" pick every process is checked, as in the full check
+        let spec_states = self.spec_states.changed(raw_states, self.nondet_picks(step).get("process"));
+
+        for (process, driver) in self.processes.iter() {
+            // Not the acting process: its spec state did not change
+            let Some(spec_state) = spec_states.get(process) else { continue };
+            let impl_state: SpecState = driver.into();
+
+            assert_eq!(
+                field_diffs(spec_state, &impl_state),
+                Vec::<String>::new(),
+                "spec and implementation states diverged for process {}",
+                process
+            );
+        }
@@ -0,0 +1,14 @@
+        let spec_states: BTreeMap<String, SpecState> = step
+            .get_in(&["tendermint5f::choreo::s", "system"])
+            .expect("missing spec state");
+
+        for (process, driver) in self.processes.iter() {
+            let spec_state = spec_states.get(process).expect("unkown process");
+            let impl_state = driver.into();
+
+            assert_eq!(
+                *spec_state, impl_state,
+                "spec and implementation states diverged for process {}",
+                process
+            );
+        }
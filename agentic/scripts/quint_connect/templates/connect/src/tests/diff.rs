@@ -0,0 +1,50 @@
+//! Incremental, field-level state checks for the driver.
+//!
+//! A Choreo step only rewrites the local state of the process that took it
+//! (`apply_effect` sets `system[v]`; messages and events live outside
+//! `system`), so once the acting process is known only its raw ITF value is
+//! converted and checked: the other processes' values are neither converted,
+//! cloned nor compared. Every process is checked on the first step and on
+//! steps whose acting process is unknown.
+//! `field_diffs` names the fields of `SpecState` that differ.
+
+use std::{cell::Cell, collections::BTreeMap};
+
+use itf::Value;
+
+use crate::tests::types::*;
+
+#[derive(Default)]
+pub struct SpecStates {
+    started: Cell<bool>,
+}
+
+impl SpecStates {
+    /// The spec states to check in this step: all of them on the first step
+    /// or when `acting` is unknown, otherwise the acting process's alone.
+    pub fn changed(
+        &self,
+        mut current: BTreeMap<String, Value>,
+        acting: Option<String>,
+    ) -> BTreeMap<String, SpecState> {
+        let first = !self.started.replace(true);
+        let selected = match acting {
+            Some(acting) if !first => current.remove_entry(&acting).into_iter().collect(),
+            _ => current,
+        };
+        selected
+            .into_iter()
+            .map(|(process, value)| {
+                let state = itf::from_value(value)
+                    .unwrap_or_else(|e| panic!("invalid spec state for process {}: {}", process, e));
+                (process, state)
+            })
+            .collect()
+    }
+}
+
+pub fn field_diffs(spec: &SpecState, actual: &SpecState) -> Vec<String> {
+    let mut diffs = Vec::new();
+${field_comparisons}
+    diffs
+}
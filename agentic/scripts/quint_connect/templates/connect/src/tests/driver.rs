@@ -7,16 +7,16 @@ use pretty_assertions::assert_eq;
 
 // TODO: add implementation type imports
 
-use crate::tests::{state::*, transition::*, types::*};
+use crate::tests::{${extra_imports}state::*, transition::*, types::*};
 
 pub struct ${driver_name} {
-    processes: AssertUnwindSafe<HashMap<String, ${impl_type}>>,
+    processes: AssertUnwindSafe<HashMap<String, ${impl_type}>>,${driver_fields}
 }
 
 impl ${driver_name} {
     pub fn new() -> Self {
         Self {
-            processes: AssertUnwindSafe::default()
+            processes: AssertUnwindSafe::default()${driver_field_defaults}
         }
     }
 }
@@ -39,20 +39,7 @@ impl QuintDriver for ${driver_name} {
     }
 
     fn check(&self, step: &Step) {
-        let spec_states: BTreeMap<String, SpecState> = step
-            .get_in(&["tendermint5f::choreo::s", "system"])
-            .expect("missing spec state");
-
-        for (process, driver) in self.processes.iter() {
-            let spec_state = spec_states.get(process).expect("unkown process");
-            let impl_state = driver.into();
-
-            assert_eq!(
-                *spec_state, impl_state,
-                "spec and implementation states diverged for process {}",
-                process
-            );
-        }
+${check_body}
     }
 }
 
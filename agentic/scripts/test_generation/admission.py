@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Memory-aware admission control and CPU pinning for concurrent quint runs
+
+A single quint simulator process for a large spec can use several GB, so
+starting one process per core is not safe. The AdmissionController admits a
+job only when
+
+  * the sum of the expected peak RSS of the running jobs plus this one stays
+    within the memory budget, and
+  * the system's available memory stays above a minimum free threshold,
+
+and otherwise waits (backs off) until running jobs finish or memory frees up.
+At least one job is always admitted, so a budget that is too small degrades
+to sequential execution instead of a deadlock.
+
+Expected RSS comes from the peak RSS observed on previous runs of the same
+spec tree and witness (stored in `.quint-cache/peak_rss.json`); unknown
+witnesses use the largest peak seen for the spec, or a default.
+
+Each admitted job is pinned to a core of its own, so parallel quint
+processes do not thrash each other's caches. The peak RSS of running jobs is
+sampled by a single RssSampler, which reads /proc once per tick for all of
+them.
+"""
+
+import asyncio
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from spec_cache import cache_dir, load_json, spec_hash, update_json
+
+DEFAULT_ESTIMATE = 1 << 30
+DEFAULT_MIN_FREE = 1 << 30
+BACKOFF_SECONDS = 1.0
+RSS_SAMPLE_SECONDS = 0.25
+
+SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes like '512M', '8G' or '1.5GiB' into bytes."""
+    match = SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return 'unknown'
+    for unit in ('', 'K', 'M', 'G'):
+        if size < 1024:
+            return f'{size:.0f}{unit}'
+        size /= 1024
+    return f'{size:.1f}T'
+
+
+def available_memory() -> Optional[int]:
+    """MemAvailable from /proc/meminfo, or None where it is not available."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def groups_rss(pgids: Set[int]) -> Dict[int, int]:
+    """Total resident memory of the processes in each of the given process groups."""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    totals = {pgid: 0 for pgid in pgids}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return totals
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state ppid pgrp ... rss is the 22nd
+        fields = stat[stat.rfind(')') + 2:].split()
+        if len(fields) > 21 and int(fields[2]) in totals:
+            totals[int(fields[2])] += int(fields[21]) * page_size
+    return totals
+
+
+def group_rss(pgid: int) -> int:
+    """Total resident memory of all processes in a process group."""
+    return groups_rss({pgid})[pgid]
+
+
+class RssSampler:
+    """Tracks the peak RSS of several process groups with one /proc scan per tick."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peaks: Dict[int, int] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def watch(self, pgid: int):
+        self.peaks[pgid] = 0
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._sample())
+
+    def unwatch(self, pgid: int) -> int:
+        """Stop tracking a group and return its peak RSS."""
+        return self.peaks.pop(pgid, 0)
+
+    async def _sample(self):
+        while self.peaks:
+            totals = await asyncio.to_thread(groups_rss, set(self.peaks))
+            for pgid, rss in totals.items():
+                if pgid in self.peaks:
+                    self.peaks[pgid] = max(self.peaks[pgid], rss)
+            await asyncio.sleep(self.interval)
+
+
+def usable_cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class PeakRssStore:
+    """Observed peak RSS per spec tree and job name, persisted next to the spec."""
+
+    def __init__(self):
+        self.hashes: Dict[Path, str] = {}
+
+    def _key(self, spec: Path):
+        spec = Path(spec).resolve()
+        if spec not in self.hashes:
+            self.hashes[spec] = spec_hash(spec)
+        return cache_dir(spec) / 'peak_rss.json', self.hashes[spec]
+
+    def estimate(self, spec: Path, name: str) -> Optional[int]:
+        path, key = self._key(spec)
+        peaks = load_json(path).get(key, {})
+        if name in peaks:
+            return peaks[name]
+        return max(peaks.values()) if peaks else None
+
+    def record(self, spec: Path, name: str, peak: int):
+        path, key = self._key(spec)
+
+        def update(data):
+            peaks = data.setdefault(key, {})
+            peaks[name] = max(peak, peaks.get(name, 0))
+
+        update_json(path, update)
+
+
+def peak_name(job) -> str:
+    """Peaks are kept per command: quint verify (a JVM) needs far more than a run of the same witness."""
+    return job.name if job.command == 'run' else f'{job.command} {job.name}'
+
+
+class AdmissionController:
+    """Admits jobs against a memory budget and hands out dedicated cores."""
+
+    def __init__(self, budget: Optional[int] = None, min_free: int = DEFAULT_MIN_FREE,
+                 pin: bool = True, default_estimate: int = DEFAULT_ESTIMATE):
+        if budget is None:
+            # Without an explicit budget, use what the system can give right now
+            available = available_memory()
+            budget = max(available - min_free, default_estimate) if available else None
+        self.budget = budget
+        self.min_free = min_free
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self.default_estimate = default_estimate
+        self.free_cpus: List[int] = usable_cpus()
+        self.reserved = 0
+        self.running = 0
+        self.store = PeakRssStore()
+        self.rss = RssSampler()
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def changed(self) -> asyncio.Condition:
+        # Created inside the loop that runs the jobs: the controller is built
+        # before asyncio.run starts it, and a script may run several batches
+        # (e.g. the portfolio after the main run), each in a loop of its own
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._changed, self._loop = asyncio.Condition(), loop
+        return self._changed
+
+    @property
+    def max_parallel(self) -> int:
+        return len(self.free_cpus) if self.pin else os.cpu_count() or 1
+
+    def estimate(self, job) -> int:
+        return self.store.estimate(job.spec, peak_name(job)) or self.default_estimate
+
+    def _fits(self, estimate: int) -> bool:
+        if self.running == 0:
+            return True
+        if self.pin and not self.free_cpus:
+            return False
+        if self.budget is not None and self.reserved + estimate > self.budget:
+            return False
+        available = available_memory()
+        if available is not None and available - estimate < self.min_free:
+            return False
+        return True
+
+    async def acquire(self, job) -> Dict:
+        """Wait until `job` may start; returns the slot to pass to `release`."""
+        estimate = self.estimate(job)
+        async with self.changed:
+            while not self._fits(estimate):
+                try:
+                    # Memory may free up without any job finishing: poll as well
+                    await asyncio.wait_for(self.changed.wait(), BACKOFF_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            self.reserved += estimate
+            self.running += 1
+            cpus: Optional[Set[int]] = None
+            if self.pin and self.free_cpus:
+                cpus = {self.free_cpus.pop(0)}
+        return {'estimate': estimate, 'cpus': cpus}
+
+    async def release(self, job, slot: Dict, peak_rss: Optional[int]):
+        if peak_rss:
+            self.store.record(job.spec, peak_name(job), peak_rss)
+        async with self.changed:
+            self.reserved -= slot['estimate']
+            self.running -= 1
+            if slot['cpus']:
+                self.free_cpus.extend(slot['cpus'])
+                self.free_cpus.sort()
+            self.changed.notify_all()
+
+
+def add_admission_arguments(parser):
+    """Command line options shared by the witness and trace runners."""
+    group = parser.add_argument_group('admission control')
+    group.add_argument('--memory-budget', type=parse_size, metavar='SIZE',
+                       help='total expected RSS of concurrent quint runs, e.g. 8G '
+                            '(default: available memory minus --min-free)')
+    group.add_argument('--min-free', type=parse_size, default=DEFAULT_MIN_FREE, metavar='SIZE',
+                       help='do not start new runs while free memory is below SIZE (default: 1G)')
+    group.add_argument('--no-pin', action='store_true',
+                       help='do not pin each quint run to a dedicated core')
+
+
+def admission_from_args(args) -> AdmissionController:
+    return AdmissionController(budget=args.memory_budget, min_free=args.min_free, pin=not args.no_pin)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Build manifest for generated spec artifacts
+Usage: python3 artifacts.py list <spec_dir>
+       python3 artifacts.py clean <spec_dir> [--all]
+
+The generators (gen_listener_witnesses.py, gen_type_witnesses.py, ...) write
+files such as `<spec>_instrumented.qnt`, `<spec>_configured.qnt` and
+`<spec>_witnesses.qnt` through `write_artifact`, which records in
+`.quint-cache/manifest.json` for each file:
+
+  * the generator and its version (a hash of the generator's source),
+  * the hash of each input spec tree,
+  * the generator arguments,
+  * the hash of the content written.
+
+A file is only rewritten when its content would change, so its mtime stays
+put (and mtime-keyed caches stay valid) while the inputs are unchanged.
+
+`list` shows every artifact as fresh, stale (an input or the generator
+changed since it was written), modified (edited by hand) or missing.
+`clean` removes stale artifacts, or every artifact with --all.
+"""
+
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from spec_cache import cache_dir, load_json, spec_hash, update_json
+
+MANIFEST = 'manifest.json'
+
+FRESH = 'fresh'
+STALE = 'stale'
+MODIFIED = 'modified'
+MISSING = 'missing'
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def generator_version(generator: Path) -> Optional[str]:
+    try:
+        return content_hash(Path(generator).read_bytes())
+    except OSError:
+        return None
+
+
+def manifest_path(directory: Path) -> Path:
+    return cache_dir(Path(directory) / 'any.qnt') / MANIFEST
+
+
+def write_artifact(path: Path, content: str, generator: Path, inputs: List[Path], args: Dict) -> bool:
+    """
+    Write a generated file unless it already has this content, and record it
+    in the manifest of its directory. Returns True if the file was written.
+    """
+    path = Path(path).resolve()
+    data = content.encode()
+    written = False
+    if not path.exists() or content_hash(path.read_bytes()) != content_hash(data):
+        path.write_bytes(data)
+        written = True
+
+    entry = {
+        'generator': str(Path(generator).resolve()),
+        'version': generator_version(generator),
+        'inputs': {str(Path(i).resolve()): spec_hash(i) for i in inputs},
+        'args': args,
+        'output': content_hash(data),
+    }
+
+    def update(manifest):
+        manifest[path.name] = entry
+
+    update_json(manifest_path(path.parent), update)
+    return written
+
+
+def forget_artifact(path: Path):
+    """Drop a (deleted) temporary artifact from the manifest."""
+    path = Path(path).resolve()
+    update_json(manifest_path(path.parent), lambda manifest: manifest.pop(path.name, None))
+
+
+def artifact_status(directory: Path, name: str, entry: Dict) -> str:
+    path = Path(directory) / name
+    if not path.exists():
+        return MISSING
+    if content_hash(path.read_bytes()) != entry['output']:
+        return MODIFIED
+    version = generator_version(entry['generator'])
+    if version is not None and version != entry['version']:
+        return STALE
+    for input_path, input_hash in entry['inputs'].items():
+        if not Path(input_path).exists() or spec_hash(input_path) != input_hash:
+            return STALE
+    return FRESH
+
+
+def list_artifacts(directory: Path) -> Dict[str, str]:
+    manifest = load_json(manifest_path(directory))
+    return {name: artifact_status(directory, name, entry) for name, entry in sorted(manifest.items())}
+
+
+def clean_artifacts(directory: Path, everything: bool = False) -> List[str]:
+    """Remove stale (or all) artifacts and prune missing ones from the manifest."""
+    statuses = list_artifacts(directory)
+    removed = []
+
+    def update(manifest):
+        for name, status in statuses.items():
+            if status == MISSING:
+                manifest.pop(name, None)
+            elif status == STALE or (everything and status == FRESH):
+                # Hand-edited files are never deleted
+                (Path(directory) / name).unlink(missing_ok=True)
+                manifest.pop(name, None)
+                removed.append(name)
+
+    update_json(manifest_path(directory), update)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or clean generated spec artifacts")
+    parser.add_argument('command', choices=['list', 'clean'])
+    parser.add_argument('directory', type=Path)
+    parser.add_argument('--all', action='store_true', help='with clean: remove fresh artifacts too')
+    args = parser.parse_args()
+
+    if not args.directory.is_dir():
+        print(f"Error: Not a directory: {args.directory}")
+        sys.exit(1)
+
+    if args.command == 'list':
+        statuses = list_artifacts(args.directory)
+        if not statuses:
+            print("No generated artifacts recorded")
+        for name, status in statuses.items():
+            print(f"  {status:<9} {name}")
+    else:
+        removed = clean_artifacts(args.directory, args.all)
+        for name in removed:
+            print(f"  removed {name}")
+        print(f"Removed {len(removed)} artifact(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Simulator backend calibration and automatic selection
+Usage: python3 backend.py <spec.qnt> <module_name> [--invariant NAME] [--max-steps N] [--samples N] [--force]
+Example: python3 backend.py tendermint_configured.qnt tendermint_configured --invariant witness_ProposeTriggered
+
+Which `quint run` backend is faster depends on the spec, and some specs only
+work on one of them. `calibrate` runs a short simulation with a fixed seed
+on every backend, checking a real invariant, normally a witness that is
+expected to be violated. It checks that the backends agree (all complete
+without error and report the same verdict) and records their traces/second
+in `.quint-cache/backends.json`, per spec-tree hash and main module. When
+the verdicts differ, only the backends that found the violation are
+candidates. Without an invariant only errors can be compared.
+
+The scripts default to `--backend rust`; `--backend auto` is opt-in.
+`resolve_backend(spec, main, 'auto', invariant)` returns the fastest
+backend that worked, calibrating first if this spec tree has not been
+calibrated yet (at most CALIBRATION_TIMEOUT seconds per backend); any other
+value is returned unchanged. If no backend works, 'rust' is used so that the
+witness runs report the actual error.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from quint_runner import ERROR, OK, TIMEOUT, VIOLATION, QuintJob, run_job
+from spec_cache import cache_dir, load_json, spec_hash, update_json
+
+BACKENDS = ('rust', 'typescript')
+AUTO = 'auto'
+FALLBACK = 'rust'
+CACHE_FILE = 'backends.json'
+
+CALIBRATION_SEED = '0x2a'
+CALIBRATION_STEPS = 20
+CALIBRATION_SAMPLES = 100
+CALIBRATION_TIMEOUT = 30
+
+
+async def calibrate(spec: Path, main: str, invariant: Optional[str] = None, max_steps: int = CALIBRATION_STEPS,
+                    samples: int = CALIBRATION_SAMPLES, timeout: float = CALIBRATION_TIMEOUT) -> Dict:
+    """Run every backend once, record and return {'backends', 'best', 'agree', 'invariant'}."""
+    spec = Path(spec).resolve()
+    jobs = [
+        QuintJob(name=f'calibrate_{backend}', spec=spec, main=main, invariant=invariant, max_steps=max_steps,
+                 max_samples=samples, backend=backend, seed=CALIBRATION_SEED, timeout=timeout)
+        for backend in BACKENDS
+    ]
+    # One at a time, so the backends do not compete for the CPU
+    results = [await run_job(job) for job in jobs]
+
+    backends = {}
+    for backend, result in zip(BACKENDS, results):
+        throughput = result.traces_per_second
+        # Only a run without violation is known to have simulated every sample
+        if throughput is None and result.status == OK and result.duration:
+            throughput = samples / result.duration
+        backends[backend] = {
+            'status': result.status,
+            'traces_per_second': throughput if result.status not in (ERROR, TIMEOUT) else None,
+            'error': result.error,
+        }
+
+    working = {b: data for b, data in backends.items() if data['status'] not in (ERROR, TIMEOUT)}
+    agree = len({data['status'] for data in backends.values()}) == 1 and len(working) == len(BACKENDS)
+    # A backend that misses a violation another one finds is not a candidate
+    if any(data['status'] == VIOLATION for data in working.values()):
+        working = {b: data for b, data in working.items() if data['status'] == VIOLATION}
+    best = max(working, key=lambda b: working[b]['traces_per_second'] or 0) if working else None
+    calibration = {
+        'backends': backends,
+        'best': best,
+        'agree': agree,
+        'invariant': invariant,
+        'calibrated': time.time(),
+    }
+
+    key = spec_hash(spec)
+
+    def update(data):
+        data.setdefault(key, {})[main] = calibration
+
+    update_json(cache_dir(spec) / CACHE_FILE, update)
+    return calibration
+
+
+def cached_calibration(spec: Path, main: str) -> Optional[Dict]:
+    return load_json(cache_dir(spec) / CACHE_FILE).get(spec_hash(spec), {}).get(main)
+
+
+async def resolve_backend(spec: Path, main: str, backend: str = AUTO, invariant: Optional[str] = None) -> str:
+    """Map 'auto' to the calibrated fastest backend for this spec tree, calibrating on `invariant`."""
+    if backend != AUTO:
+        return backend
+    calibration = cached_calibration(spec, main) or await calibrate(spec, main, invariant)
+    return calibration['best'] or FALLBACK
+
+
+def resolve_backend_sync(spec: Path, main: str, backend: str = AUTO, invariant: Optional[str] = None) -> str:
+    return asyncio.run(resolve_backend(spec, main, backend, invariant))
+
+
+def add_backend_argument(parser, default: str = FALLBACK):
+    parser.add_argument('--backend', choices=(AUTO,) + BACKENDS, default=default,
+                        help=f"simulator backend; 'auto' picks the fastest one that works for the spec, "
+                             f"calibrating once per spec version (default: {default})")
+
+
+def print_calibration(calibration: Dict):
+    print(f"  {'backend':<12} {'status':<10} {'traces/s':>10}")
+    for backend, data in calibration['backends'].items():
+        throughput = f"{data['traces_per_second']:.1f}" if data['traces_per_second'] is not None else '-'
+        print(f"  {backend:<12} {data['status']:<10} {throughput:>10}")
+    print()
+    if calibration.get('invariant') is None:
+        print("Note: calibrated without an invariant, only errors are compared")
+    if not calibration['agree']:
+        print("Warning: backends disagree on this spec")
+        for backend, data in calibration['backends'].items():
+            if data['error']:
+                print(f"  {backend}: {data['error']}")
+    print(f"Selected backend: {calibration['best'] or f'none works, falling back to {FALLBACK}'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate quint simulator backends for a spec")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('module_name')
+    parser.add_argument('--invariant', help='witness or invariant to compare verdicts on')
+    parser.add_argument('--max-steps', type=int, default=CALIBRATION_STEPS)
+    parser.add_argument('--samples', type=int, default=CALIBRATION_SAMPLES)
+    parser.add_argument('--force', action='store_true', help='recalibrate even if a calibration is cached')
+    args = parser.parse_args()
+
+    if not args.spec.exists():
+        print(f"Error: Spec file not found: {args.spec}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Backend Calibration")
+    print("=" * 60)
+    print(f"Spec: {args.spec}")
+    print(f"Module: {args.module_name}")
+    print(f"Invariant: {args.invariant or '(none)'}")
+    print()
+
+    calibration = None if args.force else cached_calibration(args.spec, args.module_name)
+    if calibration is None:
+        calibration = asyncio.run(calibrate(args.spec, args.module_name, args.invariant, args.max_steps, args.samples))
+    else:
+        print("(cached)")
+    print_calibration(calibration)
+
+
+if __name__ == '__main__':
+    main()
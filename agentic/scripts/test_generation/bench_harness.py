@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark the witness-runner harness against fake_quint.py
+Usage: python3 bench_harness.py [--witnesses N] [--jobs N] [--latency SECONDS] [--found-rate P] [--json FILE]
+Example: python3 bench_harness.py --witnesses 1000 --jobs 8
+
+Measures the orchestration cost of the runners without the real simulator,
+on a generated spec with N witnesses answered by fake_quint.py (see its
+docstring for the simulated behaviour):
+
+  parsing     OutputParser cost per run and throughput, on the output of a
+              violation with a long trace
+  scheduling  N zero-latency runs through QuintRunner (witness_jobs,
+              merge_shards): wall time against the ideal Σ durations / jobs,
+              i.e. the time spent in the harness rather than in the runs
+  history     the same batch with a RunHistory: overhead per job and the
+              share of jobs that get an expected duration (history hit rate)
+  speedup     runs of --latency seconds at 1, 2, 4, ... --jobs concurrent
+              processes: speedup and parallel efficiency over one process
+  caches      typecheck, backend calibration and the static pre-filter
+              (static_reachability.py, on the IR printed by the stand-in's
+              `compile`): cold and cached latency and hit rate on repeated
+              lookups, spec-tree hashing cost
+
+Every run still spawns a process (the stand-in has Python's startup cost
+instead of Node's), so the per-run durations are reported as well.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import quint_runner
+from backend import cached_calibration, calibrate, resolve_backend_sync
+from quint_runner import OutputParser, QuintJob, QuintRunner
+from run_all_witnesses import witness_jobs
+from run_history import RunHistory
+from spec_cache import spec_hash
+from static_reachability import static_unreachable
+from typecheck import typecheck_sync
+from work_queue import merge_shards
+
+FAKE_QUINT = Path(__file__).resolve().parent / 'fake_quint.py'
+MODULE = 'bench'
+
+
+def write_spec(directory: Path, witnesses: int) -> Path:
+    spec = directory / f'{MODULE}.qnt'
+    # Halted is never constructed, for the static pre-filter
+    lines = [f'module {MODULE} {{', '  type Phase = Running | Halted', '  var step: int', '  var phase: Phase',
+             '  action init = all {', '    step\' = 0,', '    phase\' = Running,', '  }',
+             '  action step = all {', '    step\' = step + 1,', '    phase\' = phase,', '  }']
+    lines += [f'  val witness_{i} = true' for i in range(witnesses)]
+    spec.write_text('\n'.join(lines + ['}']) + '\n')
+    return spec
+
+
+def write_config(path: Path, latency: float, found_rate: float):
+    path.write_text(json.dumps({
+        'run': {'latency': latency, 'found': found_rate, 'steps': 8, 'traces_per_second': 1000},
+    }))
+
+
+def use_fake_quint(config: Path):
+    """Point this process and every quint it spawns (workers included) at the stand-in."""
+    os.environ['QUINT_BIN'] = str(FAKE_QUINT)
+    os.environ['FAKE_QUINT_CONFIG'] = str(config)
+    quint_runner.QUINT = str(FAKE_QUINT)
+
+
+def bench_parsing(states: int = 200, state_width: int = 2000, repeat: int = 50) -> Dict:
+    lines = ['An example execution:', '']
+    for i in range(states):
+        lines += [f'[State {i}]', '{ s: ' + 'x' * state_width + ' }', '']
+    lines += ['[violation] Found an issue (1234ms at 812 traces/second).', 'Use --seed=0x1f2e to reproduce.']
+    size = sum(len(line) + 1 for line in lines)
+    job = QuintJob(name='w', spec=Path('bench.qnt'), invariant='w', max_steps=states)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parser = OutputParser()
+        for line in lines:
+            parser.feed(line)
+        result = parser.result(job, 1, 0.0)
+    elapsed = (time.perf_counter() - started) / repeat
+    assert result.found and result.steps == states - 1
+    return {'lines': len(lines), 'bytes': size, 'ms_per_run': elapsed * 1000,
+            'mb_per_second': size / elapsed / 1e6}
+
+
+def run_batch(spec: Path, witnesses: List[str], jobs: int, history=None) -> Dict:
+    batch = witness_jobs(spec, MODULE, witnesses, [], 10, backend='rust')
+    started = time.monotonic()
+    results = merge_shards(QuintRunner(jobs=jobs, history=history).run_sync(batch))
+    wall = time.monotonic() - started
+    durations = [r.duration for r in results]
+    ideal = sum(durations) / jobs
+    return {
+        'runs': len(results),
+        'found': sum(r.found for r in results),
+        'errors': sum(r.status == 'error' for r in results),
+        'wall': wall,
+        'mean_run': statistics.mean(durations),
+        'ideal': ideal,
+        'overhead': max(0.0, wall - ideal),
+        'overhead_per_run_ms': max(0.0, wall - ideal) / len(results) * 1000,
+    }
+
+
+def bench_history(spec: Path, witnesses: List[str], jobs: int) -> Dict:
+    history = RunHistory()
+    try:
+        # The first batch fills the history, the second one uses it
+        run_batch(spec, witnesses, jobs, history)
+        batch = witness_jobs(spec, MODULE, witnesses, [], 10, backend='rust')
+        started = time.perf_counter()
+        hits = sum(history.expected_duration(job) is not None for job in batch)
+        lookup = (time.perf_counter() - started) / len(batch)
+        stats = run_batch(spec, witnesses, jobs, history)
+    finally:
+        history.close()
+    stats.update(hit_rate=hits / len(batch), lookup_ms=lookup * 1000)
+    return stats
+
+
+def bench_speedup(spec: Path, witnesses: List[str], max_jobs: int) -> List[Dict]:
+    levels, level = [], 1
+    while level < max_jobs:
+        levels.append(level)
+        level *= 2
+    levels.append(max_jobs)
+
+    rows = []
+    for jobs in levels:
+        stats = run_batch(spec, witnesses, jobs)
+        rows.append({'jobs': jobs, 'wall': stats['wall']})
+    base = rows[0]['wall']
+    for row in rows:
+        row['speedup'] = base / row['wall']
+        row['efficiency'] = row['speedup'] / row['jobs']
+    return rows
+
+
+def bench_caches(spec: Path, lookups: int = 20) -> Dict:
+    def timed(fn):
+        started = time.perf_counter()
+        value = fn()
+        return value, time.perf_counter() - started
+
+    first, cold = timed(lambda: typecheck_sync(spec, force=True))
+    hits, warm = 0, 0.0
+    for _ in range(lookups):
+        result, elapsed = timed(lambda: typecheck_sync(spec))
+        hits += bool(result.meta.get('cached'))
+        warm += elapsed
+
+    _, calibration = timed(lambda: asyncio.run(calibrate(spec, MODULE, 'witness_0')))
+    backend_hits, resolve = 0, 0.0
+    for _ in range(lookups):
+        hit = cached_calibration(spec, MODULE) is not None
+        _, elapsed = timed(lambda: resolve_backend_sync(spec, MODULE))
+        backend_hits += hit
+        resolve += elapsed
+
+    probes = ['witness_Running_appears', 'witness_Halted_appears']
+    reasons, static_cold = timed(lambda: static_unreachable(spec, MODULE, probes, force=True))
+    static_warm = sum(timed(lambda: static_unreachable(spec, MODULE, probes))[1] for _ in range(lookups))
+
+    _, hashing = timed(lambda: spec_hash(spec))
+    return {
+        'typecheck': {'status': first.status, 'cold_ms': cold * 1000, 'cached_ms': warm / lookups * 1000,
+                      'hit_rate': hits / lookups},
+        'backend': {'calibration_ms': calibration * 1000, 'cached_ms': resolve / lookups * 1000,
+                    'hit_rate': backend_hits / lookups},
+        'static': {'cold_ms': static_cold * 1000, 'cached_ms': static_warm / lookups * 1000,
+                   'unreachable': sorted(reasons), 'probes': len(probes)},
+        'spec_hash_ms': hashing * 1000,
+    }
+
+
+def print_report(report: Dict):
+    params = report['params']
+    print("=" * 60)
+    print("Harness Benchmark (fake quint)")
+    print("=" * 60)
+    print(f"Witnesses: {params['witnesses']}, jobs: {params['jobs']}, "
+          f"latency: {params['latency']:g}s, found rate: {params['found_rate']:g}")
+    print()
+
+    p = report['parsing']
+    print(f"Parsing: {p['ms_per_run']:.2f} ms per run ({p['lines']} lines, {p['bytes'] / 1e6:.1f} MB), "
+          f"{p['mb_per_second']:.0f} MB/s")
+    print()
+
+    print(f"  {'batch':<12} {'runs':>6} {'wall s':>8} {'ideal s':>8} {'mean run ms':>12} {'overhead/run ms':>16}")
+    for name in ('scheduling', 'history'):
+        s = report[name]
+        print(f"  {name:<12} {s['runs']:>6} {s['wall']:>8.2f} {s['ideal']:>8.2f} {s['mean_run'] * 1000:>12.1f} "
+              f"{s['overhead_per_run_ms']:>16.2f}")
+    s = report['scheduling']
+    if s['errors']:
+        print(f"  ✗ {s['errors']} runs failed")
+    print(f"  History hit rate: {report['history']['hit_rate']:.0%} "
+          f"({report['history']['lookup_ms']:.2f} ms per lookup)")
+    print()
+
+    print(f"Speedup ({params['latency']:g}s runs, {params['speedup_witnesses']} witnesses):")
+    print(f"  {'jobs':>6} {'wall s':>8} {'speedup':>8} {'efficiency':>10}")
+    for row in report['speedup']:
+        print(f"  {row['jobs']:>6} {row['wall']:>8.2f} {row['speedup']:>7.2f}x {row['efficiency']:>10.0%}")
+    print()
+
+    c = report['caches']
+    print("Caches:")
+    print(f"  typecheck   cold {c['typecheck']['cold_ms']:.1f} ms, cached {c['typecheck']['cached_ms']:.2f} ms, "
+          f"hit rate {c['typecheck']['hit_rate']:.0%}")
+    print(f"  backend     calibration {c['backend']['calibration_ms']:.1f} ms, "
+          f"cached {c['backend']['cached_ms']:.2f} ms, hit rate {c['backend']['hit_rate']:.0%}")
+    print(f"  static      cold {c['static']['cold_ms']:.1f} ms, cached {c['static']['cached_ms']:.2f} ms, "
+          f"{len(c['static']['unreachable'])}/{c['static']['probes']} witnesses unreachable")
+    print(f"  spec hash   {c['spec_hash_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the witness runners against a stand-in quint")
+    parser.add_argument('--witnesses', type=int, default=500, help='witnesses in the scheduling batches')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='maximum concurrency')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per run in the speedup batches')
+    parser.add_argument('--speedup-witnesses', type=int, help='witnesses per speedup batch (default: 4 × jobs)')
+    parser.add_argument('--found-rate', type=float, default=0.3, help='probability that a witness is reached')
+    parser.add_argument('--json', type=Path, metavar='FILE', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    speedup_witnesses = args.speedup_witnesses or 4 * args.jobs
+    report = {'params': {'witnesses': args.witnesses, 'jobs': args.jobs, 'latency': args.latency,
+                         'found_rate': args.found_rate, 'speedup_witnesses': speedup_witnesses}}
+
+    with tempfile.TemporaryDirectory(prefix='bench_harness_') as tmp:
+        tmp = Path(tmp)
+        spec = write_spec(tmp, max(args.witnesses, speedup_witnesses))
+        witnesses = [f'witness_{i}' for i in range(args.witnesses)]
+        config = tmp / 'fake_quint.json'
+        use_fake_quint(config)
+
+        report['parsing'] = bench_parsing()
+
+        write_config(config, 0.0, args.found_rate)
+        report['scheduling'] = run_batch(spec, witnesses, args.jobs)
+        report['history'] = bench_history(spec, witnesses, args.jobs)
+        report['caches'] = bench_caches(spec)
+
+        write_config(config, args.latency, args.found_rate)
+        report['speedup'] = bench_speedup(spec, [f'witness_{i}' for i in range(speedup_witnesses)], args.jobs)
+
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + '\n')
+        print()
+        print(f"✓ Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
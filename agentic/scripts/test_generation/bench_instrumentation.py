@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Measure the simulation cost of listener instrumentation
+Usage: python3 bench_instrumentation.py <spec.qnt> [config] [--max-steps N] [--samples N] [--repeat R] [--seed SEED]
+Example: python3 bench_instrumentation.py consensus.qnt "N=7,f=2" --samples 500 --repeat 3
+
+Simulates the original spec and its instrumented variants (one per
+instrumentation mode of gen_listener_witnesses.py) with the same seed and
+parameters, one run at a time, and compares the traces/second reported by
+quint. The best of --repeat runs is kept for each variant.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from artifacts import forget_artifact
+from gen_listener_witnesses import (INSTRUMENTATION_MODES, create_instrumented_spec, discover_listeners,
+                                    extract_module_name)
+from quint_runner import OK, QuintJob, QuintRunner
+
+
+def wrap_with_config(spec_dir: Path, name: str, module_name: str, config: str, target: Path) -> Path:
+    wrapper = spec_dir / f'{name}.qnt'
+    wrapper.write_text(
+        f'module {name} {{\n'
+        f'  import {module_name}({config}).* from "./{target.stem}"\n'
+        f'}}\n'
+    )
+    return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare simulation throughput of instrumented and original specs")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('config', nargs='?')
+    parser.add_argument('--max-steps', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', default='0x2a')
+    parser.add_argument('--backend', default='rust')
+    args = parser.parse_args()
+
+    spec_path = args.spec.resolve()
+    if not spec_path.exists():
+        print(f"Error: Spec file not found: {spec_path}")
+        sys.exit(1)
+
+    spec_content = spec_path.read_text()
+    module_name = extract_module_name(spec_content)
+    listener_names, listener_to_action = discover_listeners(spec_content)
+    if not module_name or not listener_names:
+        print("Error: Could not find module name or listeners in spec")
+        sys.exit(1)
+
+    spec_dir = spec_path.parent
+    variants = {'original': spec_path}
+    for mode in INSTRUMENTATION_MODES:
+        path = spec_dir / f'{spec_path.stem}_bench_{mode}.qnt'
+        variants[mode] = create_instrumented_spec(spec_path, listener_names, listener_to_action, mode, path,
+                                                  spec_content=spec_content)
+
+    generated = [p for name, p in variants.items() if name != 'original']
+    jobs = []
+    for name, path in variants.items():
+        main_module = module_name
+        if args.config:
+            main_module = f'{module_name}_bench_{name}_main'
+            path = wrap_with_config(spec_dir, main_module, module_name, args.config, path)
+            generated.append(path)
+        for i in range(args.repeat):
+            jobs.append(QuintJob(
+                name=name,
+                spec=path,
+                main=main_module,
+                max_steps=args.max_steps,
+                max_samples=args.samples,
+                backend=args.backend,
+                seed=args.seed,
+                timeout=None,
+            ))
+
+    print("=" * 60)
+    print("Instrumentation Benchmark")
+    print("=" * 60)
+    print(f"Spec: {spec_path}")
+    print(f"Config: {args.config or 'none'}")
+    print(f"Samples: {args.samples}, max steps: {args.max_steps}, seed: {args.seed}, repeat: {args.repeat}")
+    print()
+
+    try:
+        # Sequential on purpose: concurrent runs would skew each other's throughput
+        results = QuintRunner(jobs=1).run_sync(jobs)
+    finally:
+        for path in generated:
+            path.unlink(missing_ok=True)
+            forget_artifact(path)
+
+    best = {}
+    for result in results:
+        if result.status != OK or result.traces_per_second is None:
+            print(f"  Warning: {result.name} run did not complete: {result.error or result.status}")
+            continue
+        best[result.name] = max(best.get(result.name, 0), result.traces_per_second)
+
+    baseline = best.get('original')
+    print(f"  {'variant':<15} {'traces/s':>10} {'vs original':>12}")
+    for name in variants:
+        if name not in best:
+            print(f"  {name:<15} {'-':>10} {'-':>12}")
+            continue
+        relative = f"{best[name] / baseline:.2f}x" if baseline else '-'
+        print(f"  {name:<15} {best[name]:>10.1f} {relative:>12}")
+
+
+if __name__ == '__main__':
+    main()
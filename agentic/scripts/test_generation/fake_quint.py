@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Stand-in `quint` executable for testing and benchmarking the witness runners
+Usage: QUINT_BIN=fake_quint.py FAKE_QUINT_CONFIG=fake.json python3 run_all_witnesses.py ...
+
+Answers the commands the agentic scripts use, with the output format of the
+real CLI, without simulating anything:
+
+  run        `[violation] Found an issue (...)` with `[State N]` lines and a
+             seed, or `[ok] No violation found (...)`; `--witnesses` prints
+             one `was witnessed in` line per predicate; `--out-itf` writes a
+             small ITF trace
+  verify     the same verdict lines as run
+  typecheck  succeeds, or prints a type error for specs matching `fail`
+  repl       answers `init`, `step`, invariants and string literals the way
+             quint_pool.py expects
+  compile    `--flatten false` prints a minimal JSON IR of the spec for
+             static_reachability.py: one module with a sum `typedef` per
+             `type T = A | B(...)` and a `def` per val/def/action whose
+             body refers to every identifier in its source text
+
+FAKE_QUINT_CONFIG names a JSON file such as
+
+  {
+    "run": {"latency": 0.1, "jitter": 0.2, "found": false, "steps": 10,
+            "traces_per_second": 1000, "memory_mb": 0},
+    "witnesses": {"witness_Decide*": {"found": true, "steps": 12, "latency": 2},
+                  "cover_*": {"witnessed": 5.0}},
+    "verify": {"latency": 1, "found": false},
+    "typecheck": {"latency": 0.5, "fail": ["*_broken.qnt"]},
+    "compile": {"latency": 0.5, "error": null},
+    "repl": {"startup": 2, "latency": 0.001}
+  }
+
+`run` holds the defaults of every run; the first `witnesses` pattern
+(fnmatch) matching the invariant overrides them, and `verify` overrides them
+for quint verify. `found` is true, false or a probability, drawn from the
+witness name and seed so a run with a given --seed is reproducible.
+`latency` is seconds per run (± `jitter` as a fraction), `memory_mb` is held
+resident while the run "simulates", `error` makes the run fail with that
+message, and `seed` fixes the reported seed.
+"""
+
+import fnmatch
+import json
+import os
+import random
+import re
+import sys
+import time
+
+DEFAULTS = {
+    'latency': 0.0,
+    'jitter': 0.0,
+    'found': False,
+    'steps': 10,
+    'traces_per_second': 1000.0,
+    'memory_mb': 0,
+    'seed': None,
+    'error': None,
+    'witnessed': 0.0,
+}
+
+MODULE_RE = re.compile(r'^\s*module\s+(\w+)')
+TYPE_RE = re.compile(r'^\s*type\s+(\w+)\s*=\s*(.*)$')
+DEF_RE = re.compile(r'^\s*(?:pure\s+)?(?:val|def|action|run|temporal|nondet)\s+(\w+)[^=]*=(.*)$')
+IDENT_RE = re.compile(r'[A-Za-z_]\w*')
+
+
+def load_config():
+    path = os.environ.get('FAKE_QUINT_CONFIG')
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def options(argv):
+    """`--name=value` and `--name value` options, plus positional arguments."""
+    opts, positional, i = {}, [], 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--witnesses':
+            opts['witnesses'] = []
+            while i + 1 < len(argv) and not argv[i + 1].startswith('--'):
+                i += 1
+                opts['witnesses'].append(argv[i])
+        elif arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            opts[name] = value
+        elif arg.startswith('--'):
+            takes_value = i + 1 < len(argv) and not argv[i + 1].startswith('--')
+            opts[arg[2:]] = argv[i + 1] if takes_value else True
+            i += takes_value
+        elif arg.startswith('-') and len(arg) == 2 and i + 1 < len(argv):
+            opts[arg[1:]] = argv[i + 1]
+            i += 1
+        else:
+            positional.append(arg)
+        i += 1
+    return opts, positional
+
+
+def settings(config, command, name):
+    merged = dict(DEFAULTS)
+    merged.update(config.get('run', {}))
+    for pattern, overrides in config.get('witnesses', {}).items():
+        if name and fnmatch.fnmatchcase(name, pattern):
+            merged.update(overrides)
+            break
+    if command == 'verify':
+        merged.update(config.get('verify', {}))
+    return merged
+
+
+def is_found(found, name, seed):
+    if isinstance(found, bool):
+        return found
+    return random.Random(f'{name}:{seed}').random() < float(found)
+
+
+def simulate(s):
+    """Sleep for the configured latency, holding the configured memory."""
+    latency = float(s['latency'])
+    if s['jitter']:
+        latency *= 1 + random.uniform(-1, 1) * float(s['jitter'])
+    ballast = None
+    if s['memory_mb']:
+        ballast = bytearray(int(s['memory_mb']) << 20)
+        for offset in range(0, len(ballast), 4096):
+            ballast[offset] = 1
+    time.sleep(max(0.0, latency))
+    return latency
+
+
+def write_itf(path, steps):
+    states = [{'#meta': {'index': i}, 'step': {'#bigint': str(i)}} for i in range(steps + 1)]
+    with open(path, 'w') as f:
+        json.dump({'#meta': {'format': 'ITF', 'source': 'fake_quint'}, 'vars': ['step'], 'states': states}, f)
+
+
+def run(command, opts, config):
+    name = opts.get('invariant')
+    s = settings(config, command, name)
+    seed = s['seed'] or opts.get('seed') or hex(random.getrandbits(48))
+    latency = simulate(s)
+    runtime = f"({int(latency * 1000)}ms at {float(s['traces_per_second']):g} traces/second)"
+
+    if s['error']:
+        print(f"error: {s['error']}")
+        return 1
+
+    found = bool(name) and is_found(s['found'], name, seed)
+    steps = int(s['steps'])
+    if opts.get('max-steps') is not None:
+        steps = min(steps, int(opts['max-steps']))
+
+    for cover in opts.get('witnesses', []):
+        percent = float(settings(config, command, cover)['witnessed'])
+        explored = int(opts.get('max-samples', 10000))
+        print(f"{cover} was witnessed in {round(explored * percent / 100)} trace(s) "
+              f"out of {explored} explored ({percent:.2f}%)")
+
+    if found:
+        print("An example execution:")
+        print()
+        for state in range(steps + 1):
+            print(f"[State {state}]")
+            print(f"{{ step: {state} }}")
+            print()
+        print(f"[violation] Found an issue {runtime}.")
+    else:
+        print(f"[ok] No violation found {runtime}.")
+    if opts.get('out-itf'):
+        write_itf(opts['out-itf'], steps if found else 0)
+    print(f"Use --seed={seed} to reproduce.")
+    if found:
+        print("error: Invariant violated")
+    return 1 if found else 0
+
+
+def typecheck(spec, config):
+    s = config.get('typecheck', {})
+    time.sleep(float(s.get('latency', 0)))
+    for pattern in s.get('fail', []):
+        if fnmatch.fnmatchcase(spec, pattern) or fnmatch.fnmatchcase(os.path.basename(spec), pattern):
+            print(f"{spec}:1:1 - error: [QNT404] Name 'fake' not found")
+            return 1
+    return 0
+
+
+def compile_ir(spec, config):
+    """Declarations by line: a definition's body runs until the next declaration."""
+    s = config.get('compile', {})
+    time.sleep(float(s.get('latency', 0)))
+    if s.get('error'):
+        print(f"error: {s['error']}", file=sys.stderr)
+        return 1
+    try:
+        with open(spec) as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    module, declarations, body = 'fake', [], None
+    for line in lines:
+        match = MODULE_RE.match(line)
+        if match:
+            module = match.group(1)
+            continue
+        match = TYPE_RE.match(line)
+        if match:
+            body = None
+            variants = [v.strip().split('(')[0].strip() for v in match.group(2).split('|')]
+            fields = [{'fieldName': v} for v in variants if v]
+            if '|' in match.group(2):
+                declarations.append({'kind': 'typedef', 'name': match.group(1),
+                                     'type': {'kind': 'sum', 'fields': {'kind': 'row', 'fields': fields}}})
+            continue
+        match = DEF_RE.match(line)
+        if match:
+            body = []
+            declarations.append({'kind': 'def', 'name': match.group(1),
+                                 'expr': {'kind': 'app', 'opcode': 'fake', 'args': body}})
+            line = match.group(2)
+        if body is not None:
+            body.extend({'kind': 'name', 'name': name} for name in IDENT_RE.findall(line))
+
+    print(json.dumps({'modules': [{'name': module, 'declarations': declarations}]}))
+    return 0
+
+
+def repl(config):
+    """Line protocol of quint_pool.ReplWorker: every expression answers one line."""
+    s = config.get('repl', {})
+    time.sleep(float(s.get('startup', 0)))
+    latency = float(s.get('latency', 0))
+    sample = step = 0
+    for line in sys.stdin:
+        line = line.strip()
+        if line == '.exit':
+            return 0
+        if latency:
+            time.sleep(latency)
+        if line.startswith('"'):
+            print(line, flush=True)
+        elif line == 'init':
+            sample += 1
+            step = 0
+            print('true', flush=True)
+        elif line == 'step':
+            step += 1
+            print('true', flush=True)
+        elif line:
+            w = settings(config, 'run', line)
+            holds = not (is_found(w['found'], line, sample) and step >= int(w['steps']))
+            print('true' if holds else 'false', flush=True)
+    return 0
+
+
+def main():
+    argv = sys.argv[1:]
+    if not argv or argv[0] in ('--version', '-V'):
+        print('0.0.0-fake')
+        return 0
+    command, (opts, positional) = argv[0], options(argv[1:])
+    config = load_config()
+    if command in ('run', 'verify'):
+        return run(command, opts, config)
+    if command == 'typecheck':
+        return typecheck(positional[0] if positional else '', config)
+    if command == 'repl':
+        return repl(config)
+    if command == 'compile' and opts.get('flatten') == 'false':
+        return compile_ir(positional[0] if positional else '', config)
+    print(f"error: fake quint does not implement '{command}'")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,49 @@
 #!/usr/bin/env python3
 """
 Simple listener discovery for Choreo specs
-Usage: python3 discover_listeners_simple.py <spec.qnt> [config] [max_steps]
+Usage: python3 discover_listeners_simple.py <spec.qnt> [config] [max_steps] [--instrumentation checked|unconditional]
+           [--sweep CONFIG ...] [--grid NAME=V1|V2 ...] [--jobs N]
 Example: python3 discover_listeners_simple.py consensus.qnt "N=7,f=2" 100
 
 Instruments all listeners with logging and tests reachability.
 User can filter out no-op listeners manually if needed.
+
+--instrumentation unconditional tags transitions without comparing the
+post-state against the current state; see create_instrumented_spec and
+bench_instrumentation.py for the trade-off.
+
+Sweep mode checks listener reachability under several configurations at
+once. Each --sweep gives a complete config; each --grid NAME=V1|V2|...
+adds a parameter to a grid whose combinations are appended to the
+positional config:
+
+  python3 gen_listener_witnesses.py consensus.qnt "N=7" 50 --grid "f=0|1|2" --jobs 8
+
+The spec is instrumented once, one `_configured_<i>` module is written per
+config, all config x listener witnesses run in parallel and a reachability
+matrix is printed. A config whose module does not typecheck is reported with
+the compiler output and its witnesses are not run.
 """
 
+import argparse
+import asyncio
+import itertools
 import re
-import subprocess
 import sys
 import tempfile
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from admission import add_admission_arguments, admission_from_args
+from backend import add_backend_argument, resolve_backend
+from artifacts import write_artifact
+from quint_runner import ERROR, OK, TIMEOUT, ConsoleSink, QuintJob, QuintRunner, RunResult, run_job
+from run_history import RunHistory
+from typecheck import print_failure, typecheck
+
+
+INSTRUMENTATION_MODES = ('checked', 'unconditional')
 
 
 def extract_module_name(spec_content):
@@ -45,20 +74,57 @@ def extract_direct_listeners(spec_content):
     return [m for m in matches if m not in builtins]
 
 
+def discover_listeners(spec_content):
+    """
+    Find all listeners of the spec.
+    Returns (sorted listener names, {listener: action}); direct listeners map to themselves.
+    """
+    cue_patterns = extract_cue_listeners(spec_content)
+    direct_listeners = extract_direct_listeners(spec_content)
+
+    listener_to_action = {}
+    for listener, action in cue_patterns:
+        listener_to_action[listener] = action
+
+    for listener in direct_listeners:
+        listener_to_action[listener] = listener
+
+    all_listener_names = sorted(set([l for l, a in cue_patterns] + direct_listeners))
+    return all_listener_names, listener_to_action
+
+
 def to_camel_case(snake_str):
     """Convert snake_case to CamelCase."""
     components = snake_str.split('_')
     return ''.join(x.title() for x in components)
 
 
-def create_instrumented_spec(spec_path: Path, listener_names: List[str], listener_to_action: Dict[str, str]):
-    """Create instrumented version of spec with logging."""
+def create_instrumented_spec(spec_path: Path, listener_names: List[str], listener_to_action: Dict[str, str],
+                             mode: str = 'checked', instrumented_path: Path = None, log=print,
+                             spec_content: Optional[str] = None):
+    """
+    Create instrumented version of spec with logging.
+
+    `spec_content` is the text of the spec if the caller already read it;
+    otherwise the spec is read from `spec_path`.
+
+    mode 'checked' (default) tags a transition only if it has effects or
+    changes the process's local state, matching the filter choreo applies.
+    mode 'unconditional' tags every transition without comparing states. It
+    is cheaper, but a transition that would have been a no-op now carries the
+    Log effect, so it is no longer filtered out and counts as a firing.
+    """
+    if mode not in INSTRUMENTATION_MODES:
+        raise ValueError(f"unknown instrumentation mode: {mode}")
+
     spec_path = spec_path.resolve()
     spec_dir = spec_path.parent
     spec_name = spec_path.stem
-    instrumented_path = spec_dir / f"{spec_name}_instrumented.qnt"
+    if instrumented_path is None:
+        instrumented_path = spec_dir / f"{spec_name}_instrumented.qnt"
 
-    spec_content = spec_path.read_text()
+    if spec_content is None:
+        spec_content = spec_path.read_text()
 
     # Generate LogType variants with default NoLog variant
     log_variants = '  | NoLog\n' + '\n'.join(f'  | {to_camel_case(l)}Triggered' for l in listener_names)
@@ -67,7 +133,7 @@ def create_instrumented_spec(spec_path: Path, listener_names: List[str], listene
     # Find the main module opening
     module_match = re.search(r'module\s+(\w+)\s*\{', spec_content)
     if not module_match:
-        print("Error: Could not find module definition")
+        log("Error: Could not find module definition")
         return None
 
     module_start = module_match.end()
@@ -107,16 +173,19 @@ type LogType =
             insert_pos = spec_content.find('\n', log_type_end) + 1
             spec_content = spec_content[:insert_pos] + custom_effects_def + spec_content[insert_pos:]
 
-    # 3. Extend Extensions/Bookkeeping type with log field
+    # 3. Extend Extensions/Bookkeeping type with the log field and a counter
+    # bumped by every Log effect, so consecutive firings of one listener
+    # (which leave `log` unchanged) can still be told apart
     def add_log_field(match):
         prefix = match.group(1)
         fields = match.group(2)
         suffix = match.group(3)
 
-        if 'log:' in fields:
-            return match.group(0)
-
-        new_fields = fields.rstrip().rstrip(',') + ',\n    log: LogType'
+        new_fields = fields.rstrip().rstrip(',')
+        if not re.search(r'\blog\s*:', fields):
+            new_fields += ',\n    log: LogType'
+        if not re.search(r'\blog_seq\s*:', fields):
+            new_fields += ',\n    log_seq: int'
         return prefix + new_fields + suffix
 
     extensions_pattern = r'(type\s+Extensions\s*=\s*\{)([^}]*?)(\n\s*\})'
@@ -127,19 +196,23 @@ type LogType =
         spec_content = re.sub(bookkeeping_pattern, add_log_field, spec_content, count=1, flags=re.DOTALL)
 
     # 4. Instrument main_listener by wrapping each listener call with .map()
-    print("  Instrumenting main_listener calls...")
+    log("  Instrumenting main_listener calls...")
 
     for listener in listener_names:
         action = listener_to_action.get(listener, listener)
         camel = to_camel_case(listener)
 
-        # Conditional logging: only log if transition does something
-        map_wrapper = (
-            f'.map(t => '
-            f'if (t.effects.size() > 0 or t.post_state != ctx.state) '
-            f'{{ ...t, effects: t.effects.union(Set(choreo::CustomEffect(Log({camel}Triggered)))) }} '
-            f'else t)'
-        )
+        tagged = f'{{ ...t, effects: t.effects.union(Set(choreo::CustomEffect(Log({camel}Triggered)))) }}'
+        if mode == 'unconditional':
+            map_wrapper = f'.map(t => {tagged})'
+        else:
+            # Conditional logging: only log if transition does something
+            map_wrapper = (
+                f'.map(t => '
+                f'if (t.effects.size() > 0 or t.post_state != ctx.state) '
+                f'{tagged} '
+                f'else t)'
+            )
 
         # Pattern 1: choreo::cue(ctx, listener, action)
         cue_pattern = rf'(choreo::cue\s*\(\s*ctx\s*,\s*{re.escape(listener)}\s*,\s*{re.escape(action)}\s*\))'
@@ -160,15 +233,18 @@ type LogType =
         prefix = initial_bookkeeping_match.group(1)
         suffix = initial_bookkeeping_match.group(2)
 
-        # Check if log field is already present
-        if 'log:' not in prefix:
-            # Add log field with NoLog default
-            new_prefix = prefix.rstrip().rstrip(',') + ',\n    log: NoLog\n  '
-            spec_content = spec_content[:initial_bookkeeping_match.start()] + new_prefix + suffix + spec_content[initial_bookkeeping_match.end():]
+        # Add the log fields that are not already present, with NoLog and 0 defaults
+        new_prefix = prefix.rstrip().rstrip(',')
+        if not re.search(r'\blog\s*:', prefix):
+            new_prefix += ',\n    log: NoLog'
+        if not re.search(r'\blog_seq\s*:', prefix):
+            new_prefix += ',\n    log_seq: 0'
+        new_prefix += '\n  '
+        spec_content = spec_content[:initial_bookkeeping_match.start()] + new_prefix + suffix + spec_content[initial_bookkeeping_match.end():]
 
     # 6. Ensure val s = choreo::s exists (needed for witnesses)
     if not re.search(r'val\s+s\s*=\s*choreo::s', spec_content):
-        print("  Adding 'val s = choreo::s' for witness access...")
+        log("  Adding 'val s = choreo::s' for witness access...")
         # Find the last action or val definition before closing brace
         module_end = spec_content.rfind('}')
         if module_end != -1:
@@ -191,7 +267,7 @@ type LogType =
                         depth -= 1
                         if depth == 0:
                             log_case = """
-      | Log(logType) => { ...env, extensions: { ...env.extensions, log: logType } }
+      | Log(logType) => { ...env, extensions: { ...env.extensions, log: logType, log_seq: env.extensions.log_seq + 1 } }
 """
                             spec_content = spec_content[:i] + log_case + '    ' + spec_content[i:]
                             break
@@ -202,7 +278,7 @@ type LogType =
 // === INSTRUMENTATION: Custom Effect Handler ===
 pure def apply_custom_effect(env: choreo::GlobalContext, effect: CustomEffects): choreo::GlobalContext =
   match effect {
-    | Log(logType) => { ...env, extensions: { ...env.extensions, log: logType } }
+    | Log(logType) => { ...env, extensions: { ...env.extensions, log: logType, log_seq: env.extensions.log_seq + 1 } }
   }
 // === END INSTRUMENTATION ===
 
@@ -214,7 +290,8 @@ pure def apply_custom_effect(env: choreo::GlobalContext, effect: CustomEffects):
         else:
             spec_content = spec_content + '\n' + apply_custom_effect
 
-    instrumented_path.write_text(spec_content)
+    write_artifact(instrumented_path, spec_content, Path(__file__), [spec_path],
+                   {'listeners': listener_names, 'mode': mode})
     return instrumented_path
 
 
@@ -242,63 +319,198 @@ def run_witness(spec_dir, spec_name, module_name, config, listener, max_steps):
 '''
         f.write(witness_code)
 
-    try:
-        cmd = [
-            'quint', 'run', str(witness_file),
-            '--main=witness_test',
-            f'--invariant={witness_name}',
-            f'--max-steps={max_steps}',
-            '--max-samples=1000',
-            '--backend=rust'
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        output = result.stdout + result.stderr
-
-        if 'violation' in output.lower():
-            seed_match = re.search(r'seed:\s*([a-f0-9]+)', output, re.IGNORECASE)
-            steps_match = re.search(r'step\s+(\d+)', output, re.IGNORECASE)
-
-            return {
-                'found': True,
-                'seed': seed_match.group(1) if seed_match else 'unknown',
-                'steps': int(steps_match.group(1)) if steps_match else max_steps
-            }
-        else:
-            return {'found': False}
+    job = QuintJob(
+        name=witness_name,
+        spec=witness_file,
+        main='witness_test',
+        invariant=witness_name,
+        max_steps=max_steps,
+        max_samples=1000,
+        backend='rust',
+        timeout=60,
+    )
 
-    except subprocess.TimeoutExpired:
-        return {'found': False}
-    except Exception as e:
-        print(f"Warning: Error running witness for {listener}: {e}")
-        return {'found': False}
+    try:
+        result = asyncio.run(run_job(job))
+        if result.status == ERROR:
+            print(f"Warning: Error running witness for {listener}: {result.error}")
+        return result.to_dict()
     finally:
         witness_file.unlink(missing_ok=True)
 
 
+def create_configured_spec(spec_path: Path, module_name: str, config: str, listener_names: List[str],
+                           instrumented_path: Path, suffix: str = ''):
+    """Instantiate the instrumented spec with `config` (if any) and add one witness per listener."""
+    spec_path = spec_path.resolve()
+    configured_spec_path = spec_path.parent / f"{spec_path.stem}_configured{suffix}.qnt"
+
+    # Build the full module content
+    module_lines = []
+    module_lines.append(f'module {module_name}_configured{suffix} {{')
+    module_lines.append(f'  import basicSpells.* from "./spells/basicSpells"')
+    if config:
+        module_lines.append(f'  import {module_name}({config}).* from "./{instrumented_path.stem}"')
+    else:
+        module_lines.append(f'  import {module_name}.* from "./{instrumented_path.stem}"')
+    module_lines.append('')
+
+    # Add witness definitions for each listener
+    for listener in listener_names:
+        camel = to_camel_case(listener)
+        witness_name = f"witness_{camel}Triggered"
+        module_lines.append(f'  val {witness_name} = match s.extensions.log {{')
+        module_lines.append(f'    | {camel}Triggered => false')
+        module_lines.append(f'    | _ => true')
+        module_lines.append(f'  }}')
+        module_lines.append('')
+
+    # Close module
+    module_lines.append('}')
+
+    write_artifact(configured_spec_path, '\n'.join(module_lines), Path(__file__), [spec_path, instrumented_path],
+                   {'config': config, 'listeners': listener_names})
+    return configured_spec_path
+
+
+def expand_configs(base: str, sweeps: List[str], grid: List[str]) -> List[str]:
+    """Configs to sweep: every --sweep entry, plus base extended by every grid combination."""
+    configs = list(sweeps)
+    if grid:
+        axes = []
+        for entry in grid:
+            name, sep, values = entry.partition('=')
+            if not sep or not values:
+                raise ValueError(f"--grid expects NAME=V1|V2|..., got: {entry}")
+            axes.append([f'{name.strip()}={value.strip()}' for value in values.split('|')])
+        for combination in itertools.product(*axes):
+            configs.append(', '.join(([base] if base else []) + list(combination)))
+    return configs
+
+
+def sweep(spec_path: Path, module_name: str, configs: List[str], listener_names: List[str],
+          instrumented_path: Path, max_steps: int, runner: QuintRunner,
+          backend: str = 'rust') -> Dict[str, List[RunResult]]:
+    """
+    Run every listener witness under every config; returns listener -> result per config.
+    Configs whose module does not typecheck are not run; their results are errors.
+    With backend 'auto', each configured module runs on its calibrated backend
+    (calibrated on the first listener witness).
+    """
+    configured = [
+        create_configured_spec(spec_path, module_name, config, listener_names, instrumented_path, suffix=f'_{i}')
+        for i, config in enumerate(configs)
+    ]
+
+    async def prepare(i, path):
+        result = await typecheck(path)
+        if result.status != OK:
+            return result, None
+        return result, await resolve_backend(path, f'{module_name}_configured_{i}', backend,
+                                             f"witness_{to_camel_case(listener_names[0])}Triggered")
+
+    async def prepare_all():
+        return await asyncio.gather(*(prepare(i, path) for i, path in enumerate(configured)))
+
+    matrix = {listener: [None] * len(configs) for listener in listener_names}
+    jobs = []
+    for i, (path, (check, config_backend)) in enumerate(zip(configured, asyncio.run(prepare_all()))):
+        if check.status != OK:
+            print_failure(path, check)
+            print()
+            for listener in listener_names:
+                matrix[listener][i] = RunResult(listener, ERROR, error='typecheck failed')
+            continue
+        for listener in listener_names:
+            witness_name = f"witness_{to_camel_case(listener)}Triggered"
+            jobs.append(QuintJob(
+                name=f"{witness_name}@{i}",
+                spec=path,
+                main=f'{module_name}_configured_{i}',
+                invariant=witness_name,
+                max_steps=max_steps,
+                max_samples=1000,
+                backend=config_backend,
+                timeout=60,
+                meta={'listener': listener, 'config': i},
+            ))
+
+    for result in runner.run_sync(jobs):
+        matrix[result.meta['listener']][result.meta['config']] = result
+    return matrix
+
+
+def print_matrix(matrix, configs: List[str]):
+    def cell(result):
+        if result.found:
+            return '✓'
+        return {OK: '✗', TIMEOUT: 'T', ERROR: 'E'}.get(result.status, '?')
+
+    width = max(len(listener) for listener in matrix)
+    print("=" * 60)
+    print("Reachability Matrix")
+    print("=" * 60)
+    print((f"  {'listener':<{width}}  " + ' '.join(f'c{i:<3}' for i in range(len(configs)))).rstrip())
+    for listener, results in matrix.items():
+        print((f"  {listener:<{width}}  " + ' '.join(f'{cell(r):<4}' for r in results)).rstrip())
+    print()
+    print("Configs:")
+    for i, config in enumerate(configs):
+        reachable = sum(1 for results in matrix.values() if results[i].found)
+        print(f"  c{i}: {config}  ({reachable}/{len(matrix)} reachable)")
+    print()
+    print("✓ reachable  ✗ not found  T timeout  E error")
+
+    never = [listener for listener, results in matrix.items() if not any(r.found for r in results)]
+    if never:
+        print()
+        print("✗ Unreachable under every config:")
+        for listener in never:
+            print(f"  • {listener}")
+    print()
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 discover_listeners_simple.py <spec.qnt> [config] [max_steps]")
-        print("Example: python3 discover_listeners_simple.py consensus.qnt 'N=7,f=2' 100")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Instrument listeners of a Choreo spec and test their reachability")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('config', nargs='?')
+    parser.add_argument('max_steps', type=int, nargs='?', default=100)
+    parser.add_argument('--instrumentation', choices=INSTRUMENTATION_MODES, default='checked')
+    parser.add_argument('--sweep', action='append', default=[], metavar='CONFIG',
+                        help='sweep over this config (repeatable)')
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1|V2',
+                        help='sweep over the values of a parameter, combined with config (repeatable)')
+    parser.add_argument('--jobs', '-j', type=int, metavar='N',
+                        help='with a sweep, maximum number of concurrent quint processes')
+    add_backend_argument(parser)
+    add_admission_arguments(parser)
+    args = parser.parse_args()
+
+    spec_path = args.spec
+    config = args.config
+    max_steps = args.max_steps
+    mode = args.instrumentation
 
-    spec_path = Path(sys.argv[1])
-    config = sys.argv[2] if len(sys.argv) > 2 else None
-    max_steps = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    try:
+        configs = expand_configs(config, args.sweep, args.grid)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     if not spec_path.exists():
         print(f"Error: Spec file not found: {spec_path}")
         sys.exit(1)
 
-    spec_dir = spec_path.parent
-    spec_name = spec_path.stem
-
     print("=" * 60)
     print("Listener Discovery")
     print("=" * 60)
     print(f"Spec: {spec_path}")
-    print(f"Config: {config or 'none'}")
+    if configs:
+        print(f"Configs: {len(configs)} (sweep)")
+    else:
+        print(f"Config: {config or 'none'}")
     print(f"Max steps: {max_steps}")
+    print(f"Instrumentation: {mode}")
     print()
 
     spec_content = spec_path.read_text()
@@ -312,17 +524,7 @@ def main():
 
     # Extract listeners and actions
     print("Extracting listeners...")
-    cue_patterns = extract_cue_listeners(spec_content)
-    direct_listeners = extract_direct_listeners(spec_content)
-
-    listener_to_action = {}
-    for listener, action in cue_patterns:
-        listener_to_action[listener] = action
-
-    for listener in direct_listeners:
-        listener_to_action[listener] = listener
-
-    all_listener_names = sorted(set([l for l, a in cue_patterns] + direct_listeners))
+    all_listener_names, listener_to_action = discover_listeners(spec_content)
 
     if not all_listener_names:
         print("No listeners found!")
@@ -339,41 +541,33 @@ def main():
 
     # Create instrumented spec
     print("Creating instrumented spec...")
-    instrumented_path = create_instrumented_spec(spec_path, all_listener_names, listener_to_action)
+    instrumented_path = create_instrumented_spec(spec_path, all_listener_names, listener_to_action, mode,
+                                                 spec_content=spec_content)
     if instrumented_path is None:
         print("Error: Failed to create instrumented spec")
         sys.exit(1)
     print(f"✓ Instrumented spec: {instrumented_path}")
     print()
 
+    if configs:
+        print(f"Sweeping {len(configs)} configs x {len(all_listener_names)} listeners...")
+        history = RunHistory()
+        try:
+            runner = QuintRunner(jobs=args.jobs, sinks=[ConsoleSink()], admission=admission_from_args(args),
+                                 history=history)
+            matrix = sweep(spec_path, module_name, configs, all_listener_names, instrumented_path, max_steps,
+                           runner, args.backend)
+        finally:
+            history.close()
+        print()
+        print_matrix(matrix, configs)
+        return
+
     # Create a new instanciation of the spec with config if provided
     if config:
         print("Creating configured spec instanciation...")
-        configured_spec_path = spec_dir / f"{spec_name}_configured.qnt"
-
-        # Build the full module content
-        module_lines = []
-        module_lines.append(f'module {module_name}_configured {{')
-        module_lines.append(f'  import basicSpells.* from "./spells/basicSpells"')
-        module_lines.append(f'  import {module_name}({config}).* from "./{instrumented_path.stem}"')
-        module_lines.append('')
-
-        # Add witness definitions for each listener
-        for listener in all_listener_names:
-            camel = to_camel_case(listener)
-            witness_name = f"witness_{camel}Triggered"
-            module_lines.append(f'  val {witness_name} = match s.extensions.log {{')
-            module_lines.append(f'    | {camel}Triggered => false')
-            module_lines.append(f'    | _ => true')
-            module_lines.append(f'  }}')
-            module_lines.append('')
-
-        # Close module
-        module_lines.append('}')
-
-        # Write the complete file
-        configured_spec_path.write_text('\n'.join(module_lines))
-
+        configured_spec_path = create_configured_spec(spec_path, module_name, config, all_listener_names,
+                                                      instrumented_path)
         print(f"✓ Configured spec: {configured_spec_path}")
         print()
 
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 """
 Generate witnesses for sum type variants in Choreo specs
-Usage: python3 gen_witnesses.py <spec.qnt> TYPE ACCESS_EXPR [TYPE ACCESS_EXPR ...] [--config CONFIG]
+Usage: python3 gen_witnesses.py <spec.qnt> TYPE ACCESS_EXPR [TYPE ACCESS_EXPR ...] [--config CONFIG] [--combined]
 
 Arguments:
   spec.qnt        Path to the Quint spec file
   TYPE            Name of a sum type to generate witnesses for
   ACCESS_EXPR     Quint expression that evaluates to a collection of values of that type
   --config        Optional configuration string for module instantiation
+  --combined      Generate one coverage val per type instead of one invariant per variant
 
 Example:
   python3 gen_witnesses.py tendermint.qnt \
@@ -18,6 +19,14 @@ Example:
 
 The ACCESS_EXPR should be a Quint expression that produces a collection (Set, List, or via .map())
 of values of the specified TYPE, starting from 's' (the global state).
+
+By default every variant gets its own `witness_<Variant>_appears` invariant,
+which re-evaluates ACCESS_EXPR and needs a quint run of its own. With
+--combined, each type gets a single `tags_<TYPE>` val holding the set of
+variant names present in the current state, and each variant a
+`cover_<Variant>` predicate on that set. run_all_witnesses.py checks all
+`cover_` vals in one `quint run --witnesses` run and reports which variants
+were seen.
 """
 
 import re
@@ -25,6 +34,8 @@ import sys
 from pathlib import Path
 from typing import List, Tuple
 
+from artifacts import write_artifact
+
 
 def extract_module_name(spec_content):
     """Extract module name from spec."""
@@ -84,18 +95,29 @@ def has_variant_parameter(spec_content, type_name, variant_name):
     return bool(re.search(variant_pattern, type_def))
 
 
-def generate_witness_spec(spec_path, module_name, config, type_access_pairs):
+def match_pattern(spec_content, type_name, variant):
+    if has_variant_parameter(spec_content, type_name, variant):
+        return f'{variant}(_)'
+    return variant
+
+
+def generate_witness_spec(spec_path, module_name, config, type_access_pairs, combined=False, log=print,
+                          spec_content=None):
     """
     Generate a witness spec file.
 
     Args:
         type_access_pairs: List of (type_name, access_expression) tuples
+        combined: Emit per-type coverage vals instead of per-variant invariants
+        log: Called with progress messages
+        spec_content: Text of the spec if already read; otherwise read from spec_path
     """
     spec_dir = spec_path.parent
     spec_name = spec_path.stem
     witness_spec_path = spec_dir / f"{spec_name}_witnesses.qnt"
 
-    spec_content = spec_path.read_text()
+    if spec_content is None:
+        spec_content = spec_path.read_text()
 
     module_lines = []
     module_lines.append(f'module {module_name}_witnesses {{')
@@ -115,32 +137,42 @@ def generate_witness_spec(spec_path, module_name, config, type_access_pairs):
         variants = extract_type_variants(spec_content, type_name)
 
         if not variants:
-            print(f"  Warning: No variants found for type '{type_name}'")
+            log(f"  Warning: No variants found for type '{type_name}'")
             continue
 
-        print(f"  Type '{type_name}': found {len(variants)} variants")
+        log(f"  Type '{type_name}': found {len(variants)} variants")
         for variant in variants:
-            print(f"    • {variant}")
+            log(f"    • {variant}")
+
+        if combined:
+            # Traverse the state once per type; every cover_ val reads the same set
+            module_lines.append(f'  // Coverage for {type_name}')
+            module_lines.append(f'  val tags_{type_name} =')
+            module_lines.append(f'    ({access_expr}).fold(Set(), (acc, x) => match x {{')
+            for variant in variants:
+                module_lines.append(f'      | {match_pattern(spec_content, type_name, variant)} => acc.union(Set("{variant}"))')
+            module_lines.append(f'      | _ => acc')
+            module_lines.append(f'    }})')
+            module_lines.append('')
+
+            for variant in variants:
+                witness_name = f"cover_{variant}"
+                all_variants.append((witness_name, type_name, variant))
+                module_lines.append(f'  val {witness_name} = tags_{type_name}.contains("{variant}")')
+            module_lines.append('')
+            continue
 
         module_lines.append(f'  // Witnesses for {type_name}')
 
         for variant in variants:
             witness_name = f"witness_{variant}_appears"
             all_variants.append((witness_name, type_name, variant))
-
-            # Check if variant has parameters
-            has_params = has_variant_parameter(spec_content, type_name, variant)
-
-            # Generate match pattern
-            if has_params:
-                match_pattern = f'{variant}(_)'
-            else:
-                match_pattern = variant
+            pattern = match_pattern(spec_content, type_name, variant)
 
             # Generate witness
             module_lines.append(f'  val {witness_name} =')
             module_lines.append(f'    ({access_expr}).forall(x => match x {{')
-            module_lines.append(f'      | {match_pattern} => false  // Violation: {variant} found!')
+            module_lines.append(f'      | {pattern} => false  // Violation: {variant} found!')
             module_lines.append(f'      | _ => true')
             module_lines.append(f'    }})')
             module_lines.append('')
@@ -149,28 +181,33 @@ def generate_witness_spec(spec_path, module_name, config, type_access_pairs):
 
     module_lines.append('}')
 
-    witness_spec_path.write_text('\n'.join(module_lines))
+    write_artifact(witness_spec_path, '\n'.join(module_lines), Path(__file__), [spec_path],
+                   {'config': config, 'types': [list(pair) for pair in type_access_pairs], 'combined': combined})
     return witness_spec_path, all_variants
 
 
 def parse_args(args):
-    """Parse command line arguments into (spec_path, type_access_pairs, config)."""
+    """Parse command line arguments into (spec_path, type_access_pairs, config, combined)."""
     if len(args) < 3:
-        return None, None, None
+        return None, None, None, False
 
     spec_path = Path(args[0])
     config = None
+    combined = False
     type_access_pairs = []
 
     i = 1
     while i < len(args):
-        if args[i] == '--config':
+        if args[i] == '--combined':
+            combined = True
+            i += 1
+        elif args[i] == '--config':
             if i + 1 < len(args):
                 config = args[i + 1]
                 i += 2
             else:
                 print("Error: --config requires a value")
-                return None, None, None
+                return None, None, None, False
         else:
             # Expect TYPE ACCESS_EXPR pair
             if i + 1 < len(args) and not args[i + 1].startswith('--'):
@@ -180,9 +217,9 @@ def parse_args(args):
                 i += 2
             else:
                 print(f"Error: Expected ACCESS_EXPR after TYPE '{args[i]}'")
-                return None, None, None
+                return None, None, None, False
 
-    return spec_path, type_access_pairs, config
+    return spec_path, type_access_pairs, config, combined
 
 
 def main():
@@ -190,7 +227,7 @@ def main():
         print(__doc__)
         sys.exit(1)
 
-    spec_path, type_access_pairs, config = parse_args(sys.argv[1:])
+    spec_path, type_access_pairs, config, combined = parse_args(sys.argv[1:])
 
     if spec_path is None or not type_access_pairs:
         print(__doc__)
@@ -206,6 +243,8 @@ def main():
     print(f"Spec: {spec_path}")
     print(f"Config: {config or 'none'}")
     print(f"Types to witness: {len(type_access_pairs)}")
+    if combined:
+        print("Form: combined coverage (one run for all variants)")
     print()
 
     spec_content = spec_path.read_text()
@@ -220,7 +259,7 @@ def main():
 
     print("Extracting variants...")
     witness_spec, all_variants = generate_witness_spec(
-        spec_path, module_name, config, type_access_pairs
+        spec_path, module_name, config, type_access_pairs, combined, spec_content=spec_content
     )
 
     print()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Portfolio runs for witnesses that simulation did not find
+
+Random simulation can only show that a witness is reachable; "not found in
+1000 samples" says nothing about whether it is reachable at all. For such
+witnesses `race` starts, at the same time,
+
+  * a larger simulation (more samples, a fresh seed), and
+  * a bounded `quint verify --max-steps=K` run (Apalache), if a model
+    checker can be run here (see verifier_available),
+
+and takes the first conclusive answer, cancelling the other run:
+
+  reachable     either engine found a trace violating the witness invariant
+  unreachable   quint verify found no violation: proved unreachable within
+                K steps (not beyond)
+  not found     neither engine was conclusive (simulation found nothing,
+                verify timed out, failed or was not available)
+
+Given a QuintRunner, both runs go through its `execute`, so with admission
+control (see admission.py) the JVM of quint verify is admitted against the
+memory budget and pinned like any other quint process.
+"""
+
+import asyncio
+import os
+import random
+import shutil
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from quint_runner import OK, QuintJob, QuintRunner, RunResult, run_job
+
+REACHABLE = 'reachable'
+UNREACHABLE = 'unreachable'
+NOT_FOUND = 'not found'
+
+SIMULATE = 'simulate'
+VERIFY = 'verify'
+
+DEFAULT_SAMPLES = 10000
+DEFAULT_TIMEOUT = 600
+
+
+def verifier_available() -> bool:
+    """quint verify fetches Apalache on first use, but Apalache needs a JVM."""
+    return shutil.which('java') is not None or bool(os.environ.get('JAVA_HOME'))
+
+
+def portfolio_jobs(job: QuintJob, samples: int, verify_steps: Optional[int], timeout: float) -> Dict[str, QuintJob]:
+    jobs = {
+        SIMULATE: replace(job, max_samples=samples, seed=hex(random.getrandbits(48)), timeout=timeout,
+                          meta={**job.meta, 'engine': SIMULATE}),
+    }
+    if verify_steps is not None:
+        jobs[VERIFY] = QuintJob(
+            name=job.name,
+            spec=job.spec,
+            command='verify',
+            main=job.main,
+            invariant=job.invariant,
+            max_steps=verify_steps,
+            timeout=timeout,
+            cwd=job.cwd,
+            meta={**job.meta, 'engine': VERIFY},
+        )
+    return jobs
+
+
+async def race(job: QuintJob, samples: int = DEFAULT_SAMPLES, verify_steps: Optional[int] = None,
+               timeout: float = DEFAULT_TIMEOUT, runner: Optional[QuintRunner] = None) -> Dict:
+    """
+    Race a larger simulation against bounded verification (when verify_steps
+    is given) and return {'verdict', 'engine', 'bound', 'result', 'results'}.
+    With a `runner`, the runs go through its admission control.
+    """
+    execute = runner.execute if runner is not None else run_job
+    tasks = {asyncio.create_task(execute(engine_job)): engine
+             for engine, engine_job in portfolio_jobs(job, samples, verify_steps, timeout).items()}
+    results: Dict[str, RunResult] = {}
+    outcome = {'verdict': NOT_FOUND, 'engine': None, 'bound': None, 'result': None}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                engine = tasks[task]
+                result = results[engine] = task.result()
+                if result.found:
+                    outcome.update(verdict=REACHABLE, engine=engine, result=result)
+                elif engine == VERIFY and result.status == OK:
+                    outcome.update(verdict=UNREACHABLE, engine=engine, bound=verify_steps, result=result)
+                else:
+                    continue
+                return {**outcome, 'results': results}
+    finally:
+        # The losing run is cancelled, which kills its quint process group
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return {**outcome, 'results': results}
+
+
+async def race_all(jobs: List[QuintJob], concurrency: int, **options) -> List[Dict]:
+    """Race every job; each race runs up to two quint processes (see `race` for the options)."""
+    semaphore = asyncio.Semaphore(max(1, concurrency // 2))
+
+    async def one(job):
+        async with semaphore:
+            return await race(job, **options)
+
+    return await asyncio.gather(*(one(job) for job in jobs))
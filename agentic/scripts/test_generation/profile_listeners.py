@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Profile how often each listener of a Choreo spec fires
+Usage: python3 profile_listeners.py <spec.qnt> [config] [--traces N] [--max-steps N] [--jobs N] [--json FILE]
+Example: python3 profile_listeners.py consensus.qnt "N=7,f=2" --traces 200 --max-steps 50
+
+Instruments the spec with the same LogType logging as
+gen_listener_witnesses.py, simulates it with `quint run --out-itf` and reads
+the `extensions.log` field of every ITF state. A step is attributed to the
+listener whose log tag it carries; a step that leaves the state unchanged is
+a no-op (no listener produced a transition). `log` keeps its value until the
+next tagged transition, so the instrumentation also bumps `extensions.log_seq`
+on every Log effect: a step is tagged when `log_seq` changed, which counts
+consecutive firings of the same listener, and untagged otherwise.
+
+Reports, per listener, how many steps it fired and its share of all
+transitions, in how many traces it fired and the step at which it first
+fired. Listeners that never fired are called out separately.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from artifacts import write_artifact
+from backend import add_backend_argument, resolve_backend_sync
+from gen_listener_witnesses import create_instrumented_spec, discover_listeners, extract_module_name, to_camel_case
+from quint_runner import ERROR, QuintJob, QuintRunner
+
+UNATTRIBUTED = '(unattributed)'
+
+
+def find_choreo_state(state: Dict) -> Optional[Dict]:
+    """The choreo global context is the variable holding `extensions`."""
+    for name, value in state.items():
+        if name.startswith('#') or name.startswith('mbt::'):
+            continue
+        if isinstance(value, dict) and 'extensions' in value:
+            return value
+    return None
+
+
+def log_tag(state: Dict) -> Optional[str]:
+    choreo_state = find_choreo_state(state)
+    if choreo_state is None:
+        return None
+    log = choreo_state['extensions'].get('log')
+    return log.get('tag') if isinstance(log, dict) else None
+
+
+def log_seq(state: Dict) -> Optional[int]:
+    """The number of Log effects applied so far (`extensions.log_seq`)."""
+    choreo_state = find_choreo_state(state)
+    if choreo_state is None:
+        return None
+    seq = choreo_state['extensions'].get('log_seq')
+    if isinstance(seq, dict) and '#bigint' in seq:
+        return int(seq['#bigint'])
+    return seq if isinstance(seq, int) else None
+
+
+def comparable(state: Dict) -> Dict:
+    return {k: v for k, v in state.items() if not k.startswith('#') and not k.startswith('mbt::')}
+
+
+def profile_traces(trace_paths: List[Path], tag_to_listener: Dict[str, str]) -> Dict:
+    """Aggregate listener firings over a set of ITF traces."""
+    fires = {listener: 0 for listener in tag_to_listener.values()}
+    traces_fired = {listener: 0 for listener in tag_to_listener.values()}
+    first_fire = {listener: [] for listener in tag_to_listener.values()}
+    fires[UNATTRIBUTED] = 0
+    total_steps = 0
+    noop_steps = 0
+    untagged_steps = 0
+
+    for path in trace_paths:
+        states = json.loads(path.read_text()).get('states', [])
+        seen = {}
+        for step in range(1, len(states)):
+            total_steps += 1
+            if comparable(states[step]) == comparable(states[step - 1]):
+                noop_steps += 1
+                continue
+            if log_seq(states[step]) == log_seq(states[step - 1]):
+                untagged_steps += 1
+                continue
+            listener = tag_to_listener.get(log_tag(states[step]), UNATTRIBUTED)
+            fires[listener] += 1
+            if listener != UNATTRIBUTED and listener not in seen:
+                seen[listener] = step
+        for listener, step in seen.items():
+            traces_fired[listener] += 1
+            first_fire[listener].append(step)
+
+    return {
+        'traces': len(trace_paths),
+        'steps': total_steps,
+        'noop_steps': noop_steps,
+        'untagged_steps': untagged_steps,
+        'listeners': {
+            listener: {
+                'fires': fires[listener],
+                'traces': traces_fired[listener],
+                'first_fire_steps': first_fire[listener],
+            }
+            for listener in tag_to_listener.values()
+        },
+        'unattributed': fires[UNATTRIBUTED],
+    }
+
+
+def print_report(profile: Dict):
+    steps = profile['steps']
+    active = steps - profile['noop_steps']
+    listeners = profile['listeners']
+
+    print("=" * 60)
+    print("Listener Profile")
+    print("=" * 60)
+    print(f"Traces: {profile['traces']}")
+    print(f"Steps: {steps}")
+    if steps:
+        print(f"No-op steps: {profile['noop_steps']} ({100 * profile['noop_steps'] / steps:.1f}%)")
+    if profile['untagged_steps']:
+        print(f"Untagged transitions: {profile['untagged_steps']} (no Log effect in the step)")
+    if profile['unattributed']:
+        print(f"Unattributed transitions: {profile['unattributed']}")
+    print()
+
+    fired = sorted((l for l in listeners if listeners[l]['fires']), key=lambda l: -listeners[l]['fires'])
+    never = sorted(l for l in listeners if not listeners[l]['fires'])
+
+    if fired:
+        print(f"  {'listener':<40} {'fires':>7} {'share':>7} {'traces':>7}  first fire (min/median/max)")
+        for listener in fired:
+            data = listeners[listener]
+            share = 100 * data['fires'] / active if active else 0
+            firsts = data['first_fire_steps']
+            first = f"{min(firsts)}/{statistics.median(firsts):g}/{max(firsts)}"
+            print(f"  {listener:<40} {data['fires']:>7} {share:>6.1f}% {data['traces']:>7}  {first}")
+        print()
+
+    if never:
+        print("✗ Listeners that never fired:")
+        for listener in never:
+            print(f"  • {listener}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile listener firing frequencies of a Choreo spec")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('config', nargs='?')
+    parser.add_argument('--traces', type=int, default=100, help='number of traces to sample (default: 100)')
+    parser.add_argument('--max-steps', type=int, default=100)
+    parser.add_argument('--jobs', '-j', type=int, help='concurrent quint processes; traces are split between them')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--json', type=Path, metavar='FILE', help='also write the profile as JSON')
+    parser.add_argument('--keep-traces', type=Path, metavar='DIR', help='keep the ITF traces in DIR')
+    add_backend_argument(parser)
+    args = parser.parse_args()
+
+    spec_path = args.spec
+    if not spec_path.exists():
+        print(f"Error: Spec file not found: {spec_path}")
+        sys.exit(1)
+
+    spec_content = spec_path.read_text()
+    module_name = extract_module_name(spec_content)
+    if not module_name:
+        print("Error: Could not find module name in spec")
+        sys.exit(1)
+
+    listener_names, listener_to_action = discover_listeners(spec_content)
+    if not listener_names:
+        print("No listeners found!")
+        sys.exit(1)
+
+    print("Creating instrumented spec...")
+    instrumented_path = create_instrumented_spec(spec_path, listener_names, listener_to_action,
+                                                 spec_content=spec_content)
+    if instrumented_path is None:
+        print("Error: Failed to create instrumented spec")
+        sys.exit(1)
+
+    spec_dir = spec_path.parent
+    if args.config:
+        profile_spec = spec_dir / f"{spec_path.stem}_profile.qnt"
+        write_artifact(profile_spec,
+                       f'module {module_name}_profile {{\n'
+                       f'  import {module_name}({args.config}).* from "./{instrumented_path.stem}"\n'
+                       f'}}\n',
+                       Path(__file__), [spec_path, instrumented_path], {'config': args.config})
+        main_module = f'{module_name}_profile'
+    else:
+        profile_spec = instrumented_path
+        main_module = module_name
+
+    backend = resolve_backend_sync(profile_spec, main_module, args.backend)
+    trace_dir = Path(tempfile.mkdtemp(prefix='listener_profile_'))
+    runner = QuintRunner(jobs=args.jobs)
+    shares = min(runner.concurrency, args.traces)
+    jobs = []
+    for i in range(shares):
+        n_traces = args.traces // shares + (1 if i < args.traces % shares else 0)
+        jobs.append(QuintJob(
+            name=f'profile_{i}',
+            spec=profile_spec,
+            main=main_module,
+            max_steps=args.max_steps,
+            max_samples=n_traces,
+            backend=backend,
+            out_itf=str(trace_dir / f'trace_{i}_{{seq}}.itf.json'),
+            extra_args=[f'--n-traces={n_traces}'],
+            timeout=args.timeout,
+        ))
+
+    print(f"Sampling {args.traces} traces with {shares} quint process(es) on the {backend} backend...")
+    try:
+        results = runner.run_sync(jobs)
+        for result in results:
+            if result.status == ERROR:
+                print(f"Warning: {result.name} failed: {result.error}")
+
+        tag_to_listener = {f'{to_camel_case(l)}Triggered': l for l in listener_names}
+        traces = sorted(trace_dir.glob('*.itf.json'))
+        if not traces:
+            print("Error: quint produced no traces")
+            sys.exit(1)
+
+        profile = profile_traces(traces, tag_to_listener)
+        print()
+        print_report(profile)
+
+        if args.json:
+            args.json.write_text(json.dumps(profile, indent=2))
+            print(f"Profile written to {args.json}")
+    finally:
+        if args.keep_traces:
+            args.keep_traces.mkdir(parents=True, exist_ok=True)
+            for trace in trace_dir.glob('*.itf.json'):
+                shutil.move(str(trace), args.keep_traces / trace.name)
+        shutil.rmtree(trace_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Live progress, throughput and ETA for batches of quint runs
+
+ProgressSink is a runner sink (see quint_runner.py) that keeps
+
+  * completed, running and pending job counts and counts per status,
+  * aggregate throughput: traces explored by completed runs (quint's
+    `(Nms at X traces/second)`) divided by the wall time of the batch,
+  * an ETA: the expected durations of the remaining work (from the run
+    history where available, see run_history.py, otherwise the mean duration
+    of the jobs completed so far) spread over the runner's concurrency.
+
+With `live`, it prints each finished job like ConsoleSink plus a status line,
+redrawn in place on a terminal and repeated every `interval` seconds
+otherwise. With `textfile`, the same metrics are written every `interval`
+seconds in Prometheus text format, atomically, for the node exporter's
+textfile collector.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from quint_runner import (ERROR, OK, TIMEOUT, VIOLATION, ConsoleSink, QuintJob, ResultSink, RunResult,
+                          describe_witness)
+
+DEFAULT_INTERVAL = 10.0
+STATUSES = (VIOLATION, OK, TIMEOUT, ERROR)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '?'
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f'{seconds // 3600}h{seconds % 3600 // 60:02d}m'
+    if seconds >= 60:
+        return f'{seconds // 60}m{seconds % 60:02d}s'
+    return f'{seconds}s'
+
+
+def job_key(name: str, meta: Dict[str, Any]) -> Tuple:
+    """Identifies a job of the batch by its result: shards and modules share witness names."""
+    return name, meta.get('module'), meta.get('shard')
+
+
+def label_value(value: Any) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class ProgressSink(ResultSink):
+    """Tracks a batch of runs; optionally prints live progress and exports metrics."""
+
+    def __init__(self, jobs: List[QuintJob], concurrency: int, history=None, live: bool = True,
+                 textfile: Optional[Path] = None, interval: float = DEFAULT_INTERVAL,
+                 labels: Optional[Dict[str, str]] = None,
+                 describe: Callable[[RunResult], str] = describe_witness):
+        self.concurrency = max(1, concurrency)
+        self.live = live
+        self.textfile = Path(textfile) if textfile else None
+        self.interval = interval
+        self.labels = labels or {}
+        self.describe = describe
+        self.tty = live and sys.stdout.isatty()
+
+        # Expected durations by job key, for the ETA
+        self.expected: Dict[Tuple, Optional[float]] = {}
+        for job in jobs:
+            self.expected.setdefault(job_key(job.name, job.meta),
+                                     history.expected_duration(job) if history is not None else None)
+        self.pending: List[Tuple] = [job_key(job.name, job.meta) for job in jobs]
+
+        self.total = len(jobs)
+        self.running: Dict[Tuple, float] = {}
+        self.counts = {status: 0 for status in STATUSES}
+        self.durations: List[float] = []
+        self.traces = 0.0
+        self.started = time.monotonic()
+        self.ticker = None
+
+    @property
+    def completed(self) -> int:
+        return sum(self.counts.values())
+
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.traces / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        mean = sum(self.durations) / len(self.durations) if self.durations else None
+
+        def expected(key):
+            value = self.expected.get(key)
+            return value if value is not None else mean
+
+        now = time.monotonic()
+        remaining = [expected(key) for key in self.pending]
+        remaining += [max(0.0, expected(key) - (now - started)) if expected(key) is not None else None
+                      for key, started in self.running.items()]
+        if any(value is None for value in remaining):
+            return None
+        return sum(remaining) / self.concurrency
+
+    def status_line(self) -> str:
+        counts = ' '.join(f'{status}={count}' for status, count in self.counts.items() if count)
+        return (f"[{self.completed}/{self.total} done, {len(self.running)} running] "
+                f"{self.throughput():.1f} traces/s, elapsed {format_duration(time.monotonic() - self.started)}, "
+                f"ETA {format_duration(self.eta())}" + (f" ({counts})" if counts else ''))
+
+    def draw(self):
+        if not self.live:
+            return
+        if self.tty:
+            sys.stdout.write('\r\033[K' + self.status_line())
+            sys.stdout.flush()
+        else:
+            print(f"  {self.status_line()}", flush=True)
+
+    def metrics(self) -> str:
+        labels = ','.join(f'{key}="{label_value(value)}"' for key, value in sorted(self.labels.items()))
+
+        def sample(name, value, extra=''):
+            inner = ','.join(part for part in (labels, extra) if part)
+            return f'{name}{{{inner}}} {value}' if inner else f'{name} {value}'
+
+        eta = self.eta()
+        lines = [
+            '# HELP quint_jobs Jobs in the current batch by state.',
+            '# TYPE quint_jobs gauge',
+            sample('quint_jobs', self.total, 'state="total"'),
+            sample('quint_jobs', len(self.running), 'state="running"'),
+            sample('quint_jobs', len(self.pending), 'state="pending"'),
+            '# HELP quint_jobs_completed Completed jobs by status.',
+            '# TYPE quint_jobs_completed gauge',
+        ]
+        lines += [sample('quint_jobs_completed', count, f'status="{status}"') for status, count in self.counts.items()]
+        lines += [
+            '# HELP quint_traces_per_second Traces explored by completed runs per second of wall time.',
+            '# TYPE quint_traces_per_second gauge',
+            sample('quint_traces_per_second', f'{self.throughput():.3f}'),
+            '# HELP quint_elapsed_seconds Wall time since the batch started.',
+            '# TYPE quint_elapsed_seconds gauge',
+            sample('quint_elapsed_seconds', f'{time.monotonic() - self.started:.1f}'),
+            '# HELP quint_eta_seconds Expected time until the batch completes (NaN if unknown).',
+            '# TYPE quint_eta_seconds gauge',
+            sample('quint_eta_seconds', f'{eta:.1f}' if eta is not None else 'NaN'),
+            '# HELP quint_job_duration_seconds_sum Total duration of completed jobs.',
+            '# TYPE quint_job_duration_seconds_sum gauge',
+            sample('quint_job_duration_seconds_sum', f'{sum(self.durations):.3f}'),
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self):
+        if self.textfile is None:
+            return
+        # The textfile collector must never see a partial file
+        tmp = self.textfile.with_name(f'.{self.textfile.name}.{os.getpid()}.tmp')
+        tmp.write_text(self.metrics())
+        os.replace(tmp, self.textfile)
+
+    async def tick(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.draw()
+            self.write_metrics()
+
+    def start(self, total):
+        self.started = time.monotonic()
+        if self.textfile is not None:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+        self.write_metrics()
+        try:
+            self.ticker = asyncio.get_running_loop().create_task(self.tick())
+        except RuntimeError:
+            self.ticker = None
+
+    def job_started(self, job):
+        key = job_key(job.name, job.meta)
+        if key in self.pending:
+            self.pending.remove(key)
+        self.running[key] = time.monotonic()
+        if self.tty:
+            self.draw()
+
+    def job_finished(self, result):
+        key = job_key(result.name, result.meta)
+        self.running.pop(key, None)
+        if key in self.pending:
+            # Jobs served without a job_started event (e.g. by remote workers)
+            self.pending.remove(key)
+        self.counts[result.status if result.status in self.counts else ERROR] += 1
+        self.durations.append(result.duration)
+        if result.traces_per_second and result.runtime_ms:
+            self.traces += result.traces_per_second * result.runtime_ms / 1000
+        if self.live:
+            if self.tty:
+                sys.stdout.write('\r\033[K')
+            print(f"  [{self.completed}/{self.total}] {result.name}... {self.describe(result)}", flush=True)
+            if self.tty:
+                self.draw()
+
+    def close(self):
+        if self.ticker is not None:
+            self.ticker.cancel()
+            self.ticker = None
+        if self.tty:
+            sys.stdout.write('\r\033[K')
+        if self.live:
+            print(f"  {self.status_line()}", flush=True)
+        self.write_metrics()
+
+
+def add_progress_arguments(parser):
+    group = parser.add_argument_group('progress')
+    group.add_argument('--progress', action='store_true',
+                       help='show live progress, throughput and ETA')
+    group.add_argument('--metrics', type=Path, metavar='FILE',
+                       help='write progress metrics to FILE in Prometheus text format')
+    group.add_argument('--metrics-interval', type=float, default=DEFAULT_INTERVAL, metavar='SECONDS',
+                       help=f'how often to refresh progress and metrics (default: {DEFAULT_INTERVAL:g})')
+
+
+def progress_sinks(args, jobs: List[QuintJob], concurrency: int, history=None,
+                   labels: Optional[Dict[str, str]] = None,
+                   describe: Callable[[RunResult], str] = describe_witness) -> List[ResultSink]:
+    """The console sink to use: ConsoleSink, or a ProgressSink if progress or metrics were asked for."""
+    if args is None or (not args.progress and not args.metrics):
+        return [ConsoleSink(describe)]
+    sink = ProgressSink(jobs, concurrency, history, live=args.progress, textfile=args.metrics,
+                        interval=args.metrics_interval, labels=labels, describe=describe)
+    return [sink] if args.progress else [ConsoleSink(describe), sink]
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Warm quint worker pool
+Usage: python3 quint_pool.py <spec.qnt> <module_name> <invariant> [<invariant> ...] [--workers N] [--max-steps N] [--max-samples N]
+Example: python3 quint_pool.py tendermint_configured.qnt tendermint_configured witness_ProposeTriggered --workers 4
+
+Keeps N long-lived `quint repl` processes with the spec already loaded, so
+each witness request skips Node startup, parsing and typechecking. A request
+is simulated inside the REPL by evaluating `init`, then `step` up to
+max_steps times, checking the invariant after every action. All lines of a
+sample are sent at once, so a sample costs a single round-trip.
+
+Workers that fail to load the spec, print an error or stop answering are
+discarded, and the request falls back to a cold `quint run` through
+quint_runner.QuintRunner, which consults the pool before every invariant job.
+A request that runs out of time mid-sample is reported as a timeout and its
+worker, whose REPL is still busy, is replaced in the background.
+
+The REPL evaluates with the TypeScript simulator and has no seed or ITF
+output, so only jobs for the typescript backend that do not ask for a trace
+file (`out_itf`) are served warm; all others run cold. Warm results carry
+meta['mode'] = 'warm' and no seed.
+"""
+
+import argparse
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import quint_runner
+from quint_runner import OK, TIMEOUT, VIOLATION, ConsoleSink, QuintJob, QuintRunner, RunResult
+
+# Lines printed by the REPL for a boolean result, with or without prompt
+BOOL_LINE = re.compile(r'^(?:(?:>>>|\.\.\.)\s*)*(true|false)\s*$')
+ERROR_LINE = re.compile(r'error|exception|not found|unknown', re.IGNORECASE)
+
+
+class WorkerError(Exception):
+    """Raised when a warm worker cannot serve a request."""
+
+
+class WorkerTimeout(WorkerError):
+    """Raised when the REPL does not answer in time; it may still be evaluating."""
+
+
+class ReplWorker:
+    """A single `quint repl` process with the spec module preloaded."""
+
+    def __init__(self, spec_path: Path, module_name: str, startup_timeout: float = 120):
+        self.spec_path = Path(spec_path).resolve()
+        self.module_name = module_name
+        self.startup_timeout = startup_timeout
+        self.proc = None
+        self.lines = queue.Queue()
+        self.counter = 0
+        # Set when a request was abandoned mid-evaluation; the worker must be replaced
+        self.busy = False
+
+    def start(self):
+        """Spawn the REPL and wait until the spec is loaded."""
+        cmd = [quint_runner.QUINT, 'repl', '-r', f'{self.spec_path.name}::{self.module_name}']
+        try:
+            self.proc = subprocess.Popen(
+                cmd,
+                cwd=self.spec_path.parent,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise WorkerError(f"could not start quint repl: {e}")
+
+        reader = threading.Thread(target=self._pump, daemon=True)
+        reader.start()
+
+        # The preload output (and any load error) comes before the first sentinel
+        output = self.evaluate([], self.startup_timeout)
+        errors = [line for line in output if ERROR_LINE.search(line)]
+        if errors:
+            self.close()
+            raise WorkerError(f"spec failed to load: {errors[0].strip()}")
+
+    def _pump(self):
+        for line in self.proc.stdout:
+            self.lines.put(line.rstrip('\n'))
+        self.lines.put(None)
+
+    def evaluate(self, commands: List[str], timeout: float) -> List[str]:
+        """Send commands followed by a sentinel and return the output lines before it."""
+        if self.proc is None or self.proc.poll() is not None:
+            raise WorkerError("worker is not running")
+
+        self.counter += 1
+        sentinel = f'__quint_pool_{self.counter}__'
+        payload = ''.join(f'{c}\n' for c in commands) + f'"{sentinel}"\n'
+        try:
+            self.proc.stdin.write(payload)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"worker pipe closed: {e}")
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout("worker timed out")
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                raise WorkerTimeout("worker timed out")
+            if line is None:
+                raise WorkerError("worker exited")
+            if sentinel in line:
+                return output
+            output.append(line)
+
+    def simulate(self, job: QuintJob) -> RunResult:
+        """Search for a state violating the job's invariant, one REPL round-trip per sample."""
+        max_steps = job.max_steps if job.max_steps is not None else 20
+        max_samples = job.max_samples if job.max_samples is not None else 10000
+        commands = ['init', job.invariant]
+        for _ in range(max_steps):
+            commands.extend(['step', job.invariant])
+
+        started = time.monotonic()
+        deadline = started + (job.timeout or float('inf'))
+        for sample in range(max_samples):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self._result(job, TIMEOUT, started, sample)
+
+            try:
+                output = self.evaluate(commands, remaining)
+            except WorkerTimeout:
+                if job.timeout is None:
+                    raise
+                self.busy = True
+                return self._result(job, TIMEOUT, started, sample)
+            values = []
+            for line in output:
+                match = BOOL_LINE.match(line)
+                if match:
+                    values.append(match.group(1) == 'true')
+                elif ERROR_LINE.search(line):
+                    raise WorkerError(f"evaluation failed: {line.strip()}")
+
+            if len(values) != len(commands):
+                raise WorkerError(f"expected {len(commands)} results, got {len(values)}")
+
+            # values alternate: action result, invariant result
+            for step in range(max_steps + 1):
+                action_ok, holds = values[2 * step], values[2 * step + 1]
+                if not action_ok:
+                    break
+                if not holds:
+                    result = self._result(job, VIOLATION, started, sample + 1)
+                    result.steps = step
+                    return result
+
+        return self._result(job, OK, started, max_samples)
+
+    def _result(self, job, status, started, samples):
+        duration = time.monotonic() - started
+        return RunResult(
+            name=job.name,
+            status=status,
+            runtime_ms=int(duration * 1000),
+            traces_per_second=samples / duration if duration > 0 else None,
+            duration=duration,
+            meta={**job.meta, 'mode': 'warm', 'samples': samples},
+        )
+
+    def close(self, force: bool = False):
+        """Exit the REPL; with `force`, kill it without waiting for pending evaluations."""
+        if self.proc is None:
+            return
+        try:
+            if force:
+                raise OSError("killed")
+            self.proc.stdin.write('.exit\n')
+            self.proc.stdin.flush()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.proc.wait()
+        self.proc = None
+
+
+class WorkerPool:
+    """
+    N warm REPL workers for one spec module.
+
+    Workers are started lazily and in parallel. `try_run` is thread-safe:
+    each call borrows an idle worker and returns None when no worker could be
+    started or the borrowed one fails, so the caller can run the job cold.
+    """
+
+    def __init__(self, spec_path: Path, module_name: str, size: int):
+        self.spec_path = Path(spec_path)
+        self.module_name = module_name
+        self.size = size
+        self.idle = queue.Queue()
+        self.alive = 0
+        self.started = False
+        self.lock = threading.Lock()
+        self.replacements: List[threading.Thread] = []
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+
+        def spawn(_):
+            worker = ReplWorker(self.spec_path, self.module_name)
+            try:
+                worker.start()
+            except WorkerError as e:
+                print(f"  Warning: warm worker unavailable ({e}), using cold runs")
+                return None
+            return worker
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            for worker in executor.map(spawn, range(self.size)):
+                if worker is not None:
+                    self.alive += 1
+                    self.idle.put(worker)
+
+    def accepts(self, job: QuintJob) -> bool:
+        return (job.command == 'run' and job.invariant is not None and
+                job.backend in (None, 'typescript') and job.out_itf is None and
+                Path(job.spec).resolve() == self.spec_path.resolve() and
+                job.main == self.module_name)
+
+    def try_run(self, job: QuintJob) -> Optional[RunResult]:
+        """Run an invariant job on a warm worker, or return None if none is usable."""
+        if not self.accepts(job):
+            return None
+        self.start()
+
+        worker = self.idle.get() if self.alive > 0 else None
+        if worker is None:
+            return None
+
+        try:
+            result = worker.simulate(job)
+        except WorkerError as e:
+            print(f"  Warning: warm worker failed on {job.name} ({e}), retrying cold")
+            worker.close()
+            self._discard()
+            return None
+
+        if worker.busy:
+            self._replace(worker)
+        else:
+            self.idle.put(worker)
+        return result
+
+    def _discard(self):
+        with self.lock:
+            self.alive -= 1
+            # Unblock waiters if this was the last worker
+            if self.alive == 0:
+                for _ in range(self.size):
+                    self.idle.put(None)
+
+    def _replace(self, worker: ReplWorker):
+        """Kill a worker stuck in an abandoned request and start a fresh one in the background."""
+        def restart():
+            worker.close(force=True)
+            fresh = ReplWorker(self.spec_path, self.module_name)
+            try:
+                fresh.start()
+            except WorkerError as e:
+                print(f"  Warning: could not replace warm worker ({e})")
+                self._discard()
+                return
+            self.idle.put(fresh)
+
+        thread = threading.Thread(target=restart, daemon=True)
+        with self.lock:
+            self.replacements.append(thread)
+        thread.start()
+
+    def close(self):
+        with self.lock:
+            replacements, self.replacements = self.replacements, []
+        for thread in replacements:
+            thread.join()
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run invariants on a pool of warm quint REPL workers")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('module_name')
+    parser.add_argument('invariants', nargs='+')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-steps', type=int, default=100)
+    parser.add_argument('--max-samples', type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.spec.exists():
+        print(f"Error: Spec file not found: {args.spec}")
+        sys.exit(1)
+
+    jobs = [
+        QuintJob(name=inv, spec=args.spec, main=args.module_name, invariant=inv,
+                 max_steps=args.max_steps, max_samples=args.max_samples, backend='typescript')
+        for inv in args.invariants
+    ]
+    with WorkerPool(args.spec, args.module_name, args.workers) as pool:
+        QuintRunner(jobs=args.workers, sinks=[ConsoleSink()], pool=pool).run_sync(jobs)
+
+
+if __name__ == '__main__':
+    main()
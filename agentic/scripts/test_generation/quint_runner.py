@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Shared asyncio runner for quint processes
+Usage (as a library):
+
+    from quint_runner import QuintJob, QuintRunner, ConsoleSink
+
+    jobs = [QuintJob(name=w, spec=spec, main=module, invariant=w, max_steps=100) for w in witnesses]
+    results = QuintRunner(jobs=4, sinks=[ConsoleSink()]).run_sync(jobs)
+
+Every agentic script that launches `quint run` goes through this module, so
+argv construction, concurrency, timeouts and output parsing live in one place:
+
+  * QuintJob      describes one quint invocation and builds its argv
+  * OutputParser  parses quint output line by line into a RunResult,
+                  keeping only a bounded tail and the key lines in memory
+  * run_job       runs one job in its own process group, killing the whole
+                  group on timeout or cancellation, spools its full output
+                  to a log file and keeps the ITF trace of every witness it
+                  reaches (see trace_store.py)
+  * QuintRunner   runs many jobs with bounded concurrency and reports each
+                  result to pluggable sinks (ConsoleSink, JsonlSink, ...),
+                  optionally under memory-aware admission control
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from admission import RssSampler
+from spec_cache import spec_hash
+from trace_store import job_spec, log_output, trace_output
+
+# The quint executable; QUINT_BIN points the runners at another build or at
+# a stand-in such as fake_quint.py
+QUINT = os.environ.get('QUINT_BIN', 'quint')
+
+# Pins a run to its cores before quint starts (util-linux)
+TASKSET = shutil.which('taskset')
+
+# quint prints whole states on one line; allow long lines
+LINE_LIMIT = 16 * 1024 * 1024
+
+# Output kept in memory per run; the rest is only in the run log
+TAIL_CHARS = 64 * 1024
+KEY_LINES = 50
+KEY_LINE_CHARS = 1000
+
+# Result statuses
+VIOLATION = 'violation'
+OK = 'ok'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+NO_VIOLATION_RE = re.compile(r'\[ok\]|no violation found', re.IGNORECASE)
+VIOLATION_RE = re.compile(r'\[violation\]|violation found|found an issue', re.IGNORECASE)
+RUNTIME_RE = re.compile(r'\((\d+)ms(?:\s+at\s+([\d.]+)\s+traces/second)?\)')
+SEED_RE = re.compile(r'--seed[= ](0x[0-9a-f]+|\d+)|seed:\s*([a-f0-9x]+)', re.IGNORECASE)
+STATE_RE = re.compile(r'^\[State (\d+)\]')
+STEP_RE = re.compile(r'step\s+(\d+)', re.IGNORECASE)
+WITNESSED_RE = re.compile(r'^(\S+) was witnessed in (\d+) trace\(s\) out of (\d+) explored \(([\d.]+)%\)')
+ERROR_RE = re.compile(r'^\s*(error|.*\berror\b:)', re.IGNORECASE)
+
+
+@dataclass
+class QuintJob:
+    """One quint invocation. Optional fields are omitted from argv when unset."""
+    name: str
+    spec: Path
+    command: str = 'run'
+    main: Optional[str] = None
+    invariant: Optional[str] = None
+    max_steps: Optional[int] = None
+    max_samples: Optional[int] = None
+    backend: Optional[str] = None
+    seed: Optional[str] = None
+    out_itf: Optional[str] = None
+    witnesses: List[str] = field(default_factory=list)
+    verbosity: Optional[int] = None
+    extra_args: List[str] = field(default_factory=list)
+    timeout: Optional[float] = 60
+    cwd: Optional[Path] = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def argv(self) -> List[str]:
+        cmd = [QUINT, self.command, str(self.spec)]
+        if self.main:
+            cmd.append(f'--main={self.main}')
+        if self.invariant:
+            cmd.append(f'--invariant={self.invariant}')
+        if self.max_steps is not None:
+            cmd.append(f'--max-steps={self.max_steps}')
+        if self.max_samples is not None:
+            cmd.append(f'--max-samples={self.max_samples}')
+        if self.backend:
+            cmd.append(f'--backend={self.backend}')
+        if self.seed:
+            cmd.append(f'--seed={self.seed}')
+        if self.out_itf:
+            cmd.append(f'--out-itf={self.out_itf}')
+        if self.verbosity is not None:
+            cmd.append(f'--verbosity={self.verbosity}')
+        if self.witnesses:
+            cmd.append('--witnesses')
+            cmd.extend(self.witnesses)
+        cmd.extend(self.extra_args)
+        return cmd
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['spec'] = str(self.spec)
+        data['cwd'] = str(self.cwd) if self.cwd else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuintJob':
+        data = dict(data)
+        data['spec'] = Path(data['spec'])
+        data['cwd'] = Path(data['cwd']) if data.get('cwd') else None
+        return cls(**data)
+
+
+@dataclass
+class RunResult:
+    """Typed outcome of a quint run."""
+    name: str
+    status: str
+    seed: Optional[str] = None
+    steps: Optional[int] = None
+    runtime_ms: Optional[int] = None
+    traces_per_second: Optional[float] = None
+    witnessed: Dict[str, float] = field(default_factory=dict)
+    returncode: Optional[int] = None
+    duration: float = 0.0
+    error: Optional[str] = None
+    peak_rss: Optional[int] = None
+    trace: Optional[str] = None
+    log: Optional[str] = None
+    output: str = ''
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def found(self) -> bool:
+        return self.status == VIOLATION
+
+    def to_dict(self, with_output=False) -> Dict[str, Any]:
+        data = asdict(self)
+        if not with_output:
+            del data['output']
+        data['witness'] = self.name
+        data['found'] = self.found
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunResult':
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+def clip(line: str, limit: int) -> str:
+    return line if len(line) <= limit else f'{line[:limit]} ... [{len(line) - limit} more characters]'
+
+
+class OutputParser:
+    """
+    Incremental parser for `quint run` output; feed it one line at a time.
+
+    Only the last TAIL_CHARS of output and the first KEY_LINES lines that
+    carry a verdict, seed, runtime, error or coverage are kept; with `log`
+    (a text file), every line is written there as well.
+    """
+
+    def __init__(self, log=None):
+        self.log = log
+        self.count = 0
+        self.tail = deque()
+        self.tail_chars = 0
+        self.key_lines: List[Tuple[int, str]] = []
+        self.verdict: Optional[str] = None
+        self.seed: Optional[str] = None
+        self.max_state: Optional[int] = None
+        self.step: Optional[int] = None
+        self.runtime_ms: Optional[int] = None
+        self.traces_per_second: Optional[float] = None
+        self.witnessed: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def feed(self, line: str):
+        if self.log:
+            self.log.write(line + '\n')
+        self.keep(line)
+        key = False
+
+        if NO_VIOLATION_RE.search(line):
+            self.verdict = OK
+            key = True
+        elif VIOLATION_RE.search(line):
+            self.verdict = VIOLATION
+            key = True
+        elif ERROR_RE.match(line):
+            if self.error is None:
+                self.error = clip(line.strip(), KEY_LINE_CHARS)
+            key = True
+
+        runtime = RUNTIME_RE.search(line)
+        if runtime:
+            self.runtime_ms = int(runtime.group(1))
+            if runtime.group(2):
+                self.traces_per_second = float(runtime.group(2))
+            key = True
+
+        seed = SEED_RE.search(line)
+        if seed:
+            self.seed = seed.group(1) or seed.group(2)
+            key = True
+
+        state = STATE_RE.match(line)
+        if state:
+            self.max_state = max(self.max_state or 0, int(state.group(1)))
+        elif self.step is None:
+            step = STEP_RE.search(line)
+            if step:
+                self.step = int(step.group(1))
+
+        witnessed = WITNESSED_RE.match(line.strip())
+        if witnessed:
+            self.witnessed[witnessed.group(1)] = float(witnessed.group(4))
+            key = True
+
+        if key and len(self.key_lines) < KEY_LINES:
+            self.key_lines.append((self.count - 1, clip(line, KEY_LINE_CHARS)))
+
+    def keep(self, line: str):
+        line = clip(line, TAIL_CHARS)
+        self.tail.append(line)
+        self.tail_chars += len(line) + 1
+        self.count += 1
+        while self.tail_chars > TAIL_CHARS and len(self.tail) > 1:
+            self.tail_chars -= len(self.tail.popleft()) + 1
+
+    def output(self) -> str:
+        """The kept output: key lines that left the tail, then the tail."""
+        first = self.count - len(self.tail)
+        if not first:
+            return '\n'.join(self.tail)
+        earlier = [line for index, line in self.key_lines if index < first]
+        where = f' (full output: {self.log.name})' if self.log else ''
+        return '\n'.join(earlier + [f'... {first} earlier lines not kept{where} ...'] + list(self.tail))
+
+    def result(self, job: QuintJob, returncode: Optional[int], duration: float) -> RunResult:
+        if self.verdict is not None:
+            status = self.verdict
+        elif returncode == 0:
+            status = OK
+        else:
+            status = ERROR
+
+        steps = None
+        if status == VIOLATION:
+            steps = self.max_state if self.max_state is not None else self.step
+            if steps is None:
+                steps = job.max_steps
+
+        return RunResult(
+            name=job.name,
+            status=status,
+            seed=self.seed if status == VIOLATION else None,
+            steps=steps,
+            runtime_ms=self.runtime_ms,
+            traces_per_second=self.traces_per_second,
+            witnessed=self.witnessed,
+            returncode=returncode,
+            duration=duration,
+            error=self.error if status == ERROR else None,
+            log=self.log.name if self.log else None,
+            output=self.output(),
+            meta=job.meta,
+        )
+
+
+def kill_group(proc):
+    """Kill the process group of `proc` (quint spawns the rust backend as a child)."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_job(job: QuintJob, cpus: Optional[Set[int]] = None, rss: Optional[RssSampler] = None,
+                  tree_hash: Optional[str] = None) -> RunResult:
+    """
+    Run a single job, parsing its output as it is produced.
+
+    `cpus` pins the quint process (and the backend it spawns) to those cores;
+    with an `rss` sampler, the peak RSS of the process group is reported.
+    `tree_hash` is the spec hash, which batch callers compute once per spec.
+    """
+    started = time.monotonic()
+    if tree_hash is None:
+        tree_hash = await asyncio.to_thread(spec_hash, job_spec(job))
+
+    try:
+        log = log_output(job, tree_hash).open('w', errors='replace')
+    except OSError as e:
+        return RunResult(job.name, ERROR, error=f"cannot write run log: {e}", meta=job.meta)
+
+    # Witness runs always write their trace; it is kept only if the witness is reached
+    trace = trace_output(job, tree_hash)
+    argv = replace(job, out_itf=str(trace[0])).argv() if trace else job.argv()
+
+    # Pin before exec so quint, its JVM threads and the backend all inherit
+    # the affinity. taskset avoids a preexec_fn, which is unsafe while other
+    # threads run; it is the fallback when taskset is not installed.
+    preexec_fn = None
+    if cpus and TASKSET:
+        argv = [TASKSET, '-c', ','.join(map(str, sorted(cpus)))] + argv
+    elif cpus:
+        preexec_fn = lambda: os.sched_setaffinity(0, cpus)
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=job.cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+            preexec_fn=preexec_fn,
+            limit=LINE_LIMIT,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        log.close()
+        return RunResult(job.name, ERROR, error=str(e), meta=job.meta)
+
+    parser = OutputParser(log)
+    if rss:
+        rss.watch(proc.pid)
+
+    async def consume():
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            parser.feed(line.decode(errors='replace').rstrip('\n'))
+        return await proc.wait()
+
+    result = None
+    try:
+        returncode = await asyncio.wait_for(consume(), timeout=job.timeout)
+        result = parser.result(job, returncode, time.monotonic() - started)
+    except asyncio.TimeoutError:
+        kill_group(proc)
+        await proc.wait()
+        result = parser.result(job, proc.returncode, time.monotonic() - started)
+        result.status = TIMEOUT
+        result.error = None
+    except asyncio.CancelledError:
+        kill_group(proc)
+        # Reap the child so no zombie is left behind
+        await proc.wait()
+        raise
+    except Exception as e:
+        # An overlong line (beyond LINE_LIMIT) or a parser failure: stop the
+        # run rather than leave quint running and fail the whole batch
+        kill_group(proc)
+        await proc.wait()
+        result = RunResult(job.name, ERROR, returncode=proc.returncode, duration=time.monotonic() - started,
+                           error=f"{type(e).__name__}: {e}", meta=job.meta)
+    finally:
+        peak = rss.unwatch(proc.pid) if rss else 0
+        log.close()
+        if trace:
+            tmp, final = trace
+            if result is not None and result.found and tmp.exists():
+                os.replace(tmp, final)
+                result.trace = str(final)
+            else:
+                tmp.unlink(missing_ok=True)
+
+    result.peak_rss = peak or None
+    return result
+
+
+class ResultSink:
+    """Receives runner events. Subclasses override what they need."""
+
+    def start(self, total: int):
+        pass
+
+    def job_started(self, job: QuintJob):
+        pass
+
+    def job_finished(self, result: RunResult):
+        pass
+
+    def close(self):
+        pass
+
+
+def describe_witness(result: RunResult) -> str:
+    if result.found:
+        if result.meta.get('mode') == 'warm':
+            return f"✓ reachable ({result.steps} steps, warm run, no seed)"
+        return f"✓ reachable ({result.steps} steps, seed: {result.seed or 'unknown'})"
+    if result.witnessed and result.status == OK:
+        seen = sum(1 for percent in result.witnessed.values() if percent > 0)
+        return f"{seen}/{len(result.witnessed)} witnessed"
+    if result.status == TIMEOUT:
+        return "✗ timeout"
+    if result.status == ERROR:
+        return f"✗ error: {result.error or 'quint exited with code ' + str(result.returncode)}"
+    return "✗ unreachable"
+
+
+class ConsoleSink(ResultSink):
+    """Prints `[i/N] name... outcome` as each job completes."""
+
+    def __init__(self, describe: Callable[[RunResult], str] = describe_witness):
+        self.describe = describe
+        self.total = 0
+        self.done = 0
+
+    def start(self, total):
+        self.total = total
+
+    def job_finished(self, result):
+        self.done += 1
+        print(f"  [{self.done}/{self.total}] {result.name}... {self.describe(result)}", flush=True)
+
+
+class JsonlSink(ResultSink):
+    """Appends one JSON object per result to a file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.file = None
+
+    def start(self, total):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.open('a')
+
+    def job_finished(self, result):
+        self.file.write(json.dumps(result.to_dict()) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class QuintRunner:
+    """
+    Runs jobs with at most `jobs` quint processes at a time.
+
+    If a warm `pool` is given (see quint_pool.py), invariant checks are
+    offered to it first and only run cold when it declines.
+
+    With an `admission` controller (see admission.py), each cold run also
+    waits for memory to be available, is pinned to its own core, and has its
+    peak RSS recorded for future scheduling.
+
+    With a `history` (see run_history.py), jobs start longest-expected first,
+    get timeouts learned from previous runs, and every cold run is recorded.
+    Results are still returned in job order.
+    """
+
+    def __init__(self, jobs: Optional[int] = None, sinks: Optional[List[ResultSink]] = None,
+                 pool=None, admission=None, history=None):
+        if jobs is None and admission is not None:
+            jobs = admission.max_parallel
+        self.concurrency = max(1, jobs or os.cpu_count() or 1)
+        self.sinks = sinks or []
+        self.pool = pool
+        self.admission = admission
+        self.history = history
+        self.hashes: Dict[Path, str] = {}
+
+    async def execute(self, job: QuintJob) -> RunResult:
+        if self.pool is not None and job.command == 'run' and job.invariant:
+            result = await asyncio.to_thread(self.pool.try_run, job)
+            if result is not None:
+                return result
+
+        spec = job_spec(job).resolve()
+        if spec not in self.hashes:
+            # A job executed on its own, outside `run` (e.g. a portfolio race)
+            self.hashes[spec] = await asyncio.to_thread(spec_hash, spec)
+        tree_hash = self.hashes[spec]
+        if self.admission is None:
+            return await run_job(job, tree_hash=tree_hash)
+
+        slot = await self.admission.acquire(job)
+        result = None
+        try:
+            result = await run_job(job, cpus=slot['cpus'], rss=self.admission.rss, tree_hash=tree_hash)
+            return result
+        finally:
+            await self.admission.release(job, slot, result.peak_rss if result else None)
+
+    async def run(self, jobs: List[QuintJob]) -> List[RunResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(job):
+            async with semaphore:
+                if self.history is not None:
+                    job = replace(job, timeout=self.history.timeout(job))
+                for sink in self.sinks:
+                    sink.job_started(job)
+                result = await self.execute(job)
+                if self.history is not None and result.meta.get('mode') != 'warm':
+                    self.history.record(job, result)
+                for sink in self.sinks:
+                    sink.job_finished(result)
+                return result
+
+        # Hash each spec tree once per batch rather than once per job
+        self.hashes = {spec: await asyncio.to_thread(spec_hash, spec)
+                       for spec in {job_spec(job).resolve() for job in jobs}}
+
+        # The semaphore admits waiters in order, so this is the start order
+        order = self.history.order(jobs) if self.history is not None else list(range(len(jobs)))
+
+        for sink in self.sinks:
+            sink.start(len(jobs))
+        try:
+            results = await asyncio.gather(*(one(jobs[i]) for i in order))
+        finally:
+            for sink in self.sinks:
+                sink.close()
+        ordered: List[Optional[RunResult]] = [None] * len(jobs)
+        for i, result in zip(order, results):
+            ordered[i] = result
+        return ordered
+
+    def run_sync(self, jobs: List[QuintJob]) -> List[RunResult]:
+        """Blocking entry point for scripts; Ctrl-C kills every running quint."""
+        return asyncio.run(self.run(jobs))
@@ -2,14 +2,88 @@
 """
 Run all witnesses for a configured spec
 Usage: python3 run_all_witnesses.py <configured_spec.qnt> <module_name> [max_steps]
+           [--jobs N] [--warm N] [--results FILE] [--memory-budget SIZE] [--min-free SIZE] [--no-pin]
+           [--shards K] [--queue DIR|tcp://host:port [--local-workers N]]
+           [--backend auto|rust|typescript] [--portfolio] [--progress] [--metrics FILE] [--no-static-filter]
 Example: python3 run_all_witnesses.py tendermint_configured.qnt tendermint_configured 20
+
+Witnesses run concurrently (up to --jobs quint processes) through
+quint_runner.py. With --warm N, witnesses are dispatched to N long-lived
+quint REPL workers that keep the spec loaded (see quint_pool.py) instead of
+starting a new quint process per witness. The REPL simulates with the
+TypeScript backend, so --warm implies --backend typescript; warm results have
+no seed or stored trace.
+
+Runs are admitted against a memory budget using the peak RSS observed for
+each witness on earlier runs, and each run is pinned to its own core (see
+admission.py).
+
+With --queue, witnesses are put in a shared work queue and run by
+`work_queue.py` workers on any host; results are merged into the same
+report. --shards splits each witness over several seeds, so one witness can
+be searched by several workers at once.
+
+Every run is recorded in the spec's run history (see run_history.py), which
+is used to start the witnesses expected to take longest first and to derive
+per-witness timeouts from previous durations instead of a fixed 60s.
+--no-history disables both. With --queue only the submission order is taken
+from the history.
+
+With --portfolio, witnesses that were not found are run again as a race
+between a larger simulation and a bounded `quint verify` (see portfolio.py);
+the report then separates witnesses proved unreachable within --verify-steps
+steps from ones that were merely not found.
+
+Witnesses run on the rust backend by default. With --backend auto they run
+on the simulator backend that was fastest for this version of the spec (see
+backend.py; the first such run calibrates on the first witness).
+
+--progress replaces the per-witness lines with live progress (running jobs,
+traces/second, per-status counts, ETA from the run history), and --metrics
+FILE exports the same numbers in Prometheus text format (see progress.py).
+
+The trace of every reached witness is kept as ITF in
+`.quint-cache/traces/<spec_hash>/<witness>.itf.json` and listed in the
+report and in the `trace` field of --results (see trace_store.py). The full
+quint output of every run is spooled to a log file (the `log` field, shown
+for failed runs) and only a bounded tail is kept in memory.
+
+The spec is typechecked once before any witness is started (cached by
+spec-tree hash, see typecheck.py); on a type error the runner stops and
+prints the compiler output instead of reporting every witness as
+unreachable. --no-typecheck skips the gate.
+
+Witnesses that are dead by construction (their variant is never built, or
+their listener is not part of main_listener) are not run at all: they are
+reported as statically unreachable with the reason, and recorded in
+--results with status `skipped` (see static_reachability.py).
+--no-static-filter runs them anyway.
+
+Coverage predicates (`cover_` vals, see gen_type_witnesses.py --combined)
+are not run one by one: they are batched into a single `quint run
+--witnesses` job and a variant counts as reachable if quint reports its
+predicate as witnessed in at least one trace.
 """
 
+import argparse
+import asyncio
+import json
+import random
 import re
-import subprocess
 import sys
 from pathlib import Path
 
+from admission import add_admission_arguments, admission_from_args, format_size
+from backend import add_backend_argument, resolve_backend_sync
+from quint_pool import WorkerPool
+from portfolio import DEFAULT_SAMPLES, NOT_FOUND, REACHABLE, UNREACHABLE, race_all, verifier_available
+from progress import add_progress_arguments, progress_sinks
+from quint_runner import ERROR, OK, TIMEOUT, VIOLATION, QuintJob, QuintRunner, RunResult
+from run_history import RunHistory
+from static_reachability import SKIPPED, skipped_result, static_unreachable
+from typecheck import print_failure, typecheck_sync
+from work_queue import merge_shards, run_distributed
+
 
 def extract_witnesses(spec_path):
     """Extract all witness names from the configured spec."""
@@ -20,15 +94,153 @@ def extract_witnesses(spec_path):
     return matches
 
 
+def extract_coverage(spec_path):
+    """Extract the coverage predicates generated by gen_type_witnesses.py --combined."""
+    return re.findall(r'val\s+(cover_\w+)\s*=', spec_path.read_text())
+
+
+def expand_coverage(results):
+    """Split each batched coverage run into one result per coverage predicate."""
+    expanded = []
+    for result in results:
+        covers = result.meta.get('coverage')
+        if not covers:
+            expanded.append(result)
+            continue
+        for name in covers:
+            seen = result.witnessed.get(name, 0) > 0
+            expanded.append(RunResult(
+                name=name,
+                status=VIOLATION if seen else result.status,
+                seed=result.seed,
+                witnessed={name: result.witnessed[name]} if name in result.witnessed else {},
+                duration=result.duration,
+                error=result.error,
+                meta={**result.meta, 'coverage': None, 'batch': result.name},
+            ))
+    return expanded
+
+
+def witness_jobs(configured_spec, module_name, witnesses, covers, max_steps, shards=1, backend='rust'):
+    """One job per witness (and shard), plus one batched job for all coverage predicates."""
+    seed_base = random.getrandbits(48)
+    jobs = [
+        QuintJob(
+            name=witness_name,
+            spec=configured_spec,
+            main=module_name,
+            invariant=witness_name,
+            max_steps=max_steps,
+            max_samples=-(-1000 // shards),
+            backend=backend,
+            seed=hex(seed_base + shard) if shards > 1 else None,
+            timeout=60,
+            meta={'shard': shard} if shards > 1 else {},
+        )
+        for witness_name in witnesses
+        for shard in range(shards)
+    ]
+    if covers:
+        jobs.extend(
+            QuintJob(
+                name='coverage',
+                spec=configured_spec,
+                main=module_name,
+                max_steps=max_steps,
+                max_samples=-(-1000 // shards),
+                backend=backend,
+                seed=hex(seed_base + shard) if shards > 1 else None,
+                witnesses=covers,
+                timeout=60,
+                meta={'coverage': covers, **({'shard': shard} if shards > 1 else {})},
+            )
+            for shard in range(shards)
+        )
+    return jobs
+
+
+def run_portfolio(results, configured_spec, module_name, max_steps, backend, concurrency, admission=None,
+                  **options):
+    """Race the invariant witnesses that were not found; updates `results` in place."""
+    unresolved = [r for r in results if not r['found'] and r['status'] in (OK, TIMEOUT)
+                  and not r['witness'].startswith('cover_')]
+    if not unresolved:
+        return
+
+    print("=" * 60)
+    print("Portfolio")
+    print("=" * 60)
+    if options['verify_steps'] is None:
+        print("No model checker available (quint verify needs java): larger simulation only")
+    else:
+        print(f"Racing simulation ({options['samples']} samples) against quint verify "
+              f"(up to {options['verify_steps']} steps)")
+    print()
+
+    jobs = [
+        QuintJob(name=r['witness'], spec=configured_spec, main=module_name, invariant=r['witness'],
+                 max_steps=max_steps, backend=backend)
+        for r in unresolved
+    ]
+    outcomes = asyncio.run(race_all(jobs, concurrency, runner=QuintRunner(admission=admission), **options))
+    for r, outcome in zip(unresolved, outcomes):
+        r['verdict'] = outcome['verdict']
+        r['engine'] = outcome['engine']
+        r['bound'] = outcome['bound']
+        if outcome['verdict'] == REACHABLE:
+            r['found'] = True
+            r['status'] = VIOLATION
+            r['steps'] = outcome['result'].steps
+            r['seed'] = outcome['result'].seed
+            r['trace'] = outcome['result'].trace
+            print(f"  • {r['witness']}... ✓ reachable ({outcome['engine']}, {r['steps']} steps)")
+        elif outcome['verdict'] == UNREACHABLE:
+            print(f"  • {r['witness']}... ✗ proved unreachable up to {outcome['bound']} steps")
+        else:
+            print(f"  • {r['witness']}... ? {NOT_FOUND}")
+    print()
+
+
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python3 run_all_witnesses.py <configured_spec.qnt> <module_name> [max_steps]")
-        print("Example: python3 run_all_witnesses.py tendermint_configured.qnt tendermint_configured 20")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Run all witnesses for a configured spec")
+    parser.add_argument('configured_spec', type=Path)
+    parser.add_argument('module_name')
+    parser.add_argument('max_steps', type=int, nargs='?', default=100)
+    parser.add_argument('--jobs', '-j', type=int, metavar='N',
+                        help='maximum number of concurrent quint processes (default: one per core)')
+    parser.add_argument('--warm', type=int, default=0, metavar='N',
+                        help='serve witnesses from N warm quint REPL workers (default: cold run per witness)')
+    parser.add_argument('--results', type=Path, metavar='FILE',
+                        help='append one JSON line per witness result to FILE')
+    parser.add_argument('--shards', type=int, default=1, metavar='K',
+                        help='split each witness into K runs over different seeds (1000/K samples each)')
+    parser.add_argument('--queue', metavar='URL',
+                        help='coordinate workers through a spool directory or tcp://host:port '
+                             '(see work_queue.py) instead of running locally')
+    parser.add_argument('--local-workers', type=int, default=0, metavar='N',
+                        help='with --queue, also start N worker processes on this host')
+    add_backend_argument(parser)
+    parser.add_argument('--no-typecheck', action='store_true',
+                        help='do not typecheck the spec before running the witnesses')
+    parser.add_argument('--no-history', action='store_true',
+                        help='do not use or record run history (fixed 60s timeouts, spec order)')
+    parser.add_argument('--no-static-filter', action='store_true',
+                        help='also run witnesses that the static pre-filter shows to be unreachable')
+    group = parser.add_argument_group('portfolio')
+    group.add_argument('--portfolio', action='store_true',
+                       help='race a larger simulation against quint verify for witnesses not found')
+    group.add_argument('--portfolio-samples', type=int, default=DEFAULT_SAMPLES, metavar='N',
+                       help=f'samples of the portfolio simulation (default: {DEFAULT_SAMPLES})')
+    group.add_argument('--verify-steps', type=int, metavar='K',
+                       help='bound of quint verify (default: max_steps)')
+    group.add_argument('--portfolio-timeout', type=float, default=600, metavar='SECONDS')
+    add_progress_arguments(parser)
+    add_admission_arguments(parser)
+    args = parser.parse_args()
 
-    configured_spec = Path(sys.argv[1])
-    module_name = sys.argv[2]
-    max_steps = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    configured_spec = args.configured_spec
+    module_name = args.module_name
+    max_steps = args.max_steps
 
     if not configured_spec.exists():
         print(f"Error: Configured spec not found: {configured_spec}")
@@ -36,6 +248,7 @@ def main():
 
     # Extract witnesses from the spec file
     witnesses = extract_witnesses(configured_spec)
+    covers = extract_coverage(configured_spec)
 
     print("=" * 60)
     print("Running All Witnesses")
@@ -43,82 +256,119 @@ def main():
     print(f"Configured spec: {configured_spec}")
     print(f"Module: {module_name}")
     print(f"Max steps: {max_steps}")
-    print(f"Total witnesses: {len(witnesses)}")
+    print(f"Total witnesses: {len(witnesses) + len(covers)}")
+    if covers:
+        print(f"Coverage predicates: {len(covers)} (one batched run)")
+    admission = admission_from_args(args)
+    print(f"Parallel jobs: {args.jobs or admission.max_parallel}")
+    print(f"Memory budget: {format_size(admission.budget)}")
+    if args.warm:
+        print(f"Warm workers: {args.warm}")
     print()
 
-    results = []
-    for i, witness_name in enumerate(witnesses, 1):
-        print(f"  [{i}/{len(witnesses)}] {witness_name}...", end=" ", flush=True)
-
-        try:
-            cmd = [
-                'quint', 'run', str(configured_spec),
-                f'--main={module_name}',
-                f'--invariant={witness_name}',
-                f'--max-steps={max_steps}',
-                '--max-samples=1000',
-                '--backend=rust'
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            output = result.stdout + result.stderr
-
-            if 'violation' in output.lower():
-                seed_match = re.search(r'seed:\s*([a-f0-9]+)', output, re.IGNORECASE)
-                steps_match = re.search(r'step\s+(\d+)', output, re.IGNORECASE)
-
-                seed = seed_match.group(1) if seed_match else 'unknown'
-                steps = int(steps_match.group(1)) if steps_match else max_steps
-
-                print(f"✓ reachable ({steps} steps, seed: {seed})")
-                results.append({
-                    'witness': witness_name,
-                    'found': True,
-                    'steps': steps,
-                    'seed': seed
-                })
-            else:
-                print("✗ unreachable")
-                results.append({
-                    'witness': witness_name,
-                    'found': False
-                })
-
-        except subprocess.TimeoutExpired:
-            print("✗ timeout")
-            results.append({
-                'witness': witness_name,
-                'found': False
-            })
-        except Exception as e:
-            print(f"✗ error: {e}")
-            results.append({
-                'witness': witness_name,
-                'found': False
-            })
+    if not args.no_typecheck:
+        check = typecheck_sync(configured_spec)
+        if check.status != OK:
+            print_failure(configured_spec, check)
+            sys.exit(1)
+        print(f"✓ Typecheck passed{' (cached)' if check.meta['cached'] else ''}")
+        print()
+
+    skipped = []
+    if not args.no_static_filter:
+        reasons = static_unreachable(configured_spec, module_name, witnesses + covers)
+        skipped = [skipped_result(witness, reason) for witness, reason in reasons.items()]
+        witnesses = [w for w in witnesses if w not in reasons]
+        covers = [c for c in covers if c not in reasons]
+        if skipped:
+            print(f"Statically unreachable: {len(skipped)} witnesses skipped")
+            print()
 
+    # Warm workers only serve jobs for the REPL's own (TypeScript) simulator
+    backend = 'typescript' if args.warm else resolve_backend_sync(
+        configured_spec, module_name, args.backend, witnesses[0] if witnesses else None)
+    print(f"Backend: {backend}")
     print()
 
+    jobs = witness_jobs(configured_spec, module_name, witnesses, covers, max_steps, args.shards, backend)
+
+    history = None if args.no_history else RunHistory()
+    sinks = progress_sinks(args, jobs, args.jobs or admission.max_parallel, history,
+                           labels={'spec': configured_spec.name, 'module': module_name})
+
+    if args.queue:
+        if history is not None:
+            jobs = [jobs[i] for i in history.order(jobs)]
+        results = asyncio.run(run_distributed(jobs, args.queue, args.local_workers, sinks))
+    elif args.warm:
+        with WorkerPool(configured_spec, module_name, args.warm) as pool:
+            runner = QuintRunner(jobs=args.jobs, sinks=sinks, pool=pool, admission=admission, history=history)
+            results = runner.run_sync(jobs)
+    else:
+        results = QuintRunner(jobs=args.jobs, sinks=sinks, admission=admission, history=history).run_sync(jobs)
+    if history is not None:
+        history.close()
+    results = [r.to_dict() for r in merge_shards(expand_coverage(results)) + skipped]
+
+    print()
+
+    if args.portfolio:
+        verify_steps = args.verify_steps or max_steps
+        run_portfolio(results, configured_spec, module_name, max_steps, backend, args.jobs or admission.max_parallel,
+                      admission=admission,
+                      samples=args.portfolio_samples,
+                      verify_steps=verify_steps if verifier_available() else None,
+                      timeout=args.portfolio_timeout)
+
+    if args.results:
+        # One row per witness and coverage predicate, after merging shards and the portfolio
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with args.results.open('a') as f:
+            for r in results:
+                f.write(json.dumps(r) + '\n')
+
     # Summary
     reachable = [r for r in results if r['found']]
-    unreachable = [r for r in results if not r['found']]
+    unreachable = [r for r in results if not r['found'] and r['status'] != SKIPPED]
+    proved = [r for r in unreachable if r.get('verdict') == UNREACHABLE]
+    not_found = [r for r in unreachable if r.get('verdict') != UNREACHABLE]
 
     print("=" * 60)
     print("Results")
     print("=" * 60)
-    print(f"Reachable: {len(reachable)}/{len(witnesses)}")
+    print(f"Reachable: {len(reachable)}/{len(results)}")
     print()
 
     if reachable:
         print("✓ Reachable witnesses:")
         for r in reachable:
-            print(f"  • {r['witness']} ({r['steps']} steps, seed: {r['seed']})")
+            if r['witness'] in r['witnessed']:
+                print(f"  • {r['witness']} (witnessed in {r['witnessed'][r['witness']]:g}% of traces)")
+            else:
+                print(f"  • {r['witness']} ({r['steps']} steps, seed: {r['seed'] or 'unknown'})")
+            if r.get('trace'):
+                print(f"    trace: {r['trace']}")
+        print()
+
+    if skipped:
+        print("✗ Statically unreachable (not run, see static_reachability.py):")
+        for r in skipped:
+            print(f"  • {r.name} ({r.error})")
+        print()
+
+    if proved:
+        print("✗ Proved unreachable (quint verify):")
+        for r in proved:
+            print(f"  • {r['witness']} (up to {r['bound']} steps)")
         print()
 
-    if unreachable:
-        print("✗ Unreachable witnesses (may need more steps):")
-        for r in unreachable:
-            print(f"  • {r['witness']}")
+    if not_found:
+        print("✗ Unreachable witnesses (may need more steps):" if not args.portfolio else
+              "? Not found (not proved unreachable):")
+        for r in not_found:
+            print(f"  • {r['witness']}" + (f" ({r['status']})" if r['status'] in (ERROR, TIMEOUT) else ''))
+            if r['status'] in (ERROR, TIMEOUT) and r.get('log'):
+                print(f"    log: {r['log']}")
         print()
 
 
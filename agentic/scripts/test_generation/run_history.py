@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Run history of quint jobs, used for scheduling and timeouts
+Usage: python3 run_history.py <spec_dir> [--witness NAME] [--limit N]
+
+Every run through QuintRunner with a RunHistory is recorded in a SQLite
+database, `.quint-cache/history.sqlite` next to the spec: spec-tree hash,
+witness, run parameters (everything that affects the search, i.e. not the
+seed or timeout), status, duration, steps and seed.
+
+The runner uses it to
+
+  * start the witnesses expected to take longest first, so the slowest ones
+    do not end up running alone at the end of a parallel batch, and
+  * extend the per-job timeout to TIMEOUT_FACTOR times the
+    TIMEOUT_PERCENTILE of the durations of completed runs (at most
+    MAX_TIMEOUT). A witness that only ever timed out gets twice its last
+    timeout instead. The job's own timeout is the floor: history never
+    cuts a run shorter than the caller allowed.
+
+Runs of the same witness and parameters on an older version of the spec are
+used when the current spec tree has no history yet, since most edits do not
+change the cost of a witness much. The CLI prints the recorded statistics.
+"""
+
+import argparse
+import json
+import math
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from quint_runner import ERROR, TIMEOUT, QuintJob, RunResult
+from spec_cache import CACHE_DIR_NAME, cache_dir, spec_hash
+
+DB_NAME = 'history.sqlite'
+MIN_RUNS = 3
+TIMEOUT_PERCENTILE = 95
+TIMEOUT_FACTOR = 2.0
+MAX_TIMEOUT = 1800.0
+HISTORY_WINDOW = 50
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    spec_hash TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    witness TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    steps INTEGER,
+    seed TEXT,
+    timeout REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_witness ON runs (witness, params, spec_hash);
+'''
+
+
+def job_params(job: QuintJob) -> str:
+    """The parameters that determine how expensive a run is, as a stable string."""
+    return json.dumps({
+        'command': job.command,
+        'main': job.main,
+        'invariant': job.invariant,
+        'max_steps': job.max_steps,
+        'max_samples': job.max_samples,
+        'backend': job.backend,
+        'witnesses': job.witnesses,
+        'extra_args': job.extra_args,
+    }, sort_keys=True)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class RunHistory:
+    """SQLite-backed record of previous runs, one database per spec directory."""
+
+    def __init__(self):
+        self.connections: Dict[Path, sqlite3.Connection] = {}
+        self.hashes: Dict[Path, str] = {}
+
+    def _db(self, spec: Path) -> sqlite3.Connection:
+        directory = Path(spec).resolve().parent
+        if directory not in self.connections:
+            connection = sqlite3.connect(cache_dir(spec) / DB_NAME, timeout=30)
+            connection.executescript(SCHEMA)
+            self.connections[directory] = connection
+        return self.connections[directory]
+
+    def _hash(self, spec: Path) -> str:
+        spec = Path(spec).resolve()
+        if spec not in self.hashes:
+            self.hashes[spec] = spec_hash(spec)
+        return self.hashes[spec]
+
+    def runs(self, job: QuintJob) -> List[sqlite3.Row]:
+        """Recent runs of this witness and parameters, on the current spec tree if it has any."""
+        db = self._db(job.spec)
+        db.row_factory = sqlite3.Row
+        query = ('SELECT * FROM runs WHERE witness = ? AND params = ? {} '
+                 'ORDER BY started DESC LIMIT ?')
+        args = (job.name, job_params(job))
+        rows = db.execute(query.format('AND spec_hash = ?'), args + (self._hash(job.spec), HISTORY_WINDOW)).fetchall()
+        return rows or db.execute(query.format(''), args + (HISTORY_WINDOW,)).fetchall()
+
+    def record(self, job: QuintJob, result: RunResult):
+        db = self._db(job.spec)
+        with db:
+            db.execute(
+                'INSERT INTO runs (started, spec_hash, spec, witness, params, status, duration, steps, seed, timeout) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (time.time() - result.duration, self._hash(job.spec), Path(job.spec).name, job.name,
+                 job_params(job), result.status, result.duration, result.steps, result.seed, job.timeout),
+            )
+
+    def expected_duration(self, job: QuintJob) -> Optional[float]:
+        """Median duration of previous runs, or None without history."""
+        durations = [row['duration'] for row in self.runs(job) if row['status'] != ERROR]
+        return percentile(durations, 50) if durations else None
+
+    def timeout(self, job: QuintJob) -> Optional[float]:
+        """Timeout learned from previous runs, never below the job's own; the latter while there are too few."""
+        if job.timeout is None:
+            return None
+        rows = self.runs(job)
+        completed = [row['duration'] for row in rows if row['status'] not in (TIMEOUT, ERROR)]
+        if len(completed) >= MIN_RUNS:
+            learned = TIMEOUT_FACTOR * percentile(completed, TIMEOUT_PERCENTILE)
+        elif rows and not completed and rows[0]['status'] == TIMEOUT and rows[0]['timeout']:
+            learned = 2 * rows[0]['timeout']
+        else:
+            return job.timeout
+        return max(job.timeout, min(MAX_TIMEOUT, learned))
+
+    def order(self, jobs: List[QuintJob]) -> List[int]:
+        """Indices of `jobs`, longest expected first; jobs without history go first."""
+        expected = [self.expected_duration(job) for job in jobs]
+        return sorted(range(len(jobs)), key=lambda i: -math.inf if expected[i] is None else -expected[i])
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show recorded quint run statistics")
+    parser.add_argument('spec_dir', type=Path)
+    parser.add_argument('--witness', help='only this witness')
+    parser.add_argument('--limit', type=int, default=50, help='number of witnesses to show')
+    args = parser.parse_args()
+
+    db_path = args.spec_dir / CACHE_DIR_NAME / DB_NAME
+    if not db_path.exists():
+        print(f"No run history in {args.spec_dir}")
+        sys.exit(1)
+
+    db = sqlite3.connect(db_path)
+    where, params = ('WHERE witness = ?', (args.witness,)) if args.witness else ('', ())
+    rows = db.execute(
+        f"SELECT witness, COUNT(*), SUM(status = 'violation'), SUM(status = 'timeout'), "
+        f'AVG(duration), MAX(duration), MIN(steps) FROM runs {where} '
+        f'GROUP BY witness ORDER BY AVG(duration) DESC LIMIT ?',
+        params + (args.limit,),
+    ).fetchall()
+
+    print("=" * 60)
+    print("Run History")
+    print("=" * 60)
+    print(f"  {'witness':<40} {'runs':>5} {'found':>6} {'t/o':>4} {'avg s':>7} {'max s':>7} {'min steps':>9}")
+    for witness, runs, found, timeouts, avg, longest, steps in rows:
+        print(f"  {witness:<40} {runs:>5} {found:>6} {timeouts:>4} {avg:>7.1f} {longest:>7.1f} "
+              f"{steps if steps is not None else '-':>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Per-spec cache helpers shared by the witness scripts
+
+Everything the scripts remember between runs lives in a `.quint-cache/`
+directory next to the spec, keyed by `spec_hash`: a content hash of the spec
+and every file it imports (transitively), so editing any module of the spec
+tree invalidates the cached entries. The cache files are shared by
+concurrent runs and queue workers, so `update_json` holds an exclusive lock
+for its read-modify-write.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List
+
+CACHE_DIR_NAME = '.quint-cache'
+
+IMPORT_RE = re.compile(r'\bfrom\s+"([^"]+)"')
+
+
+def spec_tree(spec_path: Path) -> List[Path]:
+    """Return the spec and all files it imports, in a stable order."""
+    seen = {}
+    pending = [Path(spec_path).resolve()]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.exists():
+            continue
+        content = path.read_text()
+        seen[path] = content
+        for target in IMPORT_RE.findall(content):
+            imported = (path.parent / target)
+            if imported.suffix != '.qnt':
+                imported = imported.with_name(imported.name + '.qnt')
+            pending.append(imported.resolve())
+    return sorted(seen)
+
+
+def spec_hash(spec_path: Path) -> str:
+    """Content hash of the spec tree (file names relative to the root spec)."""
+    root = Path(spec_path).resolve().parent
+    digest = hashlib.sha256()
+    for path in spec_tree(spec_path):
+        digest.update(os.path.relpath(path, root).encode())
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def cache_dir(spec_path: Path) -> Path:
+    """The `.quint-cache/` directory next to the spec (created on demand)."""
+    path = Path(spec_path).resolve().parent / CACHE_DIR_NAME
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def load_json(path: Path, default: Any = None) -> Any:
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {} if default is None else default
+
+
+def save_json(path: Path, data: Any):
+    """Write JSON atomically, so concurrent readers never see a partial file."""
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp')
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+@contextmanager
+def locked(path: Path):
+    """Exclusive lock on `path`, held through a `.<name>.lock` file next to it."""
+    path = Path(path)
+    with open(path.with_name(f'.{path.name}.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def update_json(path: Path, update) -> Dict:
+    """Load, apply `update(data)` in place, and save, without losing concurrent updates."""
+    with locked(path):
+        data = load_json(path)
+        update(data)
+        save_json(path, data)
+    return data
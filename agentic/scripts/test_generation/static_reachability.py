@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Static pre-filter for witnesses that cannot be reached
+Usage: python3 static_reachability.py <witness_spec.qnt> <module_name> [--force]
+Example: python3 static_reachability.py tendermint_witnesses.qnt tendermint_witnesses
+
+Some generated witnesses are dead before any simulation: the variant they
+look for is never constructed, or the listener they watch is not part of
+`main_listener`. Each would still run until its timeout. This pre-pass reads
+the spec IR (`quint compile --flatten false`), builds a graph of which
+definitions refer to which names, and reports a witness as statically
+unreachable, with the reason, when
+
+  * `witness_<V>_appears` / `cover_<V>` (gen_type_witnesses.py): the
+    constructor V is not used by any definition reachable from init or step;
+  * `witness_<L>Triggered` (gen_listener_witnesses.py): the listener L is not
+    referenced from main_listener, or its `<L>Triggered` log constructor is
+    not reachable from init or step.
+
+Names are resolved by their unqualified name, so a reference can only be
+over-approximated: a witness marked unreachable is never constructed on any
+path, while an unmarked one may still be dead. The analysis of each spec-tree
+version is cached in `.quint-cache/reachability.json`, which keeps the
+CACHE_LIMIT most recently analysed versions. If the IR cannot be produced,
+nothing is filtered.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import quint_runner
+from gen_listener_witnesses import to_camel_case
+from quint_runner import RunResult
+from spec_cache import cache_dir, load_json, spec_hash, update_json
+
+CACHE_FILE = 'reachability.json'
+CACHE_LIMIT = 20
+COMPILE_TIMEOUT = 300
+
+# Status of witnesses skipped by the pre-filter
+SKIPPED = 'skipped'
+
+ROOTS = ('init', 'step')
+MAIN_LISTENER = 'main_listener'
+
+VARIANT_WITNESS_RE = re.compile(r'^(?:witness_(\w+)_appears|cover_(\w+))$')
+LISTENER_WITNESS_RE = re.compile(r'^witness_(\w+)Triggered$')
+
+
+def compile_ir(spec: Path, main: Optional[str] = None, timeout: float = COMPILE_TIMEOUT) -> Dict:
+    """The unflattened JSON IR of the spec; raises RuntimeError if quint fails."""
+    spec = Path(spec).resolve()
+    cmd = [quint_runner.QUINT, 'compile', '--flatten', 'false', str(spec)]
+    if main:
+        cmd.append(f'--main={main}')
+    try:
+        proc = subprocess.run(cmd, cwd=spec.parent, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise RuntimeError(f"quint compile failed: {e}")
+    if proc.returncode != 0:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        raise RuntimeError(f"quint compile failed: {lines[0] if lines else f'exit code {proc.returncode}'}")
+    try:
+        return json.loads(proc.stdout)
+    except ValueError as e:
+        raise RuntimeError(f"quint compile printed invalid JSON: {e}")
+
+
+def base_name(name: str) -> str:
+    return name.rsplit('::', 1)[-1]
+
+
+def expr_refs(expr: Dict, refs: Set[str]):
+    """Add every name an IR expression refers to (operators, values, constructors)."""
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        kind = e.get('kind')
+        if kind == 'name':
+            refs.add(base_name(e['name']))
+        elif kind == 'app':
+            refs.add(base_name(e['opcode']))
+            args = e.get('args', [])
+            # variant("V", x) constructs V without naming its constructor
+            if e['opcode'] == 'variant' and args and args[0].get('kind') == 'str':
+                refs.add(args[0]['value'])
+            stack.extend(args)
+        elif kind == 'lambda':
+            stack.append(e['expr'])
+        elif kind == 'let':
+            stack.append(e['opdef']['expr'])
+            stack.append(e['expr'])
+
+
+class CallGraph:
+    """Definitions of all modules by unqualified name, with the names each one refers to."""
+
+    def __init__(self, ir: Dict):
+        self.refs: Dict[str, Set[str]] = {}
+        self.roots: Set[str] = set()
+        self.variants: Set[str] = set()
+        for module in ir.get('modules', []):
+            for decl in module.get('declarations', []):
+                kind = decl.get('kind')
+                if kind == 'def':
+                    expr_refs(decl['expr'], self.refs.setdefault(decl['name'], set()))
+                elif kind == 'typedef' and decl.get('type', {}).get('kind') == 'sum':
+                    self.variants.update(f['fieldName'] for f in decl['type']['fields']['fields'])
+                elif kind == 'instance':
+                    # Constant overrides are evaluated whenever the instance is used
+                    for _, expr in decl.get('overrides', []):
+                        expr_refs(expr, self.roots)
+                elif kind == 'assume' and 'assumption' in decl:
+                    expr_refs(decl['assumption'], self.roots)
+
+    def reachable(self, roots: Iterable[str]) -> Set[str]:
+        """All names referred to, transitively, from the given definitions."""
+        seen: Set[str] = set()
+        pending = list(roots)
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            pending.extend(self.refs.get(name, ()))
+        return seen
+
+
+def summarize(ir: Dict) -> Dict:
+    graph = CallGraph(ir)
+    return {
+        'variants': sorted(graph.variants),
+        'definitions': sorted(graph.refs),
+        'reached': sorted(graph.reachable(list(ROOTS) + sorted(graph.roots))),
+        'listener_reached': sorted(graph.reachable([MAIN_LISTENER])) if MAIN_LISTENER in graph.refs else None,
+    }
+
+
+def unreachable_reasons(summary: Dict, witnesses: Iterable[str]) -> Dict[str, str]:
+    """{witness: reason} for the witnesses the summary shows to be dead."""
+    variants = set(summary['variants'])
+    reached = set(summary['reached'])
+    listener_reached = set(summary['listener_reached']) if summary['listener_reached'] is not None else None
+    listeners = {to_camel_case(name): name for name in summary['definitions']}
+
+    def dead_constructor(variant):
+        return variant in variants and variant not in reached
+
+    reasons = {}
+    for witness in witnesses:
+        match = VARIANT_WITNESS_RE.match(witness)
+        if match:
+            variant = match.group(1) or match.group(2)
+            if dead_constructor(variant):
+                reasons[witness] = f"constructor {variant} is never used from {' or '.join(ROOTS)}"
+            continue
+        match = LISTENER_WITNESS_RE.match(witness)
+        if match:
+            listener = listeners.get(match.group(1))
+            if listener and listener_reached is not None and listener not in listener_reached:
+                reasons[witness] = f"listener {listener} is not referenced from {MAIN_LISTENER}"
+            elif dead_constructor(f'{match.group(1)}Triggered'):
+                reasons[witness] = (f"log constructor {match.group(1)}Triggered is never used from "
+                                    f"{' or '.join(ROOTS)}")
+    return reasons
+
+
+def static_unreachable(spec: Path, main: Optional[str], witnesses: List[str], force: bool = False,
+                       log: Callable[[str], None] = print) -> Dict[str, str]:
+    """{witness: reason} for statically unreachable witnesses; {} if the IR is unavailable."""
+    key = spec_hash(spec)
+    cache_path = cache_dir(spec) / CACHE_FILE
+    summary = None if force else load_json(cache_path).get(key, {}).get('modules', {}).get(main or '')
+    if summary is None:
+        try:
+            summary = summarize(compile_ir(spec, main))
+        except RuntimeError as e:
+            log(f"Warning: static pre-filter unavailable ({e})")
+            return {}
+
+        def update(data):
+            entry = data.setdefault(key, {})
+            entry.setdefault('modules', {})[main or ''] = summary
+            entry['analysed'] = time.time()
+            # Keys are hashes and save_json sorts them: evict by age, not key order
+            for stale in sorted(data, key=lambda k: data[k].get('analysed', 0))[:-CACHE_LIMIT]:
+                del data[stale]
+
+        update_json(cache_path, update)
+    return unreachable_reasons(summary, witnesses)
+
+
+def skipped_result(witness: str, reason: str) -> RunResult:
+    return RunResult(name=witness, status=SKIPPED, error=reason, meta={'static': reason})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find witnesses that are statically unreachable")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('module_name')
+    parser.add_argument('--force', action='store_true', help='re-analyse even if the result is cached')
+    args = parser.parse_args()
+
+    if not args.spec.exists():
+        print(f"Error: Spec file not found: {args.spec}")
+        sys.exit(1)
+
+    content = args.spec.read_text()
+    witnesses = re.findall(r'^\s*val\s+((?:witness|cover)_\w+)\s*=', content, re.MULTILINE)
+    reasons = static_unreachable(args.spec, args.module_name, witnesses, args.force)
+
+    print("=" * 60)
+    print("Static Reachability")
+    print("=" * 60)
+    print(f"Witnesses: {len(witnesses)}, statically unreachable: {len(reasons)}")
+    for witness, reason in reasons.items():
+        print(f"  ✗ {witness}: {reason}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for listener attribution in profile_listeners.py and the log counter
+that gen_listener_witnesses.py instruments
+Usage: python3 -m unittest test_profile_listeners
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from gen_listener_witnesses import create_instrumented_spec
+from profile_listeners import profile_traces
+
+TAGS = {'OnProposeTriggered': 'on_propose', 'OnVoteTriggered': 'on_vote'}
+
+
+def state(round_, tag, seq):
+    return {'choreo::s': {'round': {'#bigint': str(round_)},
+                          'extensions': {'log': {'tag': tag}, 'log_seq': {'#bigint': str(seq)}}}}
+
+
+class ProfileTracesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def profile(self, states):
+        path = Path(self.tmp.name) / 'trace.itf.json'
+        path.write_text(json.dumps({'states': states}))
+        return profile_traces([path], TAGS)
+
+    def test_back_to_back_firings_are_counted(self):
+        profile = self.profile([
+            state(0, 'NoLog', 0),
+            state(1, 'OnProposeTriggered', 1),
+            state(2, 'OnProposeTriggered', 2),
+            state(3, 'OnProposeTriggered', 3),
+            state(4, 'OnVoteTriggered', 4),
+        ])
+        self.assertEqual(profile['listeners']['on_propose']['fires'], 3)
+        self.assertEqual(profile['listeners']['on_vote']['fires'], 1)
+        self.assertEqual(profile['untagged_steps'], 0)
+
+    def test_step_without_log_effect_is_untagged(self):
+        # The state changes but log and log_seq keep the previous step's values
+        profile = self.profile([
+            state(0, 'NoLog', 0),
+            state(1, 'OnVoteTriggered', 1),
+            state(2, 'OnVoteTriggered', 1),
+        ])
+        self.assertEqual(profile['listeners']['on_vote']['fires'], 1)
+        self.assertEqual(profile['untagged_steps'], 1)
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_log_effect_bumps_the_counter(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = Path(tmp) / 'consensus.qnt'
+            spec.write_text(
+                'module consensus {\n'
+                '  type Extensions = {\n'
+                '    decided: bool\n'
+                '  }\n'
+                '  pure val initial_bookkeeping = { decided: false }\n'
+                '  action step = choreo::cue(ctx, on_propose, propose)\n'
+                '}\n')
+            content = create_instrumented_spec(spec, ['on_propose'], {'on_propose': 'propose'},
+                                               log=lambda _: None).read_text()
+        self.assertIn('log_seq: int', content)
+        self.assertIn('log_seq: 0', content)
+        self.assertIn('log_seq: env.extensions.log_seq + 1', content)
+
+
+if __name__ == '__main__':
+    unittest.main()
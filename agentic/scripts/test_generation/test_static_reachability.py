@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the static pre-filter of static_reachability.py, against fake_quint.py
+Usage: python3 -m unittest test_static_reachability
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import quint_runner
+import static_reachability
+from spec_cache import cache_dir, load_json, save_json, spec_hash
+from static_reachability import CACHE_FILE, static_unreachable
+
+FAKE_QUINT = Path(__file__).resolve().parent / 'fake_quint.py'
+
+SPEC = '''module phases {
+  type Phase = Running | Halted(int)
+  var phase: Phase
+  action init = phase' = Running
+  action step = all {
+    phase' = Running,
+  }
+  val witness_Running_appears = true
+  val witness_Halted_appears = true
+}
+'''
+
+
+class StaticReachabilityTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spec = Path(self.tmp.name) / 'phases.qnt'
+        self.spec.write_text(SPEC)
+        self.quint, quint_runner.QUINT = quint_runner.QUINT, str(FAKE_QUINT)
+
+    def tearDown(self):
+        quint_runner.QUINT = self.quint
+        self.tmp.cleanup()
+
+    def test_unused_constructor_is_unreachable(self):
+        witnesses = ['witness_Running_appears', 'witness_Halted_appears']
+        reasons = static_unreachable(self.spec, 'phases', witnesses, log=self.fail)
+        self.assertEqual(list(reasons), ['witness_Halted_appears'])
+
+    def test_cached_summary_is_reused(self):
+        static_unreachable(self.spec, 'phases', [], log=self.fail)
+        # A broken quint cannot be reached while the cached summary is valid
+        quint_runner.QUINT = str(Path(self.tmp.name) / 'missing')
+        reasons = static_unreachable(self.spec, 'phases', ['witness_Halted_appears'], log=self.fail)
+        self.assertIn('witness_Halted_appears', reasons)
+
+    def test_oldest_analysis_is_evicted(self):
+        cache_path = cache_dir(self.spec) / CACHE_FILE
+        newer, older = '0' * 64, 'f' * 64
+        save_json(cache_path, {newer: {'modules': {}, 'analysed': 2.0}, older: {'modules': {}, 'analysed': 1.0}})
+        limit, static_reachability.CACHE_LIMIT = static_reachability.CACHE_LIMIT, 2
+        try:
+            static_unreachable(self.spec, 'phases', [], log=self.fail)
+        finally:
+            static_reachability.CACHE_LIMIT = limit
+        self.assertEqual(set(load_json(cache_path)), {newer, spec_hash(self.spec)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the spool queue of work_queue.py
+Usage: python3 -m unittest test_work_queue
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from quint_runner import QuintJob
+from work_queue import SpoolQueue, job_id
+
+
+class SpoolQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SpoolQueue(Path(self.tmp.name))
+        asyncio.run(self.queue.start())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_starts_the_lease(self):
+        asyncio.run(self.queue.submit([{'id': 'a', 'job': {}}]))
+        # A job that waited in pending for longer than the lease
+        old = time.time() - 10
+        os.utime(self.queue.pending / 'a.json', (old, old))
+
+        self.assertEqual(asyncio.run(self.queue.claim('w'))['id'], 'a')
+        asyncio.run(self.queue.requeue_expired(1.0))
+        self.assertTrue((self.queue.claimed / 'a.json').exists())
+        self.assertFalse((self.queue.pending / 'a.json').exists())
+
+    def test_expired_claim_is_requeued(self):
+        asyncio.run(self.queue.submit([{'id': 'a', 'job': {}}]))
+        asyncio.run(self.queue.claim('w'))
+        old = time.time() - 10
+        os.utime(self.queue.claimed / 'a.json', (old, old))
+
+        asyncio.run(self.queue.requeue_expired(1.0))
+        self.assertTrue((self.queue.pending / 'a.json').exists())
+
+    def test_unseeded_jobs_differ_between_submissions(self):
+        job = QuintJob(name='w', spec=Path('s.qnt'), invariant='w')
+        self.assertEqual(job_id(job, 'h', 'n1'), job_id(job, 'h', 'n1'))
+        self.assertNotEqual(job_id(job, 'h', 'n1'), job_id(job, 'h', 'n2'))
+
+        seeded = QuintJob(name='w', spec=Path('s.qnt'), invariant='w', seed='0x1')
+        self.assertEqual(job_id(seeded, 'h', 'n1'), job_id(seeded, 'h', 'n2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Stored ITF traces of reached witnesses, and run logs
+Usage: python3 trace_store.py <spec.qnt> [witness] [--log] [--prune]
+Example: python3 trace_store.py specs/consensus_configured.qnt witness_decideTriggered
+
+Every witness run (a `quint run` or `quint verify` with an invariant) asks
+quint for its trace with `--out-itf`. If the run reaches the witness, the
+violating trace is kept as
+
+    .quint-cache/traces/<spec_hash>/<witness>.itf.json
+
+next to the spec, and its path is reported in the `trace` field of the
+result; otherwise the file is discarded. Sharded runs write one file per
+shard, and merging the shards keeps only the shortest trace under the
+witness name (see work_queue.merge_shards).
+
+The full output of every run is spooled to
+
+    .quint-cache/logs/<spec_hash>/<job>[.shard<i>][.<command>].log
+
+(without the command suffix for `quint run` and when it is the job name)
+while only a bounded tail is kept in memory, and the path is reported in the
+`log` field of the result. A later run of the same job on the same spec
+version overwrites its log.
+
+The CLI prints the stored trace of a witness for the current version of the
+spec (with --log, the path of its last run log), or lists all of them.
+--prune deletes traces and logs of older versions.
+"""
+
+import argparse
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from spec_cache import cache_dir, spec_hash
+
+TRACES_DIR = 'traces'
+LOGS_DIR = 'logs'
+SUFFIX = '.itf.json'
+LOG_SUFFIX = '.log'
+
+
+def trace_dir(spec: Path, key: Optional[str] = None) -> Path:
+    return cache_dir(spec) / TRACES_DIR / (key or spec_hash(spec))
+
+
+def trace_path(spec: Path, witness: str, shard: Optional[int] = None, key: Optional[str] = None) -> Path:
+    name = witness if shard is None else f'{witness}.shard{shard}'
+    return trace_dir(spec, key) / f'{name}{SUFFIX}'
+
+
+def canonical_path(path: Path, witness: str) -> Path:
+    """The witness-keyed path for a (possibly per-shard) stored trace."""
+    return Path(path).with_name(f'{witness}{SUFFIX}')
+
+
+def job_spec(job) -> Path:
+    return Path(job.cwd or '.') / job.spec
+
+
+def trace_output(job, key: Optional[str] = None) -> Optional[Tuple[Path, Path]]:
+    """
+    For witness runs that do not already write ITF, the (temporary, final)
+    paths of their trace; None for any other job. `key` is the spec hash, if
+    the caller already knows it.
+    """
+    if job.command not in ('run', 'verify') or not job.invariant or job.out_itf:
+        return None
+    final = trace_path(job_spec(job), job.name, job.meta.get('shard'), key)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    return final.with_name(f'.{final.name}.{uuid.uuid4().hex[:8]}.tmp{SUFFIX}'), final
+
+
+def log_path(spec: Path, name: str, shard: Optional[int] = None, command: str = 'run',
+             key: Optional[str] = None) -> Path:
+    if shard is not None:
+        name = f'{name}.shard{shard}'
+    if command not in ('run', name):
+        name = f'{name}.{command}'
+    return cache_dir(spec) / LOGS_DIR / (key or spec_hash(spec)) / f'{name}{LOG_SUFFIX}'
+
+
+def log_output(job, key: Optional[str] = None) -> Path:
+    """Where the output of a job is spooled."""
+    path = log_path(job_spec(job), job.name, job.meta.get('shard'), job.command, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def stored_traces(spec: Path) -> List[Path]:
+    directory = trace_dir(spec)
+    if not directory.exists():
+        return []
+    # Runs in progress write to hidden temporary files
+    return sorted(path for path in directory.glob(f'*{SUFFIX}') if not path.name.startswith('.'))
+
+
+def stale_dirs(spec: Path) -> List[Path]:
+    """Trace and log directories of other versions of the spec tree."""
+    current = spec_hash(spec)
+    stale = []
+    for root in (cache_dir(spec) / TRACES_DIR, cache_dir(spec) / LOGS_DIR):
+        if root.exists():
+            stale += [d for d in root.iterdir() if d.is_dir() and d.name != current]
+    return sorted(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show stored witness traces of a spec")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('witness', nargs='?', help='print the path of this witness trace')
+    parser.add_argument('--log', action='store_true', help='print the path of the witness run log instead')
+    parser.add_argument('--prune', action='store_true', help='delete traces of older versions of the spec')
+    args = parser.parse_args()
+
+    if not args.spec.exists():
+        print(f"Error: Spec file not found: {args.spec}")
+        sys.exit(1)
+
+    if args.prune:
+        for directory in stale_dirs(args.spec):
+            shutil.rmtree(directory)
+            print(f"Removed {directory}")
+
+    if args.witness:
+        path = log_path(args.spec, args.witness) if args.log else trace_path(args.spec, args.witness)
+        if not path.exists():
+            kind = 'log' if args.log else 'trace'
+            print(f"No stored {kind} for {args.witness} (spec version {spec_hash(args.spec)})", file=sys.stderr)
+            sys.exit(1)
+        print(path)
+        return
+
+    traces = stored_traces(args.spec)
+    print(f"Traces for spec version {spec_hash(args.spec)}: {len(traces)}")
+    for path in traces:
+        print(f"  {path.name[:-len(SUFFIX)]:<50} {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Cached `quint typecheck` gate
+Usage: python3 typecheck.py <spec.qnt> [--force]
+
+A generated witness spec with a type error makes every witness run fail, so
+the runners typecheck the spec once before fanning out and abort with the
+compiler output if it does not pass. Passing results are remembered in
+`.quint-cache/typecheck.json` by spec-tree hash (see spec_cache.py), so the
+gate costs one hash of the spec files when nothing has changed. Failures are
+not cached.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from quint_runner import OK, QuintJob, RunResult, run_job
+from spec_cache import cache_dir, load_json, spec_hash, update_json
+
+CACHE_FILE = 'typecheck.json'
+MAX_ENTRIES = 50
+DEFAULT_TIMEOUT = 300
+
+
+async def typecheck(spec: Path, timeout: float = DEFAULT_TIMEOUT, force: bool = False) -> RunResult:
+    """
+    Typecheck the spec tree unless it passed before. The result is OK or
+    ERROR/TIMEOUT with the compiler output; meta['cached'] tells whether
+    quint actually ran.
+    """
+    spec = Path(spec).resolve()
+    cache = cache_dir(spec) / CACHE_FILE
+    key = spec_hash(spec)
+    if not force and key in load_json(cache):
+        return RunResult(name='typecheck', status=OK, meta={'cached': True, 'spec_hash': key})
+
+    job = QuintJob(name='typecheck', spec=spec, command='typecheck', timeout=timeout, cwd=spec.parent,
+                   meta={'cached': False, 'spec_hash': key})
+    result = await run_job(job)
+    if result.status == OK:
+        def update(passed):
+            passed[key] = {'spec': spec.name, 'checked': time.time()}
+            # Keep the most recent passes only
+            for old in sorted(passed, key=lambda k: passed[k]['checked'])[:-MAX_ENTRIES]:
+                del passed[old]
+
+        update_json(cache, update)
+    return result
+
+
+def typecheck_sync(spec: Path, timeout: float = DEFAULT_TIMEOUT, force: bool = False) -> RunResult:
+    return asyncio.run(typecheck(spec, timeout, force))
+
+
+def print_failure(spec: Path, result: RunResult):
+    print(f"✗ Typecheck failed for {spec}:")
+    print(result.output.rstrip() or result.error or f"quint exited with code {result.returncode}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typecheck a spec, skipping specs that passed before")
+    parser.add_argument('spec', type=Path)
+    parser.add_argument('--force', action='store_true', help='ignore the cache')
+    args = parser.parse_args()
+
+    if not args.spec.exists():
+        print(f"Error: Spec file not found: {args.spec}")
+        sys.exit(1)
+
+    result = typecheck_sync(args.spec, force=args.force)
+    if result.status != OK:
+        print_failure(args.spec, result)
+        sys.exit(1)
+    print(f"✓ Typecheck passed{' (cached)' if result.meta['cached'] else ''}")
+
+
+if __name__ == '__main__':
+    main()
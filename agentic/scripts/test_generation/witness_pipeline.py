@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Generate and run listener and type witnesses in a single process
+Usage: python3 witness_pipeline.py instrument <spec.qnt> [--config CONFIG] [--instrumentation MODE]
+       python3 witness_pipeline.py gen-types <spec.qnt> TYPE ACCESS_EXPR [TYPE ACCESS_EXPR ...] [--config CONFIG] [--combined]
+       python3 witness_pipeline.py run <witness_spec.qnt> <module_name> [--max-steps N]
+       python3 witness_pipeline.py all <spec.qnt> [--config CONFIG] [--types TYPE ACCESS_EXPR ...] [--max-steps N]
+Example: python3 witness_pipeline.py all tendermint.qnt --config "N=4" \
+           --types Stage "s.system.values().map(st => st.stage)" --max-steps 50 --json
+
+Each subcommand is also a function (`instrument`, `gen_types`, `run`,
+`run_all`) that takes a loaded `Spec` and returns plain data instead of
+printing or exiting, so a whole verification pass -- instrumenting the
+listeners, generating type witnesses and running every witness -- happens in
+one process: the spec is read and its listeners discovered once, and the
+witness lists come straight from the generators instead of being re-parsed
+from the generated files. `all` runs the listener and type witnesses as one
+batch through quint_runner.py.
+
+Generated modules are typechecked before any witness runs (cached, see
+typecheck.py), and witnesses that cannot be reached by construction are
+reported without running them (see static_reachability.py,
+--no-static-filter). With --json the CLI prints the returned data as JSON;
+otherwise a summary.
+Generation and runner failures raise PipelineError.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from gen_listener_witnesses import (INSTRUMENTATION_MODES, create_configured_spec, create_instrumented_spec,
+                                    discover_listeners, extract_module_name, to_camel_case)
+from backend import FALLBACK, add_backend_argument, resolve_backend_sync
+from gen_type_witnesses import generate_witness_spec
+from quint_runner import OK, QuintRunner
+from run_all_witnesses import expand_coverage, extract_coverage, extract_witnesses, witness_jobs
+from run_history import RunHistory
+from static_reachability import skipped_result, static_unreachable
+from typecheck import typecheck_sync
+from work_queue import merge_shards
+
+
+class PipelineError(Exception):
+    pass
+
+
+@dataclass
+class Spec:
+    """A spec read and analysed once, shared by all pipeline steps."""
+    path: Path
+    content: str
+    module_name: str
+    listeners: List[str] = field(default_factory=list)
+    listener_to_action: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Spec':
+        path = Path(path)
+        if not path.exists():
+            raise PipelineError(f"Spec file not found: {path}")
+        content = path.read_text()
+        module_name = extract_module_name(content)
+        if not module_name:
+            raise PipelineError(f"Could not find module name in {path}")
+        listeners, listener_to_action = discover_listeners(content)
+        return cls(path, content, module_name, listeners, listener_to_action)
+
+
+@dataclass
+class WitnessSpec:
+    """A generated module and the witnesses it defines."""
+    path: Path
+    module_name: str
+    witnesses: List[str] = field(default_factory=list)
+    covers: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path, module_name: str) -> 'WitnessSpec':
+        path = Path(path)
+        if not path.exists():
+            raise PipelineError(f"Witness spec not found: {path}")
+        return cls(path, module_name, extract_witnesses(path), extract_coverage(path))
+
+    def to_dict(self) -> Dict:
+        return {'path': str(self.path), 'module': self.module_name,
+                'witnesses': self.witnesses, 'covers': self.covers}
+
+
+def instrument(spec: Spec, config: Optional[str] = None, mode: str = 'checked') -> Dict:
+    """Instrument the listeners and write the `_configured` module with one witness per listener."""
+    if not spec.listeners:
+        raise PipelineError(f"No listeners found in {spec.path}")
+    notes = []
+    instrumented = create_instrumented_spec(spec.path, spec.listeners, spec.listener_to_action, mode,
+                                            log=notes.append, spec_content=spec.content)
+    if instrumented is None:
+        raise PipelineError('; '.join(notes) or "Failed to create instrumented spec")
+    configured = create_configured_spec(spec.path, spec.module_name, config, spec.listeners, instrumented)
+    witnesses = [f"witness_{to_camel_case(listener)}Triggered" for listener in spec.listeners]
+    return {
+        'instrumented': instrumented,
+        'witness_spec': WitnessSpec(configured, f'{spec.module_name}_configured', witnesses),
+        'listeners': {listener: spec.listener_to_action.get(listener, listener) for listener in spec.listeners},
+        'notes': notes,
+    }
+
+
+def gen_types(spec: Spec, type_access_pairs: List[Tuple[str, str]], config: Optional[str] = None,
+              combined: bool = False) -> Dict:
+    """Write the `_witnesses` module for the given sum types."""
+    notes = []
+    path, all_variants = generate_witness_spec(spec.path, spec.module_name, config, type_access_pairs,
+                                               combined, log=notes.append, spec_content=spec.content)
+    if not all_variants:
+        raise PipelineError("No variants found for the given types")
+    names = [witness for witness, _, _ in all_variants]
+    witness_spec = WitnessSpec(path, f'{spec.module_name}_witnesses',
+                               witnesses=[] if combined else names, covers=names if combined else [])
+    variants: Dict[str, List[str]] = {}
+    for _, type_name, variant in all_variants:
+        variants.setdefault(type_name, []).append(variant)
+    return {'witness_spec': witness_spec, 'variants': variants, 'notes': notes}
+
+
+def run(witness_specs: List[WitnessSpec], max_steps: int = 100, shards: int = 1,
+        runner: Optional[QuintRunner] = None, check_types: bool = True, backend: str = FALLBACK,
+        static_filter: bool = True) -> Dict:
+    """
+    Run every witness of the given modules as one batch and sort them into
+    reachable/unreachable. Each module is typechecked first (see typecheck.py)
+    and, with backend 'auto', run on the backend calibrated on its first
+    witness (see backend.py).
+    Witnesses that are statically unreachable are skipped (see
+    static_reachability.py) unless `static_filter` is off.
+    """
+    history = None
+    if runner is None:
+        history = RunHistory()
+        runner = QuintRunner(history=history)
+    try:
+        return run_batch(witness_specs, max_steps, shards, runner, check_types, backend, static_filter)
+    finally:
+        if history is not None:
+            history.close()
+
+
+def run_batch(witness_specs: List[WitnessSpec], max_steps: int, shards: int, runner: QuintRunner,
+              check_types: bool, backend: str, static_filter: bool) -> Dict:
+    """Typecheck, filter and run the witnesses of `witness_specs` on `runner`; see `run`."""
+    jobs, skipped, notes = [], [], []
+    for witness_spec in witness_specs:
+        if check_types:
+            check = typecheck_sync(witness_spec.path)
+            if check.status != OK:
+                raise PipelineError(f"Typecheck failed for {witness_spec.path}:\n"
+                                    f"{check.output.rstrip() or check.error}")
+        witnesses, covers = witness_spec.witnesses, witness_spec.covers
+        if static_filter:
+            reasons = static_unreachable(witness_spec.path, witness_spec.module_name, witnesses + covers,
+                                         log=notes.append)
+            skipped.extend(skipped_result(witness, reason) for witness, reason in reasons.items())
+            witnesses = [w for w in witnesses if w not in reasons]
+            covers = [c for c in covers if c not in reasons]
+        spec_backend = resolve_backend_sync(witness_spec.path, witness_spec.module_name, backend,
+                                            witnesses[0] if witnesses else None)
+        spec_jobs = witness_jobs(witness_spec.path, witness_spec.module_name, witnesses,
+                                 covers, max_steps, shards, spec_backend)
+        for job in spec_jobs:
+            job.meta = {**job.meta, 'module': witness_spec.module_name}
+        jobs.extend(spec_jobs)
+    if not jobs and not skipped:
+        raise PipelineError("No witnesses to run")
+
+    results = [r.to_dict() for r in merge_shards(expand_coverage(runner.run_sync(jobs)) if jobs else [])]
+    return {
+        'results': results + [r.to_dict() for r in skipped],
+        'reachable': [r['witness'] for r in results if r['found']],
+        'unreachable': [r['witness'] for r in results if not r['found']],
+        'skipped': {r.name: r.error for r in skipped},
+        'notes': notes,
+    }
+
+
+def run_all(spec: Spec, config: Optional[str] = None, type_access_pairs: List[Tuple[str, str]] = (),
+            combined: bool = False, mode: str = 'checked', max_steps: int = 100,
+            runner: Optional[QuintRunner] = None, check_types: bool = True, backend: str = FALLBACK,
+            static_filter: bool = True) -> Dict:
+    """Instrument listeners, generate type witnesses and run everything in one batch."""
+    report = {'spec': str(spec.path), 'module': spec.module_name}
+    witness_specs = []
+    if spec.listeners:
+        report['instrument'] = instrument(spec, config, mode)
+        witness_specs.append(report['instrument']['witness_spec'])
+    if type_access_pairs:
+        report['gen_types'] = gen_types(spec, type_access_pairs, config, combined)
+        witness_specs.append(report['gen_types']['witness_spec'])
+    report['run'] = run(witness_specs, max_steps, runner=runner, check_types=check_types, backend=backend,
+                        static_filter=static_filter)
+    return report
+
+
+def to_json(data):
+    if isinstance(data, WitnessSpec):
+        return data.to_dict()
+    if isinstance(data, Path):
+        return str(data)
+    if isinstance(data, dict):
+        return {k: to_json(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [to_json(v) for v in data]
+    return data
+
+
+def print_run(report: Dict):
+    print("=" * 60)
+    print("Results")
+    print("=" * 60)
+    print(f"Reachable: {len(report['reachable'])}/{len(report['results'])}")
+    print()
+    if report['reachable']:
+        print("✓ Reachable witnesses:")
+        for witness in report['reachable']:
+            print(f"  • {witness}")
+        print()
+    if report['unreachable']:
+        print("✗ Unreachable witnesses (may need more steps):")
+        for witness in report['unreachable']:
+            print(f"  • {witness}")
+        print()
+    if report['skipped']:
+        print("✗ Statically unreachable (not run):")
+        for witness, reason in report['skipped'].items():
+            print(f"  • {witness} ({reason})")
+        print()
+
+
+def print_generated(report: Dict):
+    witness_spec = report['witness_spec']
+    count = len(witness_spec.witnesses) + len(witness_spec.covers)
+    print(f"✓ {witness_spec.path} ({witness_spec.module_name}, {count} witnesses)")
+
+
+def print_summary(command: str, report: Dict):
+    if command in ('instrument', 'gen-types'):
+        print_generated(report)
+    elif command == 'run':
+        print_run(report)
+    else:
+        for step in ('instrument', 'gen_types'):
+            if step in report:
+                print_generated(report[step])
+        print()
+        print_run(report['run'])
+
+
+def type_pairs(values: List[str]) -> List[Tuple[str, str]]:
+    if len(values) % 2:
+        raise PipelineError(f"Expected ACCESS_EXPR after TYPE '{values[-1]}'")
+    return list(zip(values[::2], values[1::2]))
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help='print the result as JSON')
+    parser = argparse.ArgumentParser(description="Generate and run listener and type witnesses in one process")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('instrument', parents=[common], help='instrument listeners and write the _configured module')
+    p.add_argument('spec', type=Path)
+    p.add_argument('--config')
+    p.add_argument('--instrumentation', choices=INSTRUMENTATION_MODES, default='checked')
+
+    p = subparsers.add_parser('gen-types', parents=[common], help='write the _witnesses module for sum types')
+    p.add_argument('spec', type=Path)
+    p.add_argument('types', nargs='+', metavar='TYPE ACCESS_EXPR')
+    p.add_argument('--config')
+    p.add_argument('--combined', action='store_true')
+
+    p = subparsers.add_parser('run', parents=[common], help='run all witnesses of a generated module')
+    p.add_argument('witness_spec', type=Path)
+    p.add_argument('module_name')
+    p.add_argument('--max-steps', type=int, default=100)
+    p.add_argument('--shards', type=int, default=1)
+    p.add_argument('--jobs', '-j', type=int)
+    p.add_argument('--no-typecheck', action='store_true')
+    p.add_argument('--no-static-filter', action='store_true')
+    add_backend_argument(p)
+
+    p = subparsers.add_parser('all', parents=[common], help='instrument, generate type witnesses and run everything')
+    p.add_argument('spec', type=Path)
+    p.add_argument('--config')
+    p.add_argument('--types', nargs='+', default=[], metavar='TYPE ACCESS_EXPR')
+    p.add_argument('--combined', action='store_true')
+    p.add_argument('--instrumentation', choices=INSTRUMENTATION_MODES, default='checked')
+    p.add_argument('--max-steps', type=int, default=100)
+    p.add_argument('--jobs', '-j', type=int)
+    p.add_argument('--no-typecheck', action='store_true')
+    p.add_argument('--no-static-filter', action='store_true')
+    add_backend_argument(p)
+
+    args = parser.parse_args()
+
+    history = RunHistory()
+    try:
+        if args.command == 'instrument':
+            report = instrument(Spec.load(args.spec), args.config, args.instrumentation)
+        elif args.command == 'gen-types':
+            report = gen_types(Spec.load(args.spec), type_pairs(args.types), args.config, args.combined)
+        elif args.command == 'run':
+            witness_spec = WitnessSpec.load(args.witness_spec, args.module_name)
+            report = run([witness_spec], args.max_steps, args.shards, QuintRunner(jobs=args.jobs, history=history),
+                         not args.no_typecheck, args.backend, not args.no_static_filter)
+        else:
+            report = run_all(Spec.load(args.spec), args.config, type_pairs(args.types), args.combined,
+                             args.instrumentation, args.max_steps, QuintRunner(jobs=args.jobs, history=history),
+                             not args.no_typecheck, args.backend, not args.no_static_filter)
+    except PipelineError as e:
+        if args.json:
+            print(json.dumps({'error': str(e)}))
+        else:
+            print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        history.close()
+
+    if args.json:
+        print(json.dumps(to_json(report), indent=2))
+    else:
+        print_summary(args.command, report)
+
+
+if __name__ == '__main__':
+    main()
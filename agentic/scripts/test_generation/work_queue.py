@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Multi-host work queue for witness and trace runs
+Usage: python3 work_queue.py <spool_dir | tcp://host:port> [--jobs N] [--exit-when-done]
+Example: python3 work_queue.py /shared/quint-queue --jobs 8
+
+This is the worker side. The coordinator side is `run_distributed`, used by
+`run_all_witnesses.py --queue ...` and `iteratedTraceGeneration.py --queue ...`:
+it submits the jobs, optionally starts local workers, and merges the results
+into the same report a single-host run produces.
+
+Two backends share the same operations (submit, claim, heartbeat, complete):
+
+  spool directory   A directory shared between hosts (e.g. NFS):
+                      pending/<id>.json   jobs waiting for a worker
+                      claimed/<id>.json   jobs being run; the worker touches
+                                          the file as a heartbeat
+                      results/<id>.json   finished results
+                      closed              written when the coordinator is done
+                    Claiming is an atomic rename from pending/ to claimed/.
+
+  tcp://host:port   The coordinator serves an in-memory queue over a JSON
+                    lines protocol; workers connect to it.
+
+A job id is a hash of the spec tree hash and the job parameters (witness,
+steps, samples, seed, ...), so submitting the same job twice, or a worker
+reporting a job that was already completed, is harmless. Results of seeded
+jobs already in the spool are reused; jobs without a seed are random runs,
+so their id also includes a per-submission nonce and every coordinator run
+gets fresh results. Claims whose heartbeat stops for longer than the lease
+are put back in the queue; the lease starts when the job is claimed.
+
+Workers run each job only if their copy of the spec has the same hash as the
+coordinator's, so every host must see the spec at the same path.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from quint_runner import ERROR, QuintJob, RunResult, run_job
+from spec_cache import load_json, save_json, spec_hash
+from trace_store import canonical_path
+
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 5.0
+DEFAULT_LEASE = 60.0
+
+
+def job_id(job: QuintJob, tree_hash: str, nonce: Optional[str] = None) -> str:
+    """Stable for seeded jobs; jobs without a seed are only equal within one submission (`nonce`)."""
+    params = job.to_dict()
+    for key in ('meta', 'timeout', 'cwd'):
+        params.pop(key)
+    key = [tree_hash, params] if job.seed is not None else [tree_hash, params, nonce]
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode())
+    return digest.hexdigest()[:20]
+
+
+def make_entry(job: QuintJob, hashes: Dict[Path, str], nonce: Optional[str] = None) -> Dict:
+    spec = Path(job.spec).resolve()
+    if spec not in hashes:
+        hashes[spec] = spec_hash(spec)
+    job = QuintJob.from_dict({**job.to_dict(), 'spec': str(spec)})
+    return {'id': job_id(job, hashes[spec], nonce), 'spec_hash': hashes[spec], 'job': job.to_dict()}
+
+
+class SpoolQueue:
+    """Queue backed by a directory shared between hosts."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.pending = self.root / 'pending'
+        self.claimed = self.root / 'claimed'
+        self.results = self.root / 'results'
+        self.closed_marker = self.root / 'closed'
+
+    async def start(self):
+        for d in (self.pending, self.claimed, self.results):
+            d.mkdir(parents=True, exist_ok=True)
+
+    async def submit(self, entries: List[Dict]):
+        self.closed_marker.unlink(missing_ok=True)
+        for entry in entries:
+            name = f"{entry['id']}.json"
+            if (self.results / name).exists() or (self.claimed / name).exists():
+                continue
+            save_json(self.pending / name, entry)
+
+    async def claim(self, worker: str) -> Optional[Dict]:
+        for path in sorted(self.pending.glob('*.json')):
+            target = self.claimed / path.name
+            try:
+                os.rename(path, target)
+            except OSError:
+                continue  # another worker was faster
+            # The rename keeps the mtime of the submission; the lease starts now
+            await self.heartbeat(path.stem)
+            entry = load_json(target)
+            if (self.results / path.name).exists():
+                target.unlink(missing_ok=True)
+                continue
+            return entry
+        return None
+
+    async def heartbeat(self, entry_id: str):
+        try:
+            os.utime(self.claimed / f'{entry_id}.json')
+        except OSError:
+            pass
+
+    async def complete(self, entry_id: str, result: Dict):
+        save_json(self.results / f'{entry_id}.json', result)
+        (self.claimed / f'{entry_id}.json').unlink(missing_ok=True)
+
+    async def collect(self, ids) -> Dict[str, Dict]:
+        found = {}
+        for entry_id in ids:
+            path = self.results / f'{entry_id}.json'
+            if path.exists():
+                found[entry_id] = load_json(path)
+        return found
+
+    async def requeue_expired(self, lease: float):
+        now = time.time()
+        for path in self.claimed.glob('*.json'):
+            try:
+                if now - path.stat().st_mtime > lease:
+                    os.rename(path, self.pending / path.name)
+            except OSError:
+                pass
+
+    async def is_closed(self) -> bool:
+        return self.closed_marker.exists()
+
+    async def close(self):
+        self.closed_marker.touch()
+
+
+class MemoryQueue:
+    """In-process queue served to remote workers by QueueServer."""
+
+    def __init__(self):
+        self.pending: Dict[str, Dict] = {}
+        self.claimed: Dict[str, Dict] = {}
+        self.claim_times: Dict[str, float] = {}
+        self.results: Dict[str, Dict] = {}
+        self.closed = False
+
+    async def start(self):
+        pass
+
+    async def submit(self, entries):
+        self.closed = False
+        for entry in entries:
+            if entry['id'] not in self.results and entry['id'] not in self.claimed:
+                self.pending[entry['id']] = entry
+
+    async def claim(self, worker):
+        if not self.pending:
+            return None
+        entry_id = next(iter(self.pending))
+        entry = self.pending.pop(entry_id)
+        self.claimed[entry_id] = entry
+        self.claim_times[entry_id] = time.time()
+        return entry
+
+    async def heartbeat(self, entry_id):
+        if entry_id in self.claimed:
+            self.claim_times[entry_id] = time.time()
+
+    async def complete(self, entry_id, result):
+        self.results[entry_id] = result
+        self.claimed.pop(entry_id, None)
+        self.claim_times.pop(entry_id, None)
+
+    async def collect(self, ids):
+        return {i: self.results[i] for i in ids if i in self.results}
+
+    async def requeue_expired(self, lease):
+        now = time.time()
+        for entry_id, claimed_at in list(self.claim_times.items()):
+            if now - claimed_at > lease:
+                self.pending[entry_id] = self.claimed.pop(entry_id)
+                del self.claim_times[entry_id]
+
+    async def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class QueueServer:
+    """Serves a MemoryQueue to workers over TCP (one JSON object per line)."""
+
+    def __init__(self, queue: MemoryQueue, host: str, port: int):
+        self.queue = queue
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        await self.queue.start()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                op = request['op']
+                if op == 'claim':
+                    reply = {'entry': await self.queue.claim(request.get('worker'))}
+                elif op == 'heartbeat':
+                    await self.queue.heartbeat(request['id'])
+                    reply = {}
+                elif op == 'complete':
+                    await self.queue.complete(request['id'], request['result'])
+                    reply = {}
+                elif op == 'closed':
+                    reply = {'closed': await self.queue.is_closed()}
+                else:
+                    reply = {'error': f'unknown op {op}'}
+                writer.write((json.dumps(reply) + '\n').encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # Coordinator-side operations go straight to the queue
+    async def submit(self, entries):
+        await self.queue.submit(entries)
+
+    async def collect(self, ids):
+        return await self.queue.collect(ids)
+
+    async def requeue_expired(self, lease):
+        await self.queue.requeue_expired(lease)
+
+    async def close(self):
+        await self.queue.close()
+
+    async def shutdown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class RemoteQueue:
+    """Worker-side client for a QueueServer."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, **request):
+        async with self.lock:
+            self.writer.write((json.dumps(request) + '\n').encode())
+            await self.writer.drain()
+            line = await self.reader.readline()
+        if not line:
+            raise ConnectionError('coordinator closed the connection')
+        return json.loads(line)
+
+    async def claim(self, worker):
+        return (await self.request(op='claim', worker=worker))['entry']
+
+    async def heartbeat(self, entry_id):
+        await self.request(op='heartbeat', id=entry_id)
+
+    async def complete(self, entry_id, result):
+        await self.request(op='complete', id=entry_id, result=result)
+
+    async def is_closed(self):
+        return (await self.request(op='closed'))['closed']
+
+
+def parse_tcp_url(url: str):
+    host, _, port = url[len('tcp://'):].rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def open_queue(url: str, coordinator: bool):
+    if url.startswith('tcp://'):
+        host, port = parse_tcp_url(url)
+        return QueueServer(MemoryQueue(), host, port) if coordinator else RemoteQueue(host, port)
+    return SpoolQueue(Path(url))
+
+
+def merge_shards(results: List[RunResult]) -> List[RunResult]:
+    """
+    Combine results of jobs split over seed ranges (same name, meta['shard']).
+    A witness is found if any shard found it; the shortest trace is kept,
+    under the witness name, and the other shards' traces are deleted. The
+    merged duration is the total over all shards.
+    """
+    merged: Dict[str, RunResult] = {}
+    durations: Dict[str, float] = {}
+    shards: Dict[str, int] = {}
+    for result in results:
+        durations[result.name] = durations.get(result.name, 0.0) + result.duration
+        shards[result.name] = shards.get(result.name, 0) + 1
+    for result in results:
+        best = merged.get(result.name)
+        if best is None:
+            merged[result.name] = result
+        elif result.found and (not best.found or (result.steps or 0) < (best.steps or 0)):
+            merged[result.name] = result
+        elif not best.found and best.status != ERROR and result.status == ERROR:
+            merged[result.name] = result
+
+    for result in results:
+        best = merged[result.name]
+        if result.trace and result is not best and 'shard' in result.meta:
+            Path(result.trace).unlink(missing_ok=True)
+    for result in merged.values():
+        if result.trace and 'shard' in result.meta and Path(result.trace).exists():
+            canonical = canonical_path(Path(result.trace), result.name)
+            os.replace(result.trace, canonical)
+            result.trace = str(canonical)
+    for name, result in merged.items():
+        if shards[name] > 1:
+            result.duration = durations[name]
+            meta = {k: v for k, v in result.meta.items() if k != 'shard'}
+            result.meta = {**meta, 'shards': shards[name]}
+    return list(merged.values())
+
+
+async def run_distributed(jobs: List[QuintJob], url: str, local_workers: int = 0,
+                          sinks=None, lease: float = DEFAULT_LEASE) -> List[RunResult]:
+    """Coordinator: queue `jobs`, wait for workers to run them, return results in job order."""
+    sinks = sinks or []
+    queue = open_queue(url, coordinator=True)
+    await queue.start()
+
+    hashes: Dict[Path, str] = {}
+    nonce = uuid.uuid4().hex
+    entries = [make_entry(job, hashes, nonce) for job in jobs]
+    await queue.submit(entries)
+
+    workers = []
+    worker_script = Path(__file__).resolve()
+    for _ in range(local_workers):
+        workers.append(await asyncio.create_subprocess_exec(
+            sys.executable, str(worker_script), url, '--jobs', '1', '--exit-when-done'))
+
+    for sink in sinks:
+        sink.start(len(jobs))
+
+    results: Dict[str, RunResult] = {}
+    remaining = {entry['id'] for entry in entries}
+    try:
+        while remaining:
+            for entry_id, data in (await queue.collect(remaining)).items():
+                remaining.discard(entry_id)
+                results[entry_id] = RunResult.from_dict(data)
+                for sink in sinks:
+                    sink.job_finished(results[entry_id])
+            if remaining:
+                await queue.requeue_expired(lease)
+                await asyncio.sleep(POLL_SECONDS)
+    finally:
+        await queue.close()
+        for sink in sinks:
+            sink.close()
+        for worker in workers:
+            if remaining and worker.returncode is None:
+                worker.terminate()
+            await worker.wait()
+        if isinstance(queue, QueueServer):
+            await queue.shutdown()
+
+    return [results[entry['id']] for entry in entries]
+
+
+async def heartbeat_loop(queue, entry_id: str):
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        await queue.heartbeat(entry_id)
+
+
+async def work(url: str, concurrency: int, exit_when_done: bool):
+    """Worker: claim, run and report jobs until the coordinator closes the queue."""
+    queue = open_queue(url, coordinator=False)
+    for attempt in range(20):
+        try:
+            await queue.start()
+            break
+        except OSError:
+            # The coordinator may still be starting its server
+            await asyncio.sleep(POLL_SECONDS)
+    else:
+        raise ConnectionError(f'could not connect to {url}')
+
+    worker_name = f'{socket.gethostname()}:{os.getpid()}'
+    hashes: Dict[Path, str] = {}
+
+    async def loop():
+        while True:
+            entry = await queue.claim(worker_name)
+            if entry is None:
+                if exit_when_done and await queue.is_closed():
+                    return
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+
+            job = QuintJob.from_dict(entry['job'])
+            spec = Path(job.spec).resolve()
+            if spec not in hashes:
+                hashes[spec] = spec_hash(spec) if spec.exists() else None
+            if hashes[spec] != entry['spec_hash']:
+                result = RunResult(job.name, ERROR, error=f'spec {spec} differs on {worker_name}', meta=job.meta)
+            else:
+                beat = asyncio.create_task(heartbeat_loop(queue, entry['id']))
+                try:
+                    result = await run_job(job, tree_hash=entry['spec_hash'])
+                finally:
+                    beat.cancel()
+            result.meta = {**result.meta, 'worker': worker_name}
+            await queue.complete(entry['id'], result.to_dict())
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run quint jobs from a shared work queue")
+    parser.add_argument('queue', help='spool directory or tcp://host:port')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='jobs to run concurrently on this host (default: CPU count)')
+    parser.add_argument('--exit-when-done', action='store_true',
+                        help='exit once the coordinator has closed the queue (default: keep polling)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(work(args.queue, args.jobs, args.exit_when_done))
+    except KeyboardInterrupt:
+        pass
+    except ConnectionError as e:
+        # A coordinator that finished may drop the connection before we see `closed`
+        if not args.exit_when_done:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,51 @@
-import subprocess
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
 
-import argparse       
-def run(num_iterations, invariant_names, output_dir):    
+# The shared quint runner; see "Running the Python examples" in the KB README
+sys.path.insert(0, os.environ.get('QUINT_SCRIPTS_DIR',
+                                  str(Path.home() / '.claude' / 'scripts' / 'test_generation')))
+
+from admission import add_admission_arguments, admission_from_args
+from progress import add_progress_arguments, progress_sinks
+from quint_runner import QuintJob, QuintRunner
+from work_queue import run_distributed
+
+
+def describe(result):
+    if result.returncode == 0:
+        return "Command executed successfully."
+    return f"Error executing command: {result.error or result.output[-500:]}"
+
+
+def run(num_iterations, invariant_names, output_dir, jobs=None, admission=None, queue=None, local_workers=0,
+        progress_args=None):
+    quint_jobs = []
     for invariant_name in invariant_names:
         for i in range(num_iterations):
             trace_name = f"{invariant_name}_trace{i}.itf.json"
-            command = f"quint run --max-samples=1000 --max-steps=20 --out-itf={output_dir}/{trace_name} --invariant={invariant_name} migration_fuzzing.qnt"
-            result = subprocess.run(command, shell=True, text=True, capture_output=True)
-            if result.returncode == 0:
-                print("Command executed successfully.")
-            else:
-                print(f"Error executing command: {result.stderr}")
+            quint_jobs.append(QuintJob(
+                name=trace_name,
+                spec=Path("migration_fuzzing.qnt"),
+                invariant=invariant_name,
+                max_steps=20,
+                max_samples=1000,
+                out_itf=f"{output_dir}/{trace_name}",
+                timeout=None,
+            ))
+
+    concurrency = jobs or (admission.max_parallel if admission else os.cpu_count() or 1)
+    sinks = progress_sinks(progress_args, quint_jobs, concurrency, labels={'spec': 'migration_fuzzing.qnt'},
+                           describe=describe)
+    if queue:
+        # Workers on other hosts write the traces, so use a path they all see
+        for job in quint_jobs:
+            job.out_itf = str(Path(job.out_itf).resolve())
+        asyncio.run(run_distributed(quint_jobs, queue, local_workers, sinks))
+    else:
+        QuintRunner(jobs=jobs, sinks=sinks, admission=admission).run_sync(quint_jobs)
 
 def main():
     # command args using argparse
@@ -18,11 +53,18 @@ def main():
     parser.add_argument("--num-iterations", type=int, default=10, help="Number of iterations")
     parser.add_argument("--invariant-names", nargs="+", default=["allPCLLiquidityWithdrawn", "fullMigrationHappened"], help="Invariant names")
     parser.add_argument("--output-dir", type=str, default="traces", help="Output directory")
+    parser.add_argument("--jobs", type=int, default=None, help="Concurrent quint processes (default: one per core)")
+    parser.add_argument("--queue", type=str, default=None, help="Spool directory or tcp://host:port to distribute runs over work_queue.py workers")
+    parser.add_argument("--local-workers", type=int, default=0, help="With --queue, also start this many local workers")
+    add_progress_arguments(parser)
+    add_admission_arguments(parser)
 
-    run(**vars(parser.parse_args()))
+    args = parser.parse_args()
+    run(args.num_iterations, args.invariant_names, args.output_dir, args.jobs, admission_from_args(args),
+        args.queue, args.local_workers, args)
 
 
 
 # main function
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
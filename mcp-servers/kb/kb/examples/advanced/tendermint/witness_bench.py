@@ -1,45 +1,50 @@
-import subprocess
-import re
+import os
+import sys
+from pathlib import Path
+
 import pandas as pd
 
+# The shared quint runner; see "Running the Python examples" in the KB README
+sys.path.insert(0, os.environ.get('QUINT_SCRIPTS_DIR',
+                                  str(Path.home() / '.claude' / 'scripts' / 'test_generation')))
+
+from backend import resolve_backend_sync
+from quint_runner import ConsoleSink, QuintJob, QuintRunner
+
 # Parameters
 max_steps_list = [10, 25, 50, 75, 100]
 witnesses = ["stages", "all_decided", "one_decided"]
 
+# Fastest simulator backend for this spec (calibrated on first use)
+backend = resolve_backend_sync(Path("tendermint.qnt"), "valid")
+print(f"Backend: {backend}")
+
+jobs = [
+    QuintJob(
+        name=f"max_steps={max_steps}",
+        spec=Path("tendermint.qnt"),
+        main="valid",
+        max_steps=max_steps,
+        max_samples=100,
+        backend=backend,
+        verbosity=1,
+        witnesses=witnesses,
+        timeout=None,
+        meta={"max_steps": max_steps},
+    )
+    for max_steps in max_steps_list
+]
+
+# One run at a time: runtimes reported by quint are only comparable without contention
+runs = QuintRunner(jobs=1, sinks=[ConsoleSink(lambda r: f"{r.runtime_ms}ms")]).run_sync(jobs)
+
 # Store results
 results = []
-
-for max_steps in max_steps_list:
-    print(f"Running with max_steps={max_steps}...")
-    
-    # Build and run the command
-    cmd = [
-        "quint", "run", "tendermint.qnt",
-        "--main", "valid",
-        f"--max-steps={max_steps}",
-        "--max-samples", "100",
-        "--verbosity", "1",
-        "--witnesses", *witnesses
-    ]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    output = proc.stdout
-
-    # Parse runtime: [ok] No violation found (35473ms at 3 traces/second).
-    runtime_match = re.search(r"No violation found \((\d+)ms", output)
-    time_ms = int(runtime_match.group(1)) if runtime_match else None
-
-    # Parse each witness percentage
-    witness_data = {w: None for w in witnesses}
-    for line in output.splitlines():
-        match = re.match(rf"({'|'.join(witnesses)}) was witnessed in \d+ trace\(s\) out of 100 explored \(([\d\.]+)%\)", line)
-        if match:
-            witness, percentage = match.groups()
-            witness_data[witness] = float(percentage)
-
+for run in runs:
     results.append({
-        "max_steps": max_steps,
-        "time_ms": time_ms,
-        **witness_data
+        "max_steps": run.meta["max_steps"],
+        "time_ms": run.runtime_ms,
+        **{w: run.witnessed.get(w) for w in witnesses}
     })
 
 # Present results